@@ -0,0 +1,129 @@
+"""
+Benchmark: in-memory conversation history for many lifetime users.
+
+Simulates a long-running bot: `users` people each chat once and go quiet,
+while a small active set keeps talking. Compares the old dict of
+re-sliced lists (every user kept forever) with ConversationMemory (deque
+ring per user, idle eviction, memory cap) on append time and on retained
+memory, and checks that the size estimate used for the cap is close to
+what tracemalloc measures.
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_conversation_memory.py [users]
+"""
+import sys
+import time
+import random
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import services.conversation.conversation_memory as conversation_memory  # noqa: E402
+from services.conversation.conversation_memory import ConversationMemory  # noqa: E402
+
+MAX_TURNS = 10
+LINES = [
+    "ê hôm nay có gì vui không",
+    "mình vừa ăn xong bát phở, no quá trời",
+    "bài tập toán khó thật sự luôn á",
+    "có ai chơi valorant không, thiếu 1 người",
+]
+REPLIES = [
+    "Nghe vui ghê! Kể thêm cho mình nghe với, hôm nay bạn đã làm gì rồi?",
+    "Phở ngon vậy thì phải đi ăn thử thôi. Quán ở đâu thế bạn?",
+    "Bài nào khó vậy, gửi mình xem thử nhé, mình giải cùng bạn.",
+]
+
+
+class LegacyHistory:
+    """Pre-refactor ConversationManager history: dict of lists re-sliced past the limit."""
+
+    def __init__(self):
+        self.conversation_history = {}
+
+    def add_to_history(self, user_id, user_message, bot_response):
+        timestamp = datetime.utcnow().isoformat()
+        if user_id not in self.conversation_history:
+            self.conversation_history[user_id] = []
+        self.conversation_history[user_id].append(
+            {"user": user_message, "bot": bot_response, "timestamp": timestamp}
+        )
+        if len(self.conversation_history[user_id]) > MAX_TURNS:
+            self.conversation_history[user_id] = self.conversation_history[user_id][-MAX_TURNS:]
+
+
+def make_events(users, rng, active=200, per_active=40):
+    events = [(str(uid), 1) for uid in range(users)]
+    events += [(str(rng.randrange(active)), per_active) for _ in range(active)]
+    rng.shuffle(events)
+    return events
+
+
+def feed(store_append, events, rng, clock=None) -> int:
+    turns = 0
+    for user_id, count in events:
+        if clock is not None:
+            clock[0] += 1.0  # one event per simulated second
+        for _ in range(count):
+            # Real messages are distinct string objects
+            store_append(user_id, f"{rng.choice(LINES)} #{turns}", f"{rng.choice(REPLIES)} #{turns}")
+            turns += 1
+    return turns
+
+
+def run(make_store, events, clock=None):
+    """(µs per append, retained bytes, store) - timed and measured in separate passes"""
+    store, append = make_store()
+    started = time.perf_counter()
+    turns = feed(append, events, random.Random(1), clock)
+    elapsed = time.perf_counter() - started
+    if clock is not None:
+        clock[0] = 0.0
+    tracemalloc.start()
+    store, append = make_store()
+    feed(append, events, random.Random(1), clock)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / turns * 1e6, current, store
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    events = make_events(users, random.Random(5))
+
+    def legacy():
+        store = LegacyHistory()
+        return store, store.add_to_history
+
+    def ring(**kwargs):
+        def make():
+            store = ConversationMemory(MAX_TURNS, **kwargs)
+            return store, store.append
+        return make
+
+    us, retained, store = run(legacy, events)
+    print(f"legacy: {us:5.2f} µs/append, {retained / 2**20:6.1f} MiB for {len(store.conversation_history)} users")
+
+    # No eviction: same users as legacy; also checks the size estimate used for the cap
+    us, retained, store = run(ring(idle_ttl=float('inf'), max_bytes=2**40), events)
+    print(f"ring:   {us:5.2f} µs/append, {retained / 2**20:6.1f} MiB for {len(store)} users "
+          f"(estimate {store.bytes / 2**20:.1f} MiB)")
+
+    # Idle eviction on a simulated clock (one event per second): users quiet for an hour are dropped
+    clock = [0.0]
+    conversation_memory.time.monotonic = lambda: clock[0]
+    us, retained, store = run(ring(idle_ttl=3600, max_bytes=2**40), events, clock)
+    stats = store.get_stats()
+    print(f"idle:   {us:5.2f} µs/append, {retained / 2**20:6.1f} MiB for {stats['users']} users "
+          f"({stats['evicted_idle']} evicted idle)")
+
+    us, retained, store = run(ring(idle_ttl=float('inf'), max_bytes=8 * 2**20), events, clock)
+    stats = store.get_stats()
+    print(f"capped: {us:5.2f} µs/append, {retained / 2**20:6.1f} MiB for {stats['users']} users "
+          f"(cap 8 MiB, {stats['evicted_memory']} evicted over cap)")
+
+
+if __name__ == '__main__':
+    main()
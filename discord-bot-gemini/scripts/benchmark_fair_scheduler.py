@@ -0,0 +1,86 @@
+"""
+Fairness simulation: one busy guild saturates the model while a few quiet
+guilds send occasional messages. Compares quiet-guild p99 wait with plain
+FIFO admission vs the weighted fair scheduler (AdmissionController).
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_fair_scheduler.py [busy_requests]
+"""
+import sys
+import asyncio
+import random
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from services.conversation.admission_controller import AdmissionController  # noqa: E402
+from services.conversation.fair_scheduler import FairScheduler, _percentile  # noqa: E402
+
+GENERATION_TIME = 0.01  # simulated seconds per LLM call
+QUIET_GUILDS = 5
+QUIET_INTERVAL = 0.1
+
+
+class FifoScheduler(FairScheduler):
+    """Baseline: same interface, plain arrival order."""
+
+    def __init__(self):
+        super().__init__()
+        self._fifo = deque()
+
+    def push(self, item, guild_id, user_id):
+        self._fifo.append(item)
+
+    def pop(self):
+        return self._fifo.popleft() if self._fifo else None
+
+    def remove(self, item):
+        try:
+            self._fifo.remove(item)
+            return True
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._fifo)
+
+
+async def run(fair: bool, busy_requests: int) -> dict:
+    controller = AdmissionController(max_in_flight=1, max_queue_depth=10 ** 6, queue_timeout=3600)
+    if not fair:
+        controller._waiters = FifoScheduler()
+    waits = {'busy': [], 'quiet': []}
+    loop = asyncio.get_running_loop()
+
+    async def request(kind: str, guild_id: str, user_id: str):
+        start = loop.time()
+        async with controller.admit(guild_id, user_id):
+            waits[kind].append(loop.time() - start)
+            await asyncio.sleep(GENERATION_TIME)
+
+    rng = random.Random(7)
+    tasks = [asyncio.create_task(request('busy', 'busy', str(rng.randint(1, 50)))) for _ in range(busy_requests)]
+    await asyncio.sleep(0)
+    duration = busy_requests * GENERATION_TIME
+    elapsed = 0.0
+    while elapsed < duration * 0.8:
+        for g in range(QUIET_GUILDS):
+            tasks.append(asyncio.create_task(request('quiet', f"quiet{g}", str(g))))
+        await asyncio.sleep(QUIET_INTERVAL)
+        elapsed += QUIET_INTERVAL
+    await asyncio.gather(*tasks)
+    return {kind: (_percentile(sorted(v), 50), _percentile(sorted(v), 99), len(v)) for kind, v in waits.items()}
+
+
+def main():
+    busy_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    for fair in (False, True):
+        result = asyncio.run(run(fair, busy_requests))
+        label = 'fair' if fair else 'fifo'
+        for kind, (p50, p99, n) in result.items():
+            print(f"{label:5} {kind:6} n={n:4}  p50={p50:6.3f}s  p99={p99:6.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: self-introduction name extraction on Vietnamese chat lines.
+
+Compares the old per-message loop (lowercase the text, run four separate
+re.finditer patterns, one update per match) with the combined single-pass
+extractor in services/relationship/name_extractor.py. Reports time per
+message and how many user_name updates each approach would issue.
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_name_extraction.py [messages]
+"""
+import re
+import sys
+import random
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from services.relationship.name_extractor import extract_self_names  # noqa: E402
+
+# Ordinary chat; most lines mention no name at all
+CHAT_LINES = [
+    "ê mọi người ơi tối nay có ai rảnh không",
+    "hôm qua Hòa nói là quán đó đóng cửa rồi",
+    "mình vừa ăn xong bát phở, no quá trời",
+    "ủa sao hôm nay server vắng vậy",
+    "có ai chơi valorant không, thiếu 1 người",
+    "trời mưa to quá, kẹt xe nguyên đoạn Nguyễn Trãi",
+    "bài tập toán khó thật sự luôn á",
+    "xem phim mới chưa, hay lắm đó",
+    "ok để mai mình hỏi lại thầy",
+    "haha bạn này vui tính ghê :v",
+    "Minh ơi, gửi mình file slide với",
+    "mai thi rồi mà chưa học chữ nào",
+]
+
+# Self-introductions, including the phrasings the old patterns matched twice
+INTRO_LINES = [
+    "chào mọi người, tên tôi là Hòa nha",
+    "mình tên Lan, rất vui được làm quen",
+    "tôi tên thật là Tuấn, còn nick là TuanPro",
+    "cứ gọi em là Vy nhé",
+    "call mình là Bin cũng được",
+    "em tên là Ngọc, tên em là Ngọc đó",
+    "tên mình là An, mà gọi mình là Bé An cũng được",
+]
+
+
+# --------------------------------------------------------------------------
+# Legacy implementation (pre-refactor, from LLMMessageService)
+# --------------------------------------------------------------------------
+
+LEGACY_PATTERNS = [
+    r"tên\s+(tôi|mình|em)\s+(?:là\s+)?(\w+)",
+    r"(?:tôi|mình|em)\s+tên\s+(?:là\s+)?(\w+)",
+    r"(?:gọi|call)\s+(?:tôi|mình|em)\s+(?:là\s+)?(\w+)",
+    r"(\w+)\s+tên\s+(?:thật\s+)?(?:là\s+)?(\w+)",
+]
+
+
+def legacy_extract(content):
+    """Returns the list of real-name updates the old code issued for a message."""
+    updates = []
+    for pattern in LEGACY_PATTERNS:
+        for match in re.finditer(pattern, content.lower()):
+            if len(match.groups()) == 2:
+                person_ref, real_name = match.groups()
+                if person_ref in ["tôi", "mình", "em"]:
+                    updates.append(real_name.title())
+            elif len(match.groups()) == 1:
+                updates.append(match.groups()[0].title())
+    return updates
+
+
+def make_corpus(count, rng):
+    corpus = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            corpus.append(rng.choice(INTRO_LINES))
+        else:
+            corpus.append(rng.choice(CHAT_LINES))
+    return corpus
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = make_corpus(count, random.Random(7))
+
+    print("Self-introductions:")
+    for line in INTRO_LINES:
+        print(f"  {line!r}\n    legacy updates: {legacy_extract(line)}\n    new:            {extract_self_names(line)}")
+
+    legacy_updates = sum(len(legacy_extract(line)) for line in corpus)
+    # The new code issues one update per message that contains a name
+    new_updates = sum(1 for line in corpus if extract_self_names(line))
+
+    def bench(func):
+        best = min(timeit.repeat(lambda: [func(line) for line in corpus], number=1, repeat=3))
+        return best / len(corpus) * 1e6
+
+    legacy_us = bench(legacy_extract)
+    new_us = bench(extract_self_names)
+    print(f"\n{count} messages ({sum(1 for line in corpus if line in INTRO_LINES)} introductions)")
+    print(f"legacy: {legacy_us:6.2f} µs/message, {legacy_updates} name updates")
+    print(f"new:    {new_us:6.2f} µs/message, {new_updates} name updates ({legacy_us / new_us:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: implicit name references with many known members.
+
+Loads N synthetic Vietnamese members (username, display name, real name)
+into NameMatcher and reports automaton build time and memory, per-message
+matching time on chat lines, and the on-loop cost of incremental name
+updates (overlay inserts; rebuilds run on a worker thread).
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_name_matcher.py [members]
+"""
+import sys
+import time
+import asyncio
+import random
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from services.relationship.name_matcher import NameMatcher  # noqa: E402
+
+FAMILY = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+MIDDLE = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Gia", "Bảo"]
+GIVEN = ["Hòa", "Lan", "Tuấn", "Vy", "Ngọc", "An", "Bình", "Châu", "Dũng", "Hải", "Khoa", "Linh",
+         "Mai", "Nam", "Phúc", "Quân", "Sơn", "Thảo", "Trang", "Uyên", "Việt", "Xuân", "Yến"]
+CHAT = [
+    "hôm qua {name} nói là quán đó đóng cửa rồi",
+    "ủa {name} đâu rồi, gọi mãi không thấy",
+    "mọi người ơi tối nay có ai rảnh không",
+    "mình vừa ăn xong bát phở, no quá trời",
+    "bài tập toán khó thật sự luôn á, {name} làm chưa",
+    "có ai chơi valorant không, thiếu 1 người",
+]
+
+
+def make_member(i, rng):
+    real = f"{rng.choice(FAMILY)} {rng.choice(MIDDLE)} {rng.choice(GIVEN)}"
+    username = f"{rng.choice(GIVEN).lower()}_{i}"
+    display = f"{rng.choice(GIVEN)}{rng.choice(['', 'Pro', 'Cute', 'Gamer'])} {i}"
+    return i + 1, (username, display, real)
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(3)
+    people = [make_member(i, rng) for i in range(members)]
+
+    matcher = NameMatcher()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for uid, names in people:
+        matcher.set_names(uid, names, rebuild=False)
+    matcher.rebuild()
+    build = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = matcher.get_stats()
+    print(f"{members} members -> {stats['names']} names, {stats['nodes']} automaton nodes")
+    print(f"build: {build:.2f}s total, automaton {stats['last_build_ms']}ms, peak memory {peak / 2**20:.0f} MiB")
+
+    lines = []
+    for _ in range(2000):
+        uid, (username, display, real) = rng.choice(people)
+        lines.append(rng.choice(CHAT).format(name=rng.choice([username, display, real])))
+    hits = sum(len(matcher.find(line)) for line in lines)
+    per_msg = min(timeit.repeat(lambda: [matcher.find(line) for line in lines], number=1, repeat=3)) / len(lines)
+    print(f"find: {per_msg * 1e6:.1f} µs/message, {hits} references in {len(lines)} messages")
+
+    # Incremental updates on a running loop: renames land in the overlay and the
+    # automaton is rebuilt on a worker thread; report the worst on-loop cost
+    asyncio.run(run_updates(matcher, people, rng))
+
+
+async def run_updates(matcher, people, rng, updates=1000):
+    rebuilds_before = matcher.rebuilds
+    worst = 0.0
+    started = time.perf_counter()
+    for i in range(updates):
+        uid, (username, display, real) = rng.choice(people)
+        t0 = time.perf_counter()
+        matcher.set_names(uid, (username, f"NewNick{i}", real))
+        worst = max(worst, time.perf_counter() - t0)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    while matcher._rebuilding:
+        await asyncio.sleep(0.01)
+    stats = matcher.get_stats()
+    print(f"updates: {elapsed / updates * 1e3:.3f} ms/update on the loop, worst {worst * 1e3:.2f} ms "
+          f"({stats['rebuilds'] - rebuilds_before} background rebuilds of ~{stats['last_build_ms']}ms, "
+          f"{stats['pending']} pending)")
+    sample = f"hôm qua NewNick{updates - 1} nói là quán đó đóng cửa rồi"
+    print(f"overlay match: {sample!r} -> {matcher.find(sample)}")
+
+
+if __name__ == '__main__':
+    main()
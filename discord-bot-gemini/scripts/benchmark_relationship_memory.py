@@ -0,0 +1,130 @@
+"""
+Memory benchmark: legacy string-keyed relationship dicts vs interned int ids
+with __slots__ records (RelationshipService internal representation).
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_relationship_memory.py [num_users]
+"""
+import gc
+import sys
+import time
+import random
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from models.user import User  # noqa: E402
+from models.relationship import (  # noqa: E402
+    InteractionRecord, ConversationMessage, ConversationThread
+)
+from services.relationship.user_id_interner import UserIdInterner  # noqa: E402
+
+BASE_ID = 400_000_000_000_000_000
+MENTIONS_PER_USER = 8
+EVENTS_PER_PAIR = 3
+THREADS_PER_USER = 2
+MESSAGES_PER_THREAD = 3
+CONTEXT_RING = 20
+
+
+def _user_ids(num_users: int):
+    return [BASE_ID + i * 7919 for i in range(num_users)]
+
+
+def _plan(num_users: int, seed: int = 42):
+    """Deterministic workload shared by both representations (ids as ints)."""
+    rng = random.Random(seed)
+    ids = _user_ids(num_users)
+    pairs = [(a, rng.choice(ids)) for a in ids for _ in range(MENTIONS_PER_USER)]
+    threads = [tuple(sorted({a, rng.choice(ids)})) for a in ids for _ in range(THREADS_PER_USER)]
+    return ids, pairs, threads
+
+
+def build_legacy(ids, pairs, threads):
+    user_names = {}
+    for uid in ids:
+        name = f"user{uid % 100000}"
+        user_names[str(uid)] = {
+            'username': name,
+            'display_name': name,
+            'real_name': None,
+            'name_history': [name],
+            'first_seen': datetime.now().isoformat(),
+            'last_updated': datetime.now().isoformat()
+        }
+    interactions = {}
+    for a, b in pairs:
+        key = f"{a}_{b}"
+        record = interactions.setdefault(key, {'from_user': str(a), 'to_user': str(b), 'interactions': []})
+        for _ in range(EVENTS_PER_PAIR):
+            record['interactions'].append({'type': 'mention', 'timestamp': datetime.now().isoformat(), 'context': 'ê'})
+    conversation_history = {}
+    for participants in threads:
+        str_participants = sorted(str(p) for p in participants)
+        key = "_".join(str_participants)
+        thread = conversation_history.setdefault(key, {'participants': str_participants, 'messages': []})
+        for _ in range(MESSAGES_PER_THREAD):
+            thread['messages'].append({
+                'author_id': str(participants[0]),
+                'message': 'ê',
+                'mentioned_users': [str(p) for p in participants[1:]],
+                'channel_id': str(BASE_ID + 1),
+                'timestamp': datetime.now().isoformat()
+            })
+    return user_names, interactions, conversation_history
+
+
+def build_compact(ids, pairs, threads):
+    interner = UserIdInterner()
+    user_names = {}
+    for raw in ids:
+        uid = interner.intern(str(raw))
+        name = f"user{uid % 100000}"
+        user_names[uid] = User(uid, name, display_name=name, first_seen=time.time(), last_updated=time.time())
+    interactions = {}
+    for a, b in pairs:
+        a, b = interner.intern(str(a)), interner.intern(str(b))
+        row = interactions.setdefault(a, {})
+        record = row.get(b)
+        if record is None:
+            record = row[b] = InteractionRecord()
+        for _ in range(EVENTS_PER_PAIR):
+            record.add('mention', time.time(), 'ê', CONTEXT_RING)
+    conversation_history = {}
+    channel_id = UserIdInterner().intern(str(BASE_ID + 1))
+    for participants in threads:
+        participants = tuple(interner.intern(str(p)) for p in participants)
+        thread = conversation_history.get(participants)
+        if thread is None:
+            thread = conversation_history[participants] = ConversationThread(participants)
+        for _ in range(MESSAGES_PER_THREAD):
+            thread.messages.append(ConversationMessage(participants[0], 'ê', participants[1:], channel_id, time.time()))
+    return interner, user_names, interactions, conversation_history
+
+
+def measure(builder, *args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    state = builder(*args)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+    return current
+
+
+def main():
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    ids, pairs, threads = _plan(num_users)
+    legacy = measure(build_legacy, ids, pairs, threads)
+    compact = measure(build_compact, ids, pairs, threads)
+    print(f"users={num_users} mention pairs={len(pairs)} threads={len(threads)}")
+    print(f"legacy dicts : {legacy / 1024 / 1024:8.1f} MiB")
+    print(f"compact      : {compact / 1024 / 1024:8.1f} MiB")
+    print(f"reduction    : {legacy / compact:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Microbenchmark: reply post-processing before and after utils/text_processing.
+
+The "legacy" functions are verbatim copies of the per-call implementations
+that used to live in OllamaService (_parse_info_tag + _clean_response) and
+LLMMessageService (_split_response_naturally). Both pipelines run over the
+same generated replies; outputs are compared and differences reported.
+
+Usage (from discord-bot-gemini/):
+    python scripts/benchmark_text_processing.py [iterations]
+"""
+import re
+import sys
+import random
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from utils.text_processing import process_response, split_natural  # noqa: E402
+
+
+# --------------------------------------------------------------------------
+# Legacy implementations (pre-refactor)
+# --------------------------------------------------------------------------
+
+def legacy_parse_info_tag(text):
+    if re.search(r"\[INFO:important\]", text, re.IGNORECASE):
+        cleaned = re.sub(r"\s*\[INFO:important\]\s*", "", text, flags=re.IGNORECASE).strip()
+        return (cleaned, True)
+    if re.search(r"\[INFO:normal\]", text, re.IGNORECASE):
+        cleaned = re.sub(r"\s*\[INFO:normal\]\s*", "", text, flags=re.IGNORECASE).strip()
+        return (cleaned, False)
+    return (text, False)
+
+
+def legacy_clean_response(text):
+    markers = [
+        r"===\s*PHẢN HỒI CỦA BẠN\s*===",
+        r"===\s*TIN NHẮN CỦA NGƯỜI DÙNG\s*===",
+        r"===\s*NHÂN CÁCH\s*===",
+        r"===\s*HƯỚNG DẪN HỘI THOẠI\s*===",
+        r"===\s*BỐI CẢNH HỘI THOẠI\s*===",
+        r"===\s*[^=]+\s*===",
+    ]
+    for marker in markers:
+        text = re.sub(marker, "", text, flags=re.IGNORECASE)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001f600-\U0001f64f"
+        "\U0001f300-\U0001f5ff"
+        "\U0001f680-\U0001f6ff"
+        "\U0001f1e0-\U0001f1ff"
+        "\U00002702-\U000027b0"
+        "\U0001f900-\U0001f9ff"
+        "\U0001fa00-\U0001fa6f"
+        "\U0001fa70-\U0001faff"
+        "\U00002600-\U000026ff"
+        "]+",
+        flags=re.UNICODE,
+    )
+    text = emoji_pattern.sub("", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r" {2,}", " ", text)
+    return text.strip()
+
+
+def legacy_split_naturally(response):
+    response = response.strip()
+    if not response:
+        return []
+    if "\n" in response:
+        lines = response.split("\n")
+        return [line.strip() for line in lines if line.strip()]
+    sentence_end_re = re.compile(r"([^.!?…~]+[.!?…~]+[\s\n]*)", re.UNICODE)
+    parts = sentence_end_re.findall(response)
+    consumed = "".join(parts)
+    if len(consumed) < len(response):
+        parts.append(response[len(consumed):].strip())
+    return [p.strip() for p in parts if p.strip()]
+
+
+def legacy_pipeline(raw):
+    text, important = legacy_parse_info_tag(raw)
+    text = legacy_clean_response(text)
+    return text, important, legacy_split_naturally(text)
+
+
+def new_pipeline(raw):
+    text, important = process_response(raw)
+    return text, important, split_natural(text)
+
+
+# --------------------------------------------------------------------------
+# Corpus
+# --------------------------------------------------------------------------
+
+SENTENCES = [
+    "Ơ kìa, bạn nói thật á?", "Hôm nay mình hơi mệt xíu.", "Đi ăn bún bò không nè!",
+    "Trời ơi dễ thương quá đi~", "Mình cũng nghĩ vậy đó.", "Ủa rồi sao nữa…",
+    "Để mình xem lại đã nha.", "Haha chuẩn luôn :v", "Bạn ngủ sớm đi nhé!",
+    "Cái này mình chưa thử bao giờ 😅", "Chill thôi mà 🎉", "Ok luôn ✨",
+]
+
+
+def make_reply(rng):
+    count = rng.randint(1, 6)
+    sentences = rng.sample(SENTENCES, count)
+    joiner = "\n" if rng.random() < 0.5 else " "
+    text = joiner.join(sentences)
+    if rng.random() < 0.15:
+        text = "=== PHẢN HỒI CỦA BẠN ===\n" + text
+    if rng.random() < 0.8:
+        text += rng.choice([" [INFO:normal]", "\n[INFO:important]", " [info:IMPORTANT]"])
+    return text
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(42)
+    corpus = [make_reply(rng) for _ in range(500)]
+
+    differences = 0
+    for raw in corpus:
+        if legacy_pipeline(raw) != new_pipeline(raw):
+            differences += 1
+            if differences <= 3:
+                print(f"diff for {raw!r}:\n  legacy: {legacy_pipeline(raw)}\n  new:    {new_pipeline(raw)}")
+    print(f"Output differences: {differences}/{len(corpus)}")
+
+    def run(pipeline):
+        def bench():
+            for raw in corpus:
+                pipeline(raw)
+        loops = max(1, iterations // len(corpus))
+        best = min(timeit.repeat(bench, number=loops, repeat=3))
+        return best / (loops * len(corpus)) * 1e6
+
+    legacy_us = run(legacy_pipeline)
+    new_us = run(new_pipeline)
+    print(f"legacy: {legacy_us:7.2f} µs/reply")
+    print(f"new:    {new_us:7.2f} µs/reply  ({legacy_us / new_us:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
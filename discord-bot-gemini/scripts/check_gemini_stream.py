@@ -0,0 +1,154 @@
+"""
+Exercise GeminiService.stream_response against a local fake SSE server
+(no API key or network needed). The fake endpoint mimics
+`streamGenerateContent?alt=sse`: one `data:` event per chunk, with a delay
+between chunks, so time-to-first-part vs total generation time is visible.
+Also checks error events and non-200 responses end the stream cleanly.
+Exits non-zero if any scenario does not behave as expected.
+
+Usage (from discord-bot-gemini/):
+    python scripts/check_gemini_stream.py
+"""
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import List
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from services.ai.gemini_service import GeminiService  # noqa: E402
+from services.ai.provider_errors import ProviderResponseError  # noqa: E402
+
+CHUNK_DELAY = 0.3
+CHUNKS = [
+    "Chào bạn! Hôm nay ",
+    "mình rảnh nè.\nBạn muốn ",
+    "đi đâu chơi không? [INFO:imp",
+    "ortant]\nMình biết một quán cà phê ",
+    "rất xịn ở quận 3.",
+]
+PARTS = [
+    "Chào bạn!",
+    "Hôm nay mình rảnh nè.",
+    "Bạn muốn đi đâu chơi không?",
+    "Mình biết một quán cà phê rất xịn ở quận 3.",
+]
+
+# key -> (expected parts, important, expected error type, HTTP status on the error)
+CASES = {
+    'ok': (PARTS, True, None, None),
+    # The error event replaces the third chunk: "Bạn muốn " was never completed
+    'midstream-error': (PARTS[:2], False, ProviderResponseError, None),
+    'bad-key': ([], False, ProviderResponseError, 400),
+}
+
+
+def _event(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\r\n\r\n".encode('utf-8')
+
+
+def _text_event(text: str) -> bytes:
+    return _event({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]})
+
+
+async def stream_handler(request: web.Request) -> web.StreamResponse:
+    name = request.match_info['name']
+    if not name.endswith(':streamGenerateContent') or request.query.get('alt') != 'sse':
+        return web.Response(status=404, text="unexpected endpoint")
+    mode = request.query.get('key')
+    if mode == 'bad-key':
+        return web.json_response({"error": {"code": 400, "message": "API key not valid"}}, status=400)
+
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    for i, chunk in enumerate(CHUNKS):
+        await asyncio.sleep(CHUNK_DELAY)
+        if mode == 'midstream-error' and i == 2:
+            await response.write(_event({"error": {"code": 500, "message": "Internal error"}}))
+            break
+        await response.write(_text_event(chunk))
+    await response.write_eof()
+    return response
+
+
+async def run_case(service: GeminiService, key: str) -> List[str]:
+    """Run one scenario; returns the failed expectations."""
+    expected_parts, expected_important, error_type, status = CASES[key]
+    service.api_key = key
+    started = time.monotonic()
+    stream = service.stream_response("Đi chơi không?", "user-1", "")
+    first_at = None
+    parts = []
+    async for part in stream:
+        if first_at is None:
+            first_at = time.monotonic() - started
+        parts.append(part)
+    text, is_important = await stream.wait()
+    total = time.monotonic() - started
+
+    print(f"\n[{key}]")
+    for part in parts:
+        print(f"  part: {part!r}")
+    first = f"{first_at:.2f}s" if first_at is not None else "-"
+    print(f"  first part after {first}, done after {total:.2f}s")
+    print(f"  important={is_important} error={stream.error!r}")
+    print(f"  full text: {text!r}")
+
+    failures = []
+    if parts != expected_parts:
+        failures.append(f"parts {parts!r} != {expected_parts!r}")
+    # Whitespace between parts is up to the cleaner; the words must match
+    if text.split() != " ".join(expected_parts).split():
+        failures.append(f"full text {text!r} does not match the parts")
+    if "[INFO" in text.upper():
+        failures.append("INFO tag left in the full text")
+    if is_important != expected_important:
+        failures.append(f"important={is_important}, expected {expected_important}")
+    if error_type is None:
+        if stream.error is not None:
+            failures.append(f"unexpected error {stream.error!r}")
+    elif not isinstance(stream.error, error_type):
+        failures.append(f"error {stream.error!r} is not a {error_type.__name__}")
+    elif getattr(stream.error, 'status', None) != status:
+        failures.append(f"error status {stream.error.status}, expected {status}")
+    if expected_parts and first_at is not None and total - first_at < CHUNK_DELAY:
+        failures.append("first part was not delivered before generation finished")
+
+    for failure in failures:
+        print(f"  FAIL: {failure}")
+    return failures
+
+
+async def main():
+    app = web.Application()
+    app.router.add_post('/models/{name}', stream_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    service = GeminiService()
+    service.api_url = f"http://127.0.0.1:{port}/models"
+    failed = []
+    try:
+        for key in CASES:
+            if await run_case(service, key):
+                failed.append(key)
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        return 1
+    print(f"\nOK: all {len(CASES)} scenarios passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,51 @@
+"""
+Regression check for the self-introduction name extractor: real
+introductions must yield the name, questions and particles after the
+phrasing ("em tên gì vậy", "xem tên tôi đi") must yield nothing.
+Exits non-zero if any case fails.
+
+Usage (from discord-bot-gemini/):
+    python scripts/check_name_extraction.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from services.relationship.name_extractor import extract_self_name  # noqa: E402
+
+# message -> name that should be recorded (None: nothing)
+CASES = {
+    "chào mọi người, tên tôi là Hòa nha": "Hòa",
+    "mình tên Lan, rất vui được làm quen": "Lan",
+    "tôi tên thật là Tuấn": "Tuấn",
+    "cứ gọi em là Vy nhé": "Vy",
+    "tên mình là An, mà gọi mình là Bin cũng được": "Bin",
+    "em tên gì vậy": None,
+    "xem tên tôi đi": None,
+    "tên mình là gì nhỉ": None,
+    "bạn gọi tôi là j cũng được": None,
+    "ủa tôi tên là": None,
+    "tên em chi rứa": None,
+    "gọi mình nha": None,
+    "tên tôi không quan trọng": None,
+}
+
+
+def main() -> int:
+    failed = 0
+    for message, expected in CASES.items():
+        got = extract_self_name(message)
+        status = "ok" if got == expected else "FAIL"
+        if got != expected:
+            failed += 1
+        print(f"  {status:4} {message!r}: {got!r} (expected {expected!r})")
+    if failed:
+        print(f"\nFAILED: {failed} of {len(CASES)} cases")
+        return 1
+    print(f"\nOK: all {len(CASES)} cases passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Run the bot as several processes, each owning a contiguous range of shards.
+
+Discord routes every guild to exactly one shard, so each process only sees
+its own guilds and keeps their state (relationships, channel settings) in
+src/data/shards/shards_<first>-<last>/. Per-user stores (summaries,
+conversation logs) stay in src/data/user_summaries/ for every process, as a
+user's DMs (always shard 0) and guilds can live in different processes.
+Throughput scales with the number of cores. The shared Ollama server
+remains the limit for generation; size LLM_MAX_IN_FLIGHT per process.
+
+Before starting, a shard range without a state directory is seeded from
+the unsharded guild state: bot_channels.json is split by guild, so each range
+gets only the channels of its own guilds, and the relationship graph (which
+is not keyed by guild) goes to the range owning shard 0 only, alongside the
+DMs; the other ranges build theirs from scratch. User summaries that older
+versions kept per shard range are moved to the shared directory, where every
+process reads-modifies-writes them under a per-file lock.
+
+The launcher starts the processes one after another (Discord allows one
+IDENTIFY per 5 seconds), restarts a process that crashes (with backoff) and
+forwards Ctrl+C / SIGTERM to all of them as a single SIGTERM each.
+
+Keep --shards stable: changing the shard count re-assigns guilds to
+different processes, and their state directories do not move with them.
+
+Usage (from discord-bot-gemini/):
+    python scripts/launch_shards.py --processes 4 [--shards 16]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import subprocess
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / 'src'))
+
+from config.settings import Config  # noqa: E402
+
+IDENTIFY_INTERVAL = 5.5  # seconds per shard between process starts
+MAX_BACKOFF = 60.0
+HEALTHY_AFTER = 120.0  # a process running this long resets its backoff
+STOP_TIMEOUT = 30.0
+# Unsharded guild state seeded into new shard range directories (relative to DATA_DIR)
+RELATIONSHIPS = "relationships"
+BOT_CHANNELS = "bot_channels.json"
+
+
+def recommended_shards(token: str) -> int:
+    """Ask Discord how many shards this bot should run."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (launch_shards, 1.0)"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)["shards"])
+
+
+def partition(shard_count: int, processes: int) -> List[List[int]]:
+    """Split shard ids into `processes` contiguous, near-equal ranges."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def state_dir(shard_ids: List[int]) -> Path:
+    """Same layout as Config.STATE_DIR for a process running `shard_ids`."""
+    return Config.DATA_DIR / "shards" / f"shards_{shard_ids[0]}-{shard_ids[-1]}"
+
+
+def shard_of(guild_id: int, shard_count: int) -> int:
+    """Discord's guild-to-shard routing."""
+    return (guild_id >> 22) % shard_count
+
+
+def seed_state(ranges: List[List[int]], shard_count: int):
+    """Start each new shard range from its own part of the unsharded guild state."""
+    channels_file = Config.DATA_DIR / BOT_CHANNELS
+    channels = {}
+    if channels_file.is_file():
+        with open(channels_file, "r", encoding="utf-8") as f:
+            channels = json.load(f)
+    relationships = Config.DATA_DIR / RELATIONSHIPS
+
+    for shard_ids in ranges:
+        target = state_dir(shard_ids)
+        if target.exists():
+            continue
+        target.mkdir(parents=True)
+        seeded = []
+        owned = set(shard_ids)
+        own_channels = {
+            guild_id: channel_ids for guild_id, channel_ids in channels.items()
+            if shard_of(int(guild_id), shard_count) in owned
+        }
+        if own_channels:
+            with open(target / BOT_CHANNELS, "w", encoding="utf-8") as f:
+                json.dump(own_channels, f, indent=2)
+            seeded.append(f"{BOT_CHANNELS} ({len(own_channels)} guild(s))")
+        # The graph has no guild key to split on: one owner, not a copy per range
+        if 0 in owned and relationships.is_dir():
+            shutil.copytree(relationships, target / RELATIONSHIPS)
+            seeded.append(RELATIONSHIPS)
+        if seeded:
+            print(f"📦 Seeded {target.name} with {', '.join(seeded)}", flush=True)
+
+
+def merge_user_stores():
+    """Move per-user files that older versions kept per shard range to the shared store."""
+    shared = Config.USER_SUMMARIES_DIR
+    for source in (Config.DATA_DIR / "shards").glob("*/user_summaries"):
+        moved = kept = 0
+        shared.mkdir(parents=True, exist_ok=True)
+        for path in source.iterdir():
+            target = shared / path.name
+            # Newest copy wins when the user was served by several processes
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                kept += 1
+                continue
+            os.replace(path, target)
+            moved += 1
+        if not kept:
+            source.rmdir()
+        print(f"📦 Moved {moved} user file(s) from {source.parent.name} to {shared}"
+              + (f", {kept} older duplicate(s) left in place" if kept else ""), flush=True)
+
+
+class ShardProcess:
+    def __init__(self, shard_ids: List[int], shard_count: int):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.label = f"shards {shard_ids[0]}-{shard_ids[-1]}"
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.backoff = 1.0
+        self.restart_at: Optional[float] = None
+
+    def start(self):
+        env = dict(os.environ)
+        env["SHARD_COUNT"] = str(self.shard_count)
+        env["SHARD_IDS"] = ",".join(str(i) for i in self.shard_ids)
+        # Own session: a Ctrl+C in the terminal reaches only the supervisor, which
+        # forwards exactly one stop signal (a second SIGINT would abort the drain)
+        self.process = subprocess.Popen(
+            [sys.executable, str(ROOT_DIR / "src" / "bot.py")], cwd=str(ROOT_DIR), env=env,
+            start_new_session=True,
+        )
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        print(f"▶️  Started {self.label} (pid {self.process.pid})", flush=True)
+
+    def poll(self) -> Optional[int]:
+        return self.process.poll() if self.process else 0
+
+
+def supervise(workers: List[ShardProcess]):
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    # Staggered start: each process identifies its shards one by one
+    for worker in workers:
+        if stopping:
+            break
+        worker.start()
+        deadline = time.monotonic() + IDENTIFY_INTERVAL * len(worker.shard_ids)
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+    finished: Dict[str, int] = {}
+    while not stopping and len(finished) < len(workers):
+        now = time.monotonic()
+        for worker in workers:
+            if worker.label in finished:
+                continue
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.start()
+                continue
+            code = worker.poll()
+            if code is None:
+                if now - worker.started_at > HEALTHY_AFTER:
+                    worker.backoff = 1.0
+                continue
+            if code == 0:
+                print(f"⏹️  {worker.label} exited cleanly", flush=True)
+                finished[worker.label] = code
+                continue
+            print(f"⚠️  {worker.label} exited with {code}, restarting in {worker.backoff:.0f}s", flush=True)
+            worker.restart_at = now + worker.backoff
+            worker.backoff = min(MAX_BACKOFF, worker.backoff * 2)
+        time.sleep(0.5)
+
+    # Forward the stop to every running process and wait for their shutdown
+    # (bot.py shuts down gracefully on SIGTERM)
+    running = [w for w in workers if w.process and w.process.poll() is None]
+    for worker in running:
+        worker.process.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for worker in running:
+        try:
+            worker.process.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"⛔ {worker.label} did not stop in time, killing", flush=True)
+            worker.process.kill()
+    print("🛑 All shard processes stopped", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="number of bot processes (default: CPU count)")
+    parser.add_argument("--shards", type=int, default=Config.SHARD_COUNT,
+                        help="total shard count (default: SHARD_COUNT or Discord's recommendation)")
+    args = parser.parse_args()
+
+    shard_count = args.shards
+    if not shard_count:
+        if not Config.DISCORD_BOT_TOKEN:
+            parser.error("--shards is required when DISCORD_LLM_BOT_TOKEN is not set")
+        shard_count = recommended_shards(Config.DISCORD_BOT_TOKEN)
+        print(f"ℹ️  Discord recommends {shard_count} shard(s)", flush=True)
+
+    ranges = partition(shard_count, args.processes)
+    print(f"🧩 {shard_count} shard(s) across {len(ranges)} process(es): "
+          + ", ".join(f"{r[0]}-{r[-1]}" for r in ranges), flush=True)
+    seed_state(ranges, shard_count)
+    merge_user_stores()
+    supervise([ShardProcess(r, shard_count) for r in ranges])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Run the shared state server for several bot processes on one host.
+
+Bot processes started with the same STATE_SERVER address share conversation
+locks, anti-spam buckets and message dedup through it, so two processes on
+the same gateway events (a blue/green deploy, or extra workers) neither
+answer one message twice nor bypass each other's rate limits. Bots that
+cannot reach it fall back to process-local state and reconnect on their own.
+
+Usage (from discord-bot-gemini/):
+    python scripts/state_server.py [--address /tmp/discord-bot-state.sock]
+    # then start each bot with STATE_SERVER set to the same address
+"""
+import sys
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from config.settings import Config  # noqa: E402
+from services.state.state_server import StateServer  # noqa: E402
+
+DEFAULT_ADDRESS = "/tmp/discord-bot-state.sock"
+STATS_INTERVAL = 300.0
+
+
+async def run(address: str):
+    server = StateServer(address)
+    await server.start()
+
+    async def report():
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            logging.getLogger('discord_bot.StateServer').info(f"📊 {server.get_stats()}")
+
+    reporter = asyncio.create_task(report())
+    try:
+        await server.serve_forever()
+    finally:
+        reporter.cancel()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", default=Config.STATE_SERVER or DEFAULT_ADDRESS,
+                        help="unix socket path or host:port (default: STATE_SERVER or %(default)s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(run(args.address))
+    except KeyboardInterrupt:
+        print("🛑 State server stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
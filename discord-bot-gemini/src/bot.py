@@ -1,9 +1,12 @@
 import os
 import sys
+import signal
+import asyncio
 import discord
 from discord.ext import commands
 from config.settings import Config
 from config.logging_config import setup_logging
+from services.lifecycle.shutdown_coordinator import ShutdownCoordinator
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,10 +17,13 @@ sys.path.insert(0, project_root)
 # Configure logging
 logger = setup_logging()
 
-class DiscordBot(commands.Bot):
+class DiscordBot(commands.AutoShardedBot):
     """
     Main Bot class that handles initialization, service loading, and event handling.
     Follows Singleton pattern implicitly as the main application entry point.
+
+    Runs every shard in this process by default; with SHARD_COUNT/SHARD_IDS it
+    runs only its share (scripts/launch_shards.py starts one process per range).
     """
     
     def __init__(self):
@@ -33,8 +39,11 @@ class DiscordBot(commands.Bot):
             help_command=None,
             case_insensitive=True,
             strip_after_prefix=True,
-            max_messages=500
+            max_messages=500,
+            shard_count=Config.SHARD_COUNT,
+            shard_ids=Config.SHARD_IDS
         )
+        self._shutdown: asyncio.Future | None = None
         
     async def setup_hook(self):
         """
@@ -42,6 +51,14 @@ class DiscordBot(commands.Bot):
         Used for loading extensions and syncing commands.
         """
         logger.info("🚀 Initializing Discord Bot...")
+
+        # SIGTERM (docker/systemd) shuts down like Ctrl+C instead of killing the process
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.ensure_future(self.close())
+            )
+        except (NotImplementedError, RuntimeError):
+            pass  # not supported on Windows
         
         # Validate configuration
         try:
@@ -98,7 +115,22 @@ class DiscordBot(commands.Bot):
 
     async def on_ready(self):
         """Called when the bot is ready"""
-        logger.info(f'🚀 Bot started as {self.user} in {len(self.guilds)} guilds')
+        shards = f"shards {Config.SHARD_IDS} of {self.shard_count}" if Config.SHARD_IDS else f"{self.shard_count} shard(s)"
+        logger.info(f'🚀 Bot started as {self.user} in {len(self.guilds)} guilds ({shards})')
+
+    async def on_shard_ready(self, shard_id: int):
+        logger.info(f"🧩 Shard {shard_id} ready")
+
+    async def close(self):
+        """Finish accepted work and flush all state, then disconnect"""
+        if self._shutdown is None:
+            self._shutdown = asyncio.ensure_future(ShutdownCoordinator(self).run())
+        try:
+            # Shielded: a second close() call waits for the same shutdown
+            await asyncio.shield(self._shutdown)
+        except Exception as e:
+            logger.error(f"❌ Graceful shutdown failed: {e}")
+        await super().close()
 
     async def on_error(self, event_method, *args, **kwargs):
         """Global error handler"""
@@ -22,16 +22,33 @@ class Config:
     # Data paths
     DATA_DIR = SRC_DIR / "data"
     PROMPTS_DIR = DATA_DIR / "prompts"
-    USER_SUMMARIES_DIR = DATA_DIR / "user_summaries"
-    
-    # Log paths
-    LOG_FILE = ROOT_DIR / "bot.log"
 
     # =========================================================================
     # BOT CONFIGURATION
     # =========================================================================
     DISCORD_BOT_TOKEN: str | None = os.getenv('DISCORD_LLM_BOT_TOKEN')
     DISCORD_BOT_CLIENT_ID: str | None = os.getenv('DISCORD_LLM_BOT_CLIENT_ID')
+
+    # =========================================================================
+    # SHARDING
+    # =========================================================================
+    # Nothing set: Discord's recommended shard count, all shards in this process.
+    # SHARD_IDS: the shards this process runs (set by scripts/launch_shards.py);
+    # its guilds' state (relationships, channels) then lives in its own directory.
+    # Per-user stores (summaries, conversation logs) stay shared: a user's DMs
+    # (shard 0) and guilds can be served by different processes, so they are
+    # written under a per-file lock and cached reads are revalidated.
+    SHARD_COUNT: int | None = int(os.getenv('SHARD_COUNT', '0')) or None
+    SHARD_IDS: list[int] | None = sorted(int(s) for s in os.getenv('SHARD_IDS', '').split(',') if s.strip()) or None
+    SHARD_LABEL: str = f"shards_{SHARD_IDS[0]}-{SHARD_IDS[-1]}" if SHARD_IDS else ""
+
+    # Mutable state paths (guild state per shard range when sharded)
+    STATE_DIR = DATA_DIR / "shards" / SHARD_LABEL if SHARD_IDS else DATA_DIR
+    USER_SUMMARIES_DIR = DATA_DIR / "user_summaries"
+    RELATIONSHIPS_DIR = STATE_DIR / "relationships"
+
+    # Log paths
+    LOG_FILE = ROOT_DIR / (f"bot.{SHARD_LABEL}.log" if SHARD_IDS else "bot.log")
     SYNC_COMMANDS: bool = os.getenv('SYNC_COMMANDS', '0') == '1'
 
     # =========================================================================
@@ -45,7 +62,30 @@ class Config:
     # Ollama (Backup/Local)
     OLLAMA_API_URL: str = os.getenv('OLLAMA_API_URL', 'http://localhost:11434')
     OLLAMA_MODEL: str = os.getenv('OLLAMA_MODEL', 'qwen3:1.7b')
-    USE_OLLAMA_BACKUP: bool = os.getenv('USE_OLLAMA_BACKUP', '1') == '1'  # Use Ollama as backup
+    USE_OLLAMA_BACKUP: bool = os.getenv('USE_OLLAMA_BACKUP', '1') == '1'  # Ollama answers chat (summaries always use it)
+    # Stream replies and send each line/sentence as soon as it is generated
+    LLM_STREAMING: bool = os.getenv('LLM_STREAMING', '1') == '1'
+
+    # Provider routing: healthy providers are tried fastest first (p50 over the
+    # last LLM_LATENCY_WINDOW requests, once each has LLM_ROUTER_MIN_SAMPLES);
+    # a provider failing more than LLM_MAX_ERROR_RATE of recent requests goes last
+    LLM_LATENCY_WINDOW: int = int(os.getenv('LLM_LATENCY_WINDOW', '100'))
+    LLM_ROUTER_MIN_SAMPLES: int = int(os.getenv('LLM_ROUTER_MIN_SAMPLES', '5'))
+    LLM_MAX_ERROR_RATE: float = float(os.getenv('LLM_MAX_ERROR_RATE', '0.5'))
+    # Hedged requests: once the first provider takes longer than its own
+    # LLM_HEDGE_PERCENTILE latency (never less than LLM_HEDGE_MIN_DELAY seconds),
+    # the request also goes to the next provider and the slower one is cancelled
+    LLM_HEDGE_ENABLED: bool = os.getenv('LLM_HEDGE_ENABLED', '1') == '1'
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv('LLM_HEDGE_PERCENTILE', '90'))
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv('LLM_HEDGE_MIN_DELAY', '2'))
+    # Circuit breaker: a provider is skipped for LLM_BREAKER_RESET seconds after
+    # LLM_BREAKER_FAILURES consecutive failures, then gets one trial request
+    LLM_BREAKER_FAILURES: int = int(os.getenv('LLM_BREAKER_FAILURES', '3'))
+    LLM_BREAKER_RESET: float = float(os.getenv('LLM_BREAKER_RESET', '30'))
+    # Background health probes (Ollama /api/tags, Gemini model lookup); a failed
+    # probe opens the circuit before users hit the dead backend (0 = disabled)
+    LLM_PROBE_INTERVAL: float = float(os.getenv('LLM_PROBE_INTERVAL', '15'))
+    LLM_PROBE_TIMEOUT: float = float(os.getenv('LLM_PROBE_TIMEOUT', '2'))
 
     # =========================================================================
     # TYPING SIMULATION
@@ -56,6 +96,119 @@ class Config:
     MAX_TYPING_DELAY: float = float(os.getenv('MAX_TYPING_DELAY', '8.0'))
     PART_BREAK_DELAY: float = float(os.getenv('PART_BREAK_DELAY', '0.6'))
 
+    # =========================================================================
+    # CONVERSATION QUEUE
+    # =========================================================================
+    # Messages sent while the user's previous message is being answered are queued
+    # (per user) and answered together as one request when the lock is released
+    PENDING_QUEUE_MAX_DEPTH: int = int(os.getenv('PENDING_QUEUE_MAX_DEPTH', '5'))
+    # Fragments from the same user in the same channel within DEBOUNCE_WINDOW
+    # seconds of each other are merged into one turn (0 = disabled)
+    DEBOUNCE_WINDOW: float = float(os.getenv('DEBOUNCE_WINDOW', '1.5'))
+    DEBOUNCE_MAX_WAIT: float = float(os.getenv('DEBOUNCE_MAX_WAIT', '6'))
+    DEBOUNCE_MAX_MESSAGES: int = int(os.getenv('DEBOUNCE_MAX_MESSAGES', '8'))
+
+    # In-memory conversation history: last N exchanges per user; users idle longer
+    # than CONVERSATION_IDLE_TTL seconds (or least recently active ones once the
+    # memory cap is reached) are evicted and warm-started again when they return
+    CONVERSATION_HISTORY_TURNS: int = int(os.getenv('CONVERSATION_HISTORY_TURNS', '10'))
+    CONVERSATION_IDLE_TTL: float = float(os.getenv('CONVERSATION_IDLE_TTL', '7200'))
+    CONVERSATION_MEMORY_MAX_MB: float = float(os.getenv('CONVERSATION_MEMORY_MAX_MB', '64'))
+    # Conversation context is warm-started from {user_id}_history.json on a user's
+    # first turn after boot; optionally prefetch the most recently active users at
+    # startup (0 = only on demand)
+    HISTORY_PREFETCH_USERS: int = int(os.getenv('HISTORY_PREFETCH_USERS', '0'))
+    HISTORY_PREFETCH_MAX_AGE_HOURS: float = float(os.getenv('HISTORY_PREFETCH_MAX_AGE_HOURS', '24'))
+
+    # Max seconds each context stage (profile, relationships, mentions) may take
+    CONTEXT_STAGE_TIMEOUT: float = float(os.getenv('CONTEXT_STAGE_TIMEOUT', '3'))
+
+    # =========================================================================
+    # ANTI-SPAM
+    # =========================================================================
+    # Token buckets refilled per minute; 0 disables the channel/guild limits
+    SPAM_USER_MAX_PER_MINUTE: int = int(os.getenv('SPAM_USER_MAX_PER_MINUTE', '5'))
+    SPAM_COOLDOWN: int = int(os.getenv('SPAM_COOLDOWN', '30'))
+    SPAM_CHANNEL_MAX_PER_MINUTE: int = int(os.getenv('SPAM_CHANNEL_MAX_PER_MINUTE', '30'))
+    SPAM_GUILD_MAX_PER_MINUTE: int = int(os.getenv('SPAM_GUILD_MAX_PER_MINUTE', '120'))
+
+    # =========================================================================
+    # MESSAGE DEDUPLICATION
+    # =========================================================================
+    # Recently seen message ids are kept in a bounded ring with a TTL
+    DEDUP_MAX_ENTRIES: int = int(os.getenv('DEDUP_MAX_ENTRIES', '10000'))
+    DEDUP_TTL: float = float(os.getenv('DEDUP_TTL', '21600'))
+    # Optional Bloom filter in front of the ring for cheap negative checks
+    DEDUP_USE_BLOOM: bool = os.getenv('DEDUP_USE_BLOOM', '0') == '1'
+    DEDUP_BLOOM_FP_RATE: float = float(os.getenv('DEDUP_BLOOM_FP_RATE', '0.01'))
+
+    # =========================================================================
+    # LLM ADMISSION CONTROL
+    # =========================================================================
+    # Concurrent LLM generations; the rest wait up to LLM_QUEUE_TIMEOUT seconds
+    LLM_MAX_IN_FLIGHT: int = int(os.getenv('LLM_MAX_IN_FLIGHT', '2'))
+    LLM_MAX_QUEUE_DEPTH: int = int(os.getenv('LLM_MAX_QUEUE_DEPTH', '30'))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv('LLM_QUEUE_TIMEOUT', '45'))
+    # Queue depth at which each degradation stage kicks in (0 = disabled)
+    DEGRADE_SKIP_TYPING_DEPTH: int = int(os.getenv('DEGRADE_SKIP_TYPING_DEPTH', '3'))
+    DEGRADE_SHRINK_CONTEXT_DEPTH: int = int(os.getenv('DEGRADE_SHRINK_CONTEXT_DEPTH', '8'))
+    DEGRADE_BACKUP_PROVIDER_DEPTH: int = int(os.getenv('DEGRADE_BACKUP_PROVIDER_DEPTH', '15'))
+    # Weighted fair queueing of waiting LLM calls: each guild is one tenant,
+    # each DM user is a tenant of their own; higher weight = more turns
+    FAIR_GUILD_WEIGHT: float = float(os.getenv('FAIR_GUILD_WEIGHT', '1.0'))
+    FAIR_DM_WEIGHT: float = float(os.getenv('FAIR_DM_WEIGHT', '1.0'))
+    FAIR_PREMIUM_WEIGHT: float = float(os.getenv('FAIR_PREMIUM_WEIGHT', '3.0'))
+    PREMIUM_GUILD_IDS: list[str] = [g.strip() for g in os.getenv('PREMIUM_GUILD_IDS', '').split(',') if g.strip()]
+
+    # =========================================================================
+    # SHARED STATE
+    # =========================================================================
+    # Address of scripts/state_server.py (unix socket path or host:port). When set,
+    # conversation locks, anti-spam buckets and message dedup are shared by every
+    # bot process using it; empty = process-local state.
+    STATE_SERVER: str = os.getenv('STATE_SERVER', '')
+    STATE_SERVER_TIMEOUT: float = float(os.getenv('STATE_SERVER_TIMEOUT', '0.5'))
+    # A lock held by a hung process expires after this many seconds
+    CONVERSATION_LEASE_TTL: float = float(os.getenv('CONVERSATION_LEASE_TTL', '120'))
+    # Seconds between checks for a lock held by another process to be released
+    CONVERSATION_LEASE_POLL: float = float(os.getenv('CONVERSATION_LEASE_POLL', '1'))
+
+    # =========================================================================
+    # RELATIONSHIP EXTRACTION
+    # =========================================================================
+    # Messages are buffered per guild and sent to the LLM in batches
+    RELATIONSHIP_BATCH_SIZE: int = int(os.getenv('RELATIONSHIP_BATCH_SIZE', '20'))
+    RELATIONSHIP_BATCH_INTERVAL: float = float(os.getenv('RELATIONSHIP_BATCH_INTERVAL', '300'))
+    RELATIONSHIP_MIN_CONFIDENCE: float = float(os.getenv('RELATIONSHIP_MIN_CONFIDENCE', '0.5'))
+    # Write-behind: dirty relationship files are flushed at most once per delay
+    RELATIONSHIP_FLUSH_DELAY: float = float(os.getenv('RELATIONSHIP_FLUSH_DELAY', '5'))
+    # server_relationships.json is rebuilt on !server_relationships when older than this (seconds)
+    SERVER_SUMMARY_MAX_AGE: float = float(os.getenv('SERVER_SUMMARY_MAX_AGE', '300'))
+    # Recent mention contexts kept per (from, to) pair; counts are unbounded
+    INTERACTION_CONTEXT_RING: int = int(os.getenv('INTERACTION_CONTEXT_RING', '20'))
+    # Members referred to by name (no @mention) are recorded as weak 'name_reference' interactions
+    NAME_REFERENCES_ENABLED: bool = os.getenv('NAME_REFERENCES_ENABLED', '1') == '1'
+    # New names are matched from a small overlay until this many accumulate, then the automaton is rebuilt
+    NAME_MATCH_REBUILD_THRESHOLD: int = int(os.getenv('NAME_MATCH_REBUILD_THRESHOLD', '256'))
+
+    # =========================================================================
+    # SHUTDOWN
+    # =========================================================================
+    # Seconds to finish accepted replies and background jobs on shutdown; dirty
+    # data is flushed after that regardless. Keep below the supervisor's stop
+    # timeout (30s in scripts/launch_shards.py).
+    SHUTDOWN_TIMEOUT: float = float(os.getenv('SHUTDOWN_TIMEOUT', '20'))
+
+    # =========================================================================
+    # MONITORING
+    # =========================================================================
+    # Event-loop lag sampling; stalls longer than the threshold are logged with
+    # the blocking stack (see !loop_lag)
+    LOOP_MONITOR_ENABLED: bool = os.getenv('LOOP_MONITOR_ENABLED', '1') == '1'
+    LOOP_LAG_INTERVAL: float = float(os.getenv('LOOP_LAG_INTERVAL', '0.5'))
+    LOOP_STALL_THRESHOLD: float = float(os.getenv('LOOP_STALL_THRESHOLD', '0.25'))
+    LOOP_STALL_HISTORY: int = int(os.getenv('LOOP_STALL_HISTORY', '20'))
+
     @classmethod
     def validate(cls):
         """Validate critical configuration"""
@@ -63,3 +216,8 @@ class Config:
             raise ValueError("Missing DISCORD_LLM_BOT_TOKEN in environment variables")
         if not cls.GEMINI_API_KEY and not cls.USE_OLLAMA_BACKUP:
             raise ValueError("Missing GEMINI_API_KEY and Ollama backup is disabled")
+        if cls.SHARD_IDS:
+            if not cls.SHARD_COUNT:
+                raise ValueError("SHARD_IDS requires SHARD_COUNT")
+            if cls.SHARD_IDS[-1] >= cls.SHARD_COUNT:
+                raise ValueError(f"SHARD_IDS must be below SHARD_COUNT ({cls.SHARD_COUNT})")
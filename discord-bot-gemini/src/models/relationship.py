@@ -0,0 +1,269 @@
+import sys
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from utils.helpers import iso_to_epoch, epoch_to_iso
+
+# Converts a user id from JSON (str) into its interned int form
+InternFunc = Callable[[object], Optional[int]]
+
+# Interaction type of a member named without an @mention (counted apart from mentions)
+NAME_REFERENCE = 'name_reference'
+
+
+def _id_str(user_id: Optional[int]) -> str:
+    return str(user_id) if user_id is not None else ""
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def intern_reporter(reported_by, intern: InternFunc) -> Union[int, str, None]:
+    """Interned int for a user id; other reporters (e.g. 'llm') are kept as strings."""
+    user_id = intern(reported_by)
+    if user_id is not None or reported_by is None or reported_by == '':
+        return user_id
+    return sys.intern(str(reported_by))
+
+
+class InteractionRecord:
+    """
+    Directed interaction counter between two users (one cell of the mention matrix).
+
+    The (from_user, to_user) ids are the matrix coordinates in RelationshipService
+    and are not repeated on the record. `count` is the lifetime number of
+    mentions and `name_references` that of weaker by-name references. Only the
+    most recent mentions are kept, in a fixed-size ring stored column-wise
+    (types / timestamps / contexts) so adding an event is O(1); name references
+    are only counted, so they never evict mention contexts.
+    Attributes:
+        count (int): Total number of mentions ever recorded.
+        name_references (int): Total number of name references ever recorded.
+        head (int): Ring index of the oldest event once the ring is full.
+        types (List[str]): Interaction type per kept event (e.g. 'mention').
+        timestamps (array): Epoch seconds per kept event.
+        contexts (List[str]): Short message excerpt per kept event.
+    """
+    __slots__ = ('count', 'name_references', 'head', 'types', 'timestamps', 'contexts')
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.name_references: int = 0
+        self.head: int = 0
+        self.types: List[str] = []
+        self.timestamps: array = array('d')
+        self.contexts: List[str] = []
+
+    def add(self, type: str, timestamp: float, context: str, ring_size: int) -> None:
+        """Count one interaction and keep its context in the ring (overwrites the oldest when full)."""
+        if type == NAME_REFERENCE:
+            self.name_references += 1
+            return
+        self.count += 1
+        if len(self.types) < ring_size:
+            self.types.append(sys.intern(type))
+            self.timestamps.append(timestamp)
+            self.contexts.append(context)
+            return
+        i = self.head
+        self.types[i] = sys.intern(type)
+        self.timestamps[i] = timestamp
+        self.contexts[i] = context
+        self.head = (i + 1) % len(self.types)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def event_dicts(self) -> List[dict]:
+        """Kept events, oldest first."""
+        order = list(range(self.head, len(self.types))) + list(range(self.head))
+        return [
+            {'type': self.types[i], 'timestamp': epoch_to_iso(self.timestamps[i]), 'context': self.contexts[i]}
+            for i in order
+        ]
+
+    @classmethod
+    def from_dict(cls, data: dict, ring_size: int) -> "InteractionRecord":
+        record = cls()
+        events = data.get('interactions', [])
+        # Older files also kept name references in the ring: count them, keep mentions only
+        references = sum(1 for event in events if event.get('type') == NAME_REFERENCE)
+        mentions = [event for event in events if event.get('type') != NAME_REFERENCE]
+        for event in mentions[-ring_size:]:
+            record.types.append(sys.intern(event.get('type', '')))
+            record.timestamps.append(iso_to_epoch(event.get('timestamp')))
+            record.contexts.append(event.get('context', ''))
+        # Files written before the counters existed only have the event list
+        record.count = max(int(data.get('count', 0) or 0), len(mentions))
+        record.name_references = max(int(data.get('name_references', 0) or 0), references)
+        return record
+
+    def to_dict(self, from_user: int, to_user: int) -> dict:
+        return {
+            'from_user': _id_str(from_user),
+            'to_user': _id_str(to_user),
+            'count': self.count,
+            'name_references': self.name_references,
+            'interactions': self.event_dicts()
+        }
+
+
+class ConversationMessage:
+    """
+    A message recorded in a group conversation thread.
+    Attributes:
+        author_id (int): Interned id of the author.
+        message (str): Message content (truncated).
+        mentioned_users (Tuple[int, ...]): Interned ids of mentioned users.
+        channel_id (Optional[int]): Channel the message was sent in.
+        timestamp (float): Epoch seconds.
+    """
+    __slots__ = ('author_id', 'message', 'mentioned_users', 'channel_id', 'timestamp')
+
+    def __init__(self, author_id: int, message: str, mentioned_users: Tuple[int, ...],
+                 channel_id: Optional[int], timestamp: float) -> None:
+        self.author_id: int = author_id
+        self.message: str = message
+        self.mentioned_users: Tuple[int, ...] = mentioned_users
+        self.channel_id: Optional[int] = channel_id
+        self.timestamp: float = timestamp
+
+    @classmethod
+    def from_dict(cls, data: dict, intern: InternFunc, intern_channel: InternFunc) -> Optional["ConversationMessage"]:
+        author_id = intern(data.get('author_id'))
+        if author_id is None:
+            return None
+        mentioned = tuple(m for m in (intern(u) for u in data.get('mentioned_users', [])) if m is not None)
+        return cls(
+            author_id,
+            data.get('message', ''),
+            mentioned,
+            intern_channel(data.get('channel_id')),
+            iso_to_epoch(data.get('timestamp'))
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'author_id': _id_str(self.author_id),
+            'message': self.message,
+            'mentioned_users': [_id_str(u) for u in self.mentioned_users],
+            'channel_id': _id_str(self.channel_id) or None,
+            'timestamp': epoch_to_iso(self.timestamp)
+        }
+
+
+class ConversationThread:
+    """
+    Messages exchanged by a fixed group of participants.
+    Attributes:
+        participants (Tuple[int, ...]): Sorted interned participant ids (also the dict key).
+        messages (List[ConversationMessage]): Recent messages.
+    """
+    __slots__ = ('participants', 'messages')
+
+    def __init__(self, participants: Tuple[int, ...], messages: Optional[List[ConversationMessage]] = None) -> None:
+        self.participants: Tuple[int, ...] = participants
+        self.messages: List[ConversationMessage] = messages if messages is not None else []
+
+    @classmethod
+    def from_dict(cls, data: dict, intern: InternFunc, intern_channel: InternFunc) -> Optional["ConversationThread"]:
+        participants = tuple(sorted(p for p in (intern(u) for u in data.get('participants', [])) if p is not None))
+        if not participants:
+            return None
+        messages = [
+            m for m in (ConversationMessage.from_dict(d, intern, intern_channel) for d in data.get('messages', [])) if m
+        ]
+        return cls(participants, messages)
+
+    def key(self) -> str:
+        """JSON key for this thread."""
+        return "_".join(_id_str(p) for p in self.participants)
+
+    def to_dict(self) -> dict:
+        return {
+            'participants': [_id_str(p) for p in self.participants],
+            'messages': [m.to_dict() for m in self.messages]
+        }
+
+
+class RelationshipEntry:
+    """
+    One reported state of a relationship.
+    Attributes:
+        type (str): Relationship type (e.g. 'bạn thân').
+        reported_by (Union[int, str, None]): Interned id of the reporting user, or a
+            non-user reporter string such as 'llm'.
+        context (str): Evidence excerpt.
+        confidence (float): 0.0 - 1.0.
+        timestamp (float): Epoch seconds.
+    """
+    __slots__ = ('type', 'reported_by', 'context', 'confidence', 'timestamp')
+
+    def __init__(self, type: str, reported_by: Union[int, str, None], context: str, confidence: float, timestamp: float) -> None:
+        self.type: str = type
+        self.reported_by: Union[int, str, None] = reported_by
+        self.context: str = context
+        self.confidence: float = confidence
+        self.timestamp: float = timestamp
+
+    @classmethod
+    def from_dict(cls, data: dict, intern: InternFunc) -> "RelationshipEntry":
+        return cls(
+            data.get('type', ''),
+            intern_reporter(data.get('reported_by'), intern),
+            data.get('context', ''),
+            _to_float(data.get('confidence')),
+            iso_to_epoch(data.get('timestamp'))
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'type': self.type,
+            'reported_by': _id_str(self.reported_by),
+            'context': self.context,
+            'confidence': self.confidence,
+            'timestamp': epoch_to_iso(self.timestamp)
+        }
+
+
+class RelationshipRecord:
+    """
+    Relationship between two people, identified by name.
+    Attributes:
+        person1 (str): First person (sorted by lowercase name).
+        person2 (str): Second person.
+        history (List[RelationshipEntry]): Reported relationship states, oldest first.
+    """
+    __slots__ = ('person1', 'person2', 'history')
+
+    def __init__(self, person1: str, person2: str, history: Optional[List[RelationshipEntry]] = None) -> None:
+        self.person1: str = person1
+        self.person2: str = person2
+        self.history: List[RelationshipEntry] = history if history is not None else []
+
+    @classmethod
+    def from_dict(cls, data: dict, intern: InternFunc) -> "RelationshipRecord":
+        history = [RelationshipEntry.from_dict(e, intern) for e in data.get('relationship_history', [])]
+        return cls(data.get('person1', ''), data.get('person2', ''), history)
+
+    def to_dict(self) -> dict:
+        return {
+            'person1': self.person1,
+            'person2': self.person2,
+            'relationship_history': [e.to_dict() for e in self.history]
+        }
+
+
+def load_records(raw: Dict[str, dict], factory: Callable[[dict], Optional[object]]) -> List[object]:
+    """Convert the values of a JSON dict into records, skipping invalid entries."""
+    records = []
+    for data in raw.values():
+        if not isinstance(data, dict):
+            continue
+        record = factory(data)
+        if record is not None:
+            records.append(record)
+    return records
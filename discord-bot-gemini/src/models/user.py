@@ -1,19 +1,38 @@
-from typing import Optional
+from typing import List, Optional
+from utils.helpers import iso_to_epoch, epoch_to_iso
 
 class User:
     """
     Data model for a Discord user.
     Attributes:
-        user_id (str): Unique identifier for the user.
+        user_id (int): Unique identifier for the user (interned int, see UserIdInterner).
         username (str): Username of the user.
         age (Optional[int]): Age of the user.
         birthday (Optional[str]): Birthday of the user.
+        display_name (Optional[str]): Server display name / nickname.
+        real_name (Optional[str]): Real name the user told the bot.
+        name_history (List[str]): Usernames seen for this user.
+        first_seen (float): Epoch seconds of first sighting.
+        last_updated (float): Epoch seconds of last name update.
     """
-    def __init__(self, user_id: str, username: str, age: Optional[int] = None, birthday: Optional[str] = None) -> None:
-        self.user_id: str = user_id
+    # __slots__ keeps one record per user small; large guilds hold tens of thousands
+    __slots__ = (
+        'user_id', 'username', 'age', 'birthday',
+        'display_name', 'real_name', 'name_history', 'first_seen', 'last_updated'
+    )
+
+    def __init__(self, user_id: int, username: str, age: Optional[int] = None, birthday: Optional[str] = None,
+                 display_name: Optional[str] = None, real_name: Optional[str] = None,
+                 name_history: Optional[List[str]] = None, first_seen: float = 0.0, last_updated: float = 0.0) -> None:
+        self.user_id: int = user_id
         self.username: str = username
         self.age: Optional[int] = age
         self.birthday: Optional[str] = birthday
+        self.display_name: Optional[str] = display_name
+        self.real_name: Optional[str] = real_name
+        self.name_history: List[str] = name_history if name_history is not None else [username]
+        self.first_seen: float = first_seen
+        self.last_updated: float = last_updated
 
     def __repr__(self) -> str:
         return f"User(user_id={self.user_id}, username={self.username}, age={self.age}, birthday={self.birthday})"
@@ -26,11 +45,40 @@ class User:
         """Update the user's birthday."""
         self.birthday = new_birthday
 
+    def best_name(self) -> str:
+        """Best name to address the user by (real name > display name > username)."""
+        return self.real_name or self.display_name or self.username
+
     def to_dict(self) -> dict:
         """Convert the user object to a dictionary."""
         return {
-            "user_id": self.user_id,
+            "user_id": str(self.user_id),
             "username": self.username,
             "age": self.age,
             "birthday": self.birthday
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def from_name_record(cls, user_id: int, record: dict) -> "User":
+        """Build a user from a user_names.json entry."""
+        username = record.get('username') or ''
+        return cls(
+            user_id,
+            username,
+            display_name=record.get('display_name'),
+            real_name=record.get('real_name'),
+            name_history=list(record.get('name_history') or [username]),
+            first_seen=iso_to_epoch(record.get('first_seen')),
+            last_updated=iso_to_epoch(record.get('last_updated'))
+        )
+
+    def to_name_record(self) -> dict:
+        """Convert to the user_names.json entry format."""
+        return {
+            'username': self.username,
+            'display_name': self.display_name,
+            'real_name': self.real_name,
+            'name_history': list(self.name_history),
+            'first_seen': epoch_to_iso(self.first_seen),
+            'last_updated': epoch_to_iso(self.last_updated)
+        }
@@ -0,0 +1,111 @@
+"""
+Circuit Breaker - Stops sending requests to a provider that keeps failing.
+
+closed     requests flow; LLM_BREAKER_FAILURES consecutive failures (or a
+           failed health probe) open the circuit.
+open       the provider is skipped without a request. After
+           LLM_BREAKER_RESET seconds, or as soon as a health probe succeeds,
+           the circuit goes half-open.
+half_open  one trial request is let through: success closes the circuit,
+           failure opens it again for another reset period.
+"""
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger('discord_bot.CircuitBreaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.skipped = 0
+        self.last_error = ""
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._half_open("reset timeout elapsed")
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a request would be let through (does not claim the half-open trial)."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight)
+
+    def acquire(self) -> bool:
+        """Claim permission for one request; False means skip this provider."""
+        if not self.available():
+            self.skipped += 1
+            return False
+        if self._state == HALF_OPEN:
+            self._trial_in_flight = True
+        return True
+
+    def release(self):
+        """The request was cancelled before it had an outcome."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> bool:
+        """Returns True if this closed the circuit (the provider recovered)."""
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        if self._state == CLOSED:
+            return False
+        self._state = CLOSED
+        logger.info(f"🟢 {self.name} circuit closed, provider recovered")
+        return True
+
+    def record_failure(self, error: BaseException):
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if self._state == HALF_OPEN:
+            self._open(f"trial request failed: {error}")
+        elif self._state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open(f"{self.consecutive_failures} consecutive failures, last: {error}")
+
+    def record_probe(self, error: Optional[BaseException] = None):
+        """Result of a background health probe (None = healthy)."""
+        if error is None:
+            if self._state == OPEN:
+                self._half_open("health probe succeeded")
+            return
+        self.last_error = str(error)
+        if self._state != OPEN:
+            self._trial_in_flight = False
+            self._open(f"health probe failed: {error}")
+        else:
+            # Still down: keep skipping it for another reset period
+            self._opened_at = time.monotonic()
+
+    def _open(self, reason: str):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"🔴 {self.name} circuit open for {self.reset_timeout:.0f}s ({reason})")
+
+    def _half_open(self, reason: str):
+        self._state = HALF_OPEN
+        self._trial_in_flight = False
+        logger.info(f"🟡 {self.name} circuit half-open ({reason}), next request is a trial")
+
+    def get_stats(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened,
+            'skipped': self.skipped,
+            'last_error': self.last_error,
+        }
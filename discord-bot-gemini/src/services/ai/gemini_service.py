@@ -1,8 +1,16 @@
 import os
+import json
 import aiohttp
 import logging
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from config.settings import Config
+from services.ai.provider_errors import (
+    ProviderResponseError,
+    ProviderUnavailable,
+    translate_errors,
+)
+from services.ai.response_stream import ResponseStream
+from utils.text_processing import clean_response, process_response
 
 class GeminiService:
     def __init__(self):
@@ -31,10 +39,10 @@ class GeminiService:
             self.session = aiohttp.ClientSession()
         return self.session
 
-    async def generate_response(self, prompt: str, user_id: Optional[str] = None, conversation_context: str = "") -> str:
+    async def generate_response(self, prompt: str, user_id: Optional[str] = None, conversation_context: str = "") -> Tuple[str, bool]:
         if not self.api_key:
             self.logger.error("Gemini API key not found")
-            return "Error: API key not configured."
+            raise ProviderUnavailable("Gemini", "API key not configured")
 
         session = await self._get_session()
         
@@ -58,33 +66,117 @@ class GeminiService:
             }
         }
 
-        try:
-            self.logger.debug(f"Sending request to Gemini API with full prompt: {full_prompt[:100]}...")
+        self.logger.debug(f"Sending request to Gemini API with full prompt: {full_prompt[:100]}...")
+        with translate_errors("Gemini"):
             async with session.post(full_url, json=payload, headers={
                 'Content-Type': 'application/json'
-            }) as response:
+            }, timeout=aiohttp.ClientTimeout(total=60)) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     self.logger.error(f"Gemini API error: {error_text}")
-                    return "Error generating response."
-                
+                    raise ProviderResponseError("Gemini", f"API returned {response.status}", response.status)
+
                 response_data = await response.json()
-                
-                # Extract the text from the response
-                if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                    candidate = response_data['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        parts = candidate['content']['parts']
-                        if len(parts) > 0 and 'text' in parts[0]:
-                            return parts[0]['text']
-                
-                self.logger.error(f"Unexpected response format: {response_data}")
-                return "Error: Unexpected response format."
-                
-        except Exception as e:
-            self.logger.error(f"Error communicating with Gemini API: {e}")
-            return "Error generating response."
-    
+
+        text = self._response_text(response_data)
+        if text is None:
+            self.logger.error(f"Unexpected response format: {response_data}")
+            raise ProviderResponseError("Gemini", "unexpected response format")
+        # Same contract as Ollama: INFO tag stripped, importance reported
+        return process_response(text)
+
+    def _response_text(self, response_data: dict) -> Optional[str]:
+        """Text of the first candidate of a GenerateContentResponse, if any"""
+        if 'candidates' in response_data and len(response_data['candidates']) > 0:
+            candidate = response_data['candidates'][0]
+            if 'content' in candidate and 'parts' in candidate['content']:
+                parts = candidate['content']['parts']
+                if len(parts) > 0 and 'text' in parts[0]:
+                    return parts[0]['text']
+        return None
+
+    async def probe(self) -> None:
+        """Health check via the model metadata endpoint; raises a ProviderError if Gemini is unusable"""
+        if not self.api_key:
+            raise ProviderUnavailable("Gemini", "API key not configured")
+        session = await self._get_session()
+        with translate_errors("Gemini"):
+            async with session.get(
+                f"{self.api_url}/{self.model}?key={self.api_key}",
+                timeout=aiohttp.ClientTimeout(total=Config.LLM_PROBE_TIMEOUT),
+            ) as response:
+                if response.status != 200:
+                    raise ProviderResponseError("Gemini", f"model lookup returned {response.status}", response.status)
+
+    def stream_response(self, prompt: str, user_id: Optional[str] = None, conversation_context: str = "") -> ResponseStream:
+        """
+        Start a streaming generation via streamGenerateContent (SSE).
+
+        Same interface as OllamaService.stream_response: the ResponseStream
+        yields message parts as they complete; failures end the stream and
+        are kept in `stream.error`.
+        """
+        full_prompt = self._build_full_prompt(prompt, user_id, conversation_context)
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": full_prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 1000,
+                "topP": 0.95,
+                "topK": 64
+            }
+        }
+        return ResponseStream(self._stream_chunks(payload), clean=clean_response, provider="Gemini")
+
+    async def _stream_chunks(self, payload: dict) -> AsyncIterator[str]:
+        """Read the SSE stream: each `data:` event is a partial GenerateContentResponse"""
+        if not self.api_key:
+            raise ProviderUnavailable("Gemini", "API key not configured")
+
+        session = await self._get_session()
+        full_url = f"{self.api_url}/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+
+        with translate_errors("Gemini"):
+            async with session.post(full_url, json=payload, headers={
+                'Content-Type': 'application/json'
+            }, timeout=timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    self.logger.error(f"Gemini API error: {error_text}")
+                    raise ProviderResponseError("Gemini", f"API returned {response.status}", response.status)
+
+                data_lines: List[str] = []
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').rstrip('\r\n')
+                    if line.startswith('data:'):
+                        data_lines.append(line[5:].lstrip())
+                        continue
+                    if line or not data_lines:
+                        continue  # comments, other fields, keep-alive blank lines
+                    # A blank line ends the event
+                    event, data_lines = json.loads("\n".join(data_lines)), []
+                    for text in self._event_texts(event):
+                        yield text
+
+                if data_lines:
+                    for text in self._event_texts(json.loads("\n".join(data_lines))):
+                        yield text
+
+    def _event_texts(self, event: dict) -> List[str]:
+        if 'error' in event:
+            raise ProviderResponseError("Gemini", f"stream error: {event['error'].get('message', event['error'])}")
+        texts: List[str] = []
+        for candidate in event.get('candidates', [])[:1]:
+            for part in candidate.get('content', {}).get('parts', []):
+                if part.get('text'):
+                    texts.append(part['text'])
+        return texts
+
     def _build_full_prompt(self, user_message: str, user_id: Optional[str] = None, conversation_context: str = "") -> str:
         """Build complete prompt with personality, conversation guidelines, and context"""
         prompt_parts: List[str] = []
@@ -123,6 +215,8 @@ class GeminiService:
     async def close(self) -> None:
         if self.session:
             await self.session.close()
+            self.session = None
+            self.logger.info("🔒 Gemini session closed")
 
     async def generate_summary(self, prompt: str) -> str:
         """
@@ -131,7 +225,7 @@ class GeminiService:
         """
         if not self.api_key:
             self.logger.error("Gemini API key not found")
-            return "Error: API key not configured."
+            raise ProviderUnavailable("Gemini", "API key not configured")
 
         session = await self._get_session()
         
@@ -152,97 +246,21 @@ class GeminiService:
             }
         }
 
-        try:
-            self.logger.debug(f"Generating summary with prompt: {prompt[:100]}...")
+        self.logger.debug(f"Generating summary with prompt: {prompt[:100]}...")
+        with translate_errors("Gemini"):
             async with session.post(full_url, json=payload, headers={
                 'Content-Type': 'application/json'
-            }) as response:
+            }, timeout=aiohttp.ClientTimeout(total=60)) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     self.logger.error(f"Gemini API error for summary: {error_text}")
-                    return "Error generating summary."
-                
+                    raise ProviderResponseError("Gemini", f"API returned {response.status}", response.status)
+
                 response_data = await response.json()
-                
-                # Extract the text from the response
-                if 'candidates' in response_data and len(response_data['candidates']) > 0:
-                    candidate = response_data['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        parts = candidate['content']['parts']
-                        if len(parts) > 0 and 'text' in parts[0]:
-                            self.logger.info("✅ Summary generated successfully")
-                            return parts[0]['text']
-                
-                self.logger.error(f"Unexpected response format for summary: {response_data}")
-                return "Error: Unexpected response format."
-                
-        except Exception as e:
-            self.logger.error(f"Error generating summary: {e}")
-            return "Error generating summary."
-
-    def split_response_into_parts(self, response: str) -> List[str]:
-        """Split response into multiple natural parts for sequential sending"""
-        import re
-        
-        # Remove extra whitespace
-        response = response.strip()
-        
-        # Split by natural breaks (sentences, questions, exclamations)
-        parts = re.split(r'([.!?]+\s*)', response)
-        
-        # Combine sentence with its punctuation
-        combined_parts: List[str] = []
-        for i in range(0, len(parts), 2):
-            if i + 1 < len(parts):
-                part = (parts[i] + parts[i + 1]).strip()
-            else:
-                part = parts[i].strip()
-            
-            if part:
-                combined_parts.append(part)
-        
-        # If no natural splits found, split by length
-        if len(combined_parts) <= 1 and len(response) > 100:
-            # Split by commas or natural pauses
-            parts = re.split(r'([,;]\s*)', response)
-            combined_parts = []
-            current_part = ""
-            
-            for part in parts:
-                if len(current_part + part) < 80:
-                    current_part += part
-                else:
-                    if current_part.strip():
-                        combined_parts.append(current_part.strip())
-                    current_part = part
-            
-            if current_part.strip():
-                combined_parts.append(current_part.strip())
-        
-        # Ensure no part is too long (max 200 chars)
-        final_parts: List[str] = []
-        for part in combined_parts:
-            if len(part) > 200:
-                # Split long parts by words
-                words = part.split()
-                current_chunk = ""
-                
-                for word in words:
-                    if len(current_chunk + " " + word) < 200:
-                        current_chunk += (" " + word) if current_chunk else word
-                    else:
-                        if current_chunk:
-                            final_parts.append(current_chunk.strip())
-                        current_chunk = word
-                
-                if current_chunk:
-                    final_parts.append(current_chunk.strip())
-            else:
-                final_parts.append(part)
-        
-        # Ensure we have at least one part
-        if not final_parts:
-            final_parts = [response]
-        
-        self.logger.debug(f"Split response into {len(final_parts)} parts")
-        return final_parts
\ No newline at end of file
+
+        text = self._response_text(response_data)
+        if text is None:
+            self.logger.error(f"Unexpected response format for summary: {response_data}")
+            raise ProviderResponseError("Gemini", "unexpected response format")
+        self.logger.info("✅ Summary generated successfully")
+        return text
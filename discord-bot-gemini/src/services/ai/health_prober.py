@@ -0,0 +1,66 @@
+"""
+Health Prober - Background health checks for the LLM providers.
+
+Every LLM_PROBE_INTERVAL seconds each provider's cheap health endpoint is
+called (Ollama: GET /api/tags, which also shows whether the model is
+pulled; Gemini: the model metadata). A failed probe opens the provider's
+circuit before any user request has to find out the hard way; a probe that
+succeeds on an open circuit lets the next request through as a trial.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from config.settings import Config
+
+logger = logging.getLogger('discord_bot.HealthProber')
+
+
+class HealthProber:
+    def __init__(self, router, interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.router = router
+        self.interval = Config.LLM_PROBE_INTERVAL if interval is None else interval
+        self.timeout = Config.LLM_PROBE_TIMEOUT if timeout is None else timeout
+        self._task: Optional[asyncio.Task] = None
+        self.probes = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"🩺 Probing LLM providers every {self.interval:.0f}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        providers = [p for p in self.router.providers if hasattr(p.service, 'probe')]
+        await asyncio.gather(*(self._probe(p) for p in providers))
+
+    async def _probe(self, provider):
+        self.probes += 1
+        try:
+            await asyncio.wait_for(provider.service.probe(), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.debug(f"🩺 {provider.name} probe failed: {e}")
+            provider.breaker.record_probe(e if str(e) else TimeoutError(f"no answer within {self.timeout}s"))
+            return
+        provider.breaker.record_probe(None)
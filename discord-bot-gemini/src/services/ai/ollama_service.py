@@ -1,8 +1,15 @@
+import json
 import aiohttp
-import asyncio
 import logging
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from config.settings import Config
+from services.ai.provider_errors import (
+    ProviderResponseError,
+    ProviderUnavailable,
+    translate_errors,
+)
+from services.ai.response_stream import ResponseStream
+from utils.text_processing import clean_response, process_response
 
 
 class OllamaService:
@@ -51,6 +58,9 @@ class OllamaService:
 
         Returns:
             Tuple of (generated response text, is_important_info flag)
+
+        Raises:
+            ProviderError: Ollama is unreachable, timed out or gave no usable text
         """
         session = await self._get_session()
 
@@ -60,24 +70,12 @@ class OllamaService:
         # Ollama API endpoint
         api_endpoint = f"{self.api_url}/api/generate"
 
-        payload = {
-            "model": self.model,
-            "prompt": full_prompt,
-            "stream": False,  # No streaming for simpler implementation
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 40,
-                "num_predict": 1000,  # Max tokens
-                "num_ctx": 8192,  # Tăng context window để đọc được lịch sử hội thoại
-            },
-        }
-
-        try:
-            self.logger.debug(
-                f"Sending request to Ollama API with prompt: {full_prompt[:100]}..."
-            )
+        payload = self._build_payload(full_prompt, stream=False)
 
+        self.logger.debug(
+            f"Sending request to Ollama API with prompt: {full_prompt[:100]}..."
+        )
+        with translate_errors("Ollama"):
             async with session.post(
                 api_endpoint, json=payload, timeout=aiohttp.ClientTimeout(total=60)
             ) as response:
@@ -86,72 +84,107 @@ class OllamaService:
                     self.logger.error(
                         f"Ollama API error ({response.status}): {error_text}"
                     )
-                    return (
-                        "Error: Ollama API không phản hồi. Kiểm tra xem Ollama có đang chạy không (ollama serve).",
-                        False,
+                    raise ProviderResponseError(
+                        "Ollama", f"API returned {response.status}", response.status
                     )
 
                 response_data = await response.json()
 
-                # Extract response text from Ollama format
-                if "response" in response_data:
-                    generated_text = response_data["response"].strip()
-                    if generated_text:
-                        # Parse INFO tag and clean response
-                        cleaned_text, is_important = self._parse_info_tag(
-                            generated_text
-                        )
-                        cleaned_text = self._clean_response(cleaned_text)
-                        self.logger.debug(
-                            f"✅ Ollama response: {cleaned_text[:50]}... (important={is_important})"
-                        )
-                        return (cleaned_text, is_important)
-                    else:
-                        self.logger.warning("Empty response from Ollama")
-                        return ("Xin lỗi, tôi không thể tạo phản hồi.", False)
-
-                self.logger.error(f"Unexpected Ollama response format: {response_data}")
-                return ("Error: Unexpected response format from Ollama.", False)
-
-        except aiohttp.ClientConnectorError as e:
-            self.logger.error(f"Cannot connect to Ollama: {e}")
-            return (
-                "Error: Không thể kết nối đến Ollama. Đảm bảo Ollama đang chạy (ollama serve).",
-                False,
-            )
-        except asyncio.TimeoutError:
-            self.logger.error("Ollama API timeout")
-            return ("Error: Ollama response timeout (>60s).", False)
-        except Exception as e:
-            self.logger.error(f"Error communicating with Ollama API: {e}")
-            return (f"Error: {str(e)}", False)
-
-    def _parse_info_tag(self, text: str) -> tuple[str, bool]:
+        # Extract response text from Ollama format
+        if "response" not in response_data:
+            self.logger.error(f"Unexpected Ollama response format: {response_data}")
+            raise ProviderResponseError("Ollama", "unexpected response format")
+
+        generated_text = response_data["response"].strip()
+        if not generated_text:
+            self.logger.warning("Empty response from Ollama")
+            raise ProviderResponseError("Ollama", "empty response")
+
+        # Strip INFO tag, prompt markers and emoji in one pass
+        cleaned_text, is_important = process_response(generated_text)
+        self.logger.debug(
+            f"✅ Ollama response: {cleaned_text[:50]}... (important={is_important})"
+        )
+        return (cleaned_text, is_important)
+
+    async def probe(self) -> None:
+        """Health check via GET /api/tags; raises a ProviderError if Ollama is down or the model is not pulled"""
+        session = await self._get_session()
+        with translate_errors("Ollama"):
+            async with session.get(
+                f"{self.api_url}/api/tags",
+                timeout=aiohttp.ClientTimeout(total=Config.LLM_PROBE_TIMEOUT),
+            ) as response:
+                if response.status != 200:
+                    raise ProviderResponseError(
+                        "Ollama", f"/api/tags returned {response.status}", response.status
+                    )
+                data = await response.json()
+
+        models = set()
+        for model in data.get("models", []):
+            models.update(filter(None, (model.get("name"), model.get("model"))))
+        if self.model not in models and f"{self.model}:latest" not in models:
+            raise ProviderUnavailable("Ollama", f"model {self.model} is not pulled")
+
+    def _build_payload(self, full_prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "top_k": 40,
+                "num_predict": 1000,  # Max tokens
+                "num_ctx": 8192,  # Tăng context window để đọc được lịch sử hội thoại
+            },
+        }
+
+    def stream_response(
+        self, prompt: str, user_id: Optional[str] = None, conversation_context: str = ""
+    ) -> ResponseStream:
         """
-        Parse and remove INFO tag from response.
+        Start a streaming generation.
 
-        Returns:
-            Tuple of (cleaned text without tag, is_important flag)
+        Returns a ResponseStream that yields cleaned message parts as soon as
+        each line/sentence is complete; errors end the stream and are kept in
+        `stream.error` instead of being returned as reply text.
         """
-        import re
-
-        # Check for [INFO:important] tag
-        if re.search(r"\[INFO:important\]", text, re.IGNORECASE):
-            cleaned = re.sub(
-                r"\s*\[INFO:important\]\s*", "", text, flags=re.IGNORECASE
-            ).strip()
-            self.logger.debug("📌 Detected important info in message")
-            return (cleaned, True)
-
-        # Check for [INFO:normal] tag
-        if re.search(r"\[INFO:normal\]", text, re.IGNORECASE):
-            cleaned = re.sub(
-                r"\s*\[INFO:normal\]\s*", "", text, flags=re.IGNORECASE
-            ).strip()
-            return (cleaned, False)
-
-        # No tag found - default to normal
-        return (text, False)
+        full_prompt = self._build_full_prompt(prompt, user_id, conversation_context)
+        payload = self._build_payload(full_prompt, stream=True)
+        return ResponseStream(
+            self._stream_chunks(payload), clean=clean_response, provider="Ollama"
+        )
+
+    async def _stream_chunks(self, payload: dict) -> AsyncIterator[str]:
+        """Read Ollama's NDJSON stream: one JSON object per line with a `response` piece"""
+        session = await self._get_session()
+        api_endpoint = f"{self.api_url}/api/generate"
+        # No total limit: long replies are fine as long as tokens keep coming
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+
+        with translate_errors("Ollama"):
+            async with session.post(api_endpoint, json=payload, timeout=timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    self.logger.error(f"Ollama API error ({response.status}): {error_text}")
+                    raise ProviderResponseError(
+                        "Ollama", f"API returned {response.status}", response.status
+                    )
+
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise ProviderResponseError("Ollama", f"stream error: {data['error']}")
+                    piece = data.get("response")
+                    if piece:
+                        yield piece
+                    if data.get("done"):
+                        break
 
     def _build_full_prompt(
         self,
@@ -190,50 +223,6 @@ class OllamaService:
         # generate_response returns tuple (text, is_important), extract text only
         return result[0] if isinstance(result, tuple) else result
 
-    def _clean_response(self, text: str) -> str:
-        """
-        Clean response by removing:
-        - Prompt markers (=== ... ===)
-        - Unicode emoji (chỉ giữ text emoticons)
-        """
-        import re
-
-        # Remove prompt section markers
-        markers = [
-            r"===\s*PHẢN HỒI CỦA BẠN\s*===",
-            r"===\s*TIN NHẮN CỦA NGƯỜI DÙNG\s*===",
-            r"===\s*NHÂN CÁCH\s*===",
-            r"===\s*HƯỚNG DẪN HỘI THOẠI\s*===",
-            r"===\s*BỐI CẢNH HỘI THOẠI\s*===",
-            r"===\s*[^=]+\s*===",  # Generic marker pattern
-        ]
-        for marker in markers:
-            text = re.sub(marker, "", text, flags=re.IGNORECASE)
-
-        # Remove Unicode emoji (keep ASCII emoticons like :) :v :3)
-        # This regex matches most emoji in Unicode ranges
-        emoji_pattern = re.compile(
-            "["
-            "\U0001f600-\U0001f64f"  # emoticons
-            "\U0001f300-\U0001f5ff"  # symbols & pictographs
-            "\U0001f680-\U0001f6ff"  # transport & map
-            "\U0001f1e0-\U0001f1ff"  # flags
-            "\U00002702-\U000027b0"  # dingbats
-            "\U0001f900-\U0001f9ff"  # supplemental symbols
-            "\U0001fa00-\U0001fa6f"  # chess symbols
-            "\U0001fa70-\U0001faff"  # symbols and pictographs extended
-            "\U00002600-\U000026ff"  # misc symbols
-            "]+",
-            flags=re.UNICODE,
-        )
-        text = emoji_pattern.sub("", text)
-
-        # Clean up extra whitespace
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        text = re.sub(r" {2,}", " ", text)
-
-        return text.strip()
-
     async def close(self):
         """Close aiohttp session"""
         if self.session:
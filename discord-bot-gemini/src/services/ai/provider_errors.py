@@ -0,0 +1,54 @@
+"""
+Provider Errors - Typed failures raised by the LLM provider services.
+
+Providers raise these instead of returning "Error: ..." strings, so callers
+(the provider router, its circuit breakers, summary and relationship jobs)
+can fall back or back off instead of sending the error text as a reply.
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
+
+import aiohttp
+
+
+class ProviderError(Exception):
+    """An LLM provider could not produce a response."""
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+
+class ProviderUnavailable(ProviderError):
+    """The provider cannot be reached, is not configured or lacks the model."""
+
+
+class ProviderTimeout(ProviderError):
+    """The provider did not answer in time."""
+
+
+class ProviderResponseError(ProviderError):
+    """The provider answered with an error status or an unusable body."""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(provider, message)
+        self.status = status
+
+
+@contextmanager
+def translate_errors(provider: str):
+    """Re-raise transport errors from the enclosed HTTP call as ProviderErrors."""
+    try:
+        yield
+    except ProviderError:
+        raise
+    except asyncio.TimeoutError as e:
+        raise ProviderTimeout(provider, "request timed out") from e
+    except aiohttp.ClientConnectorError as e:
+        raise ProviderUnavailable(provider, f"cannot connect ({e})") from e
+    except aiohttp.ClientError as e:
+        raise ProviderUnavailable(provider, f"{type(e).__name__}: {e}") from e
+    except (ValueError, KeyError) as e:
+        # Malformed JSON / NDJSON / SSE payloads
+        raise ProviderResponseError(provider, f"malformed response ({e})") from e
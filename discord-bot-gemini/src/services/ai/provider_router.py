@@ -0,0 +1,327 @@
+"""
+Provider Router - Picks the LLM provider for each reply and hedges slow ones.
+
+Every provider (Ollama, Gemini) keeps a sliding window of its latencies
+(full generations and, for streams, time to the first message part) and of
+its recent outcomes. A provider is healthy while its error rate stays under
+LLM_MAX_ERROR_RATE; healthy providers are tried fastest first (by p50) once
+each has enough samples, otherwise in configured order.
+
+If the first provider has not answered by its own p90 latency, the same
+request is sent to the next provider as well (a hedged request); whichever
+answers first wins and the other is cancelled. A provider that fails is
+replaced by the next one right away. Tail latency stays close to the
+faster provider's while the local model is busy.
+
+Each provider also has a circuit breaker (see circuit_breaker.py), fed by
+request outcomes and by the HealthProber: while it is open the provider is
+skipped without a request, so a dead backend costs nothing instead of a
+timeout per user.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from config.settings import Config
+from services.ai.circuit_breaker import HALF_OPEN, CircuitBreaker
+from services.ai.provider_errors import ProviderResponseError
+from services.ai.response_stream import ResponseStream
+
+logger = logging.getLogger('discord_bot.ProviderRouter')
+
+# Latency kinds: a full (non-streamed) generation, or time to a stream's first part
+FULL = 'full'
+FIRST_PART = 'first_part'
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ProviderStats:
+    """Sliding windows of latencies and outcomes for one provider."""
+
+    def __init__(self, window: int):
+        self.latencies: Dict[str, Deque[float]] = {
+            FULL: deque(maxlen=window),
+            FIRST_PART: deque(maxlen=window),
+        }
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.cancelled = 0
+
+    def record(self, kind: str, latency: Optional[float], ok: bool):
+        self.outcomes.append(ok)
+        if latency is not None:
+            self.latencies[kind].append(latency)
+        if not ok:
+            self.errors += 1
+
+    def reset_outcomes(self):
+        # Failures from before a recovery no longer say anything about health
+        self.outcomes.clear()
+
+    def record_cancelled(self, kind: str, elapsed: float):
+        # A cancelled loser took at least this long: keep it in the window so
+        # the percentiles are not biased towards the requests that won
+        self.cancelled += 1
+        self.latencies[kind].append(elapsed)
+
+    def samples(self, kind: str) -> int:
+        return len(self.latencies[kind])
+
+    def percentile(self, kind: str, pct: float) -> float:
+        return _percentile(sorted(self.latencies[kind]), pct)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        if len(self.outcomes) < Config.LLM_ROUTER_MIN_SAMPLES:
+            return True
+        return self.error_rate <= Config.LLM_MAX_ERROR_RATE
+
+
+class _Provider:
+    __slots__ = ('name', 'service', 'stats', 'breaker')
+
+    def __init__(self, name: str, service, window: int):
+        self.name = name
+        self.service = service
+        self.stats = ProviderStats(window)
+        self.breaker = CircuitBreaker(name, Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET)
+
+
+class ProviderRouter:
+    def __init__(self, providers: List[Tuple[str, object]]):
+        """`providers` in preference order; entries whose service is None are skipped."""
+        self.providers = [
+            _Provider(name, service, Config.LLM_LATENCY_WINDOW)
+            for name, service in providers
+            if service is not None
+        ]
+        self.hedge_enabled = Config.LLM_HEDGE_ENABLED and len(self.providers) > 1
+
+    @property
+    def names(self) -> List[str]:
+        return [p.name for p in self.providers]
+
+    # =========================================================================
+    # Ordering
+    # =========================================================================
+
+    def order(self, kind: str = FULL, prefer_backup: bool = False) -> List[_Provider]:
+        """Providers with a closed (or half-open) circuit; healthy ones first,
+        fastest first once every one has enough samples."""
+        available = [p for p in self.providers if p.breaker.available()]
+        # A half-open provider is due its trial request: do not rank it behind the others
+        healthy = [p for p in available if p.stats.healthy or p.breaker.state == HALF_OPEN]
+        unhealthy = [p for p in available if p not in healthy]
+        if all(p.stats.samples(kind) >= Config.LLM_ROUTER_MIN_SAMPLES for p in healthy):
+            healthy.sort(key=lambda p: p.stats.percentile(kind, 50))
+        ordered = healthy + unhealthy
+        # Under heavy load the local model is saturated: move it behind the others
+        if prefer_backup and len(ordered) > 1 and ordered[0] is self.providers[0]:
+            ordered.append(ordered.pop(0))
+        return ordered
+
+    def _hedge_delay(self, provider: _Provider, kind: str) -> float:
+        stats = provider.stats
+        if stats.samples(kind) < Config.LLM_ROUTER_MIN_SAMPLES:
+            return Config.LLM_HEDGE_MIN_DELAY
+        return max(Config.LLM_HEDGE_MIN_DELAY, stats.percentile(kind, Config.LLM_HEDGE_PERCENTILE))
+
+    # =========================================================================
+    # Requests
+    # =========================================================================
+
+    async def generate(
+        self, content: str, user_id: str, context: str, prefer_backup: bool = False
+    ) -> Tuple[Optional[str], bool]:
+        """Full reply as (text, is_important); (None, False) if every provider failed."""
+        result = await self._race(
+            self._candidates(FULL, prefer_backup),
+            FULL,
+            lambda provider: self._attempt_generate(provider, content, user_id, context),
+        )
+        return result if result is not None else (None, False)
+
+    async def start_stream(
+        self, content: str, user_id: str, context: str, prefer_backup: bool = False
+    ) -> Optional[ResponseStream]:
+        """First stream that produces a part, or None so the caller can fall back."""
+        return await self._race(
+            self._candidates(FIRST_PART, prefer_backup),
+            FIRST_PART,
+            lambda provider: self._attempt_stream(provider, content, user_id, context),
+        )
+
+    def _candidates(self, kind: str, prefer_backup: bool) -> List[_Provider]:
+        candidates = self.order(kind, prefer_backup)
+        for provider in self.providers:
+            if provider not in candidates:
+                provider.breaker.skipped += 1
+        if not candidates:
+            logger.warning("⛔ Every LLM provider circuit is open, not sending the request")
+        return candidates
+
+    async def _race(
+        self,
+        candidates: List[_Provider],
+        kind: str,
+        launch: Callable[[_Provider], Awaitable],
+    ):
+        """Run `launch` on the candidates in order: the next one starts when the
+        running one fails, or (once) when it is slower than its hedge delay."""
+        queue = list(candidates)
+        # task -> (provider, start time, started as a hedge)
+        running: Dict[asyncio.Task, Tuple[_Provider, float, bool]] = {}
+        hedged = False
+        try:
+            while queue or running:
+                if not running:
+                    provider = queue.pop(0)
+                    running[asyncio.create_task(launch(provider))] = (provider, time.monotonic(), False)
+
+                timeout = None
+                if self.hedge_enabled and not hedged and queue and len(running) == 1:
+                    (provider, started, _), = running.values()
+                    timeout = max(0.0, started + self._hedge_delay(provider, kind) - time.monotonic())
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The running provider passed its p90: send the request to the next one too
+                    hedged = True
+                    slow = next(iter(running.values()))[0]
+                    backup = queue.pop(0)
+                    backup.stats.hedges += 1
+                    logger.info(f"🔀 {slow.name} is slow, hedging with {backup.name}")
+                    running[asyncio.create_task(launch(backup))] = (backup, time.monotonic(), True)
+                    continue
+
+                for task in done:
+                    provider, _, is_hedge = running.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        if is_hedge:
+                            provider.stats.hedges_won += 1
+                        return result
+            return None
+        finally:
+            # Cancel the losers (or everything, if the caller was cancelled)
+            now = time.monotonic()
+            for task, (provider, started, _) in running.items():
+                if not task.done():
+                    task.cancel()
+                    provider.stats.record_cancelled(kind, now - started)
+                elif isinstance(task.result(), ResponseStream):
+                    # Finished in the same step as the winner
+                    task.result().cancel()
+
+    async def _attempt_generate(
+        self, provider: _Provider, content: str, user_id: str, context: str
+    ) -> Optional[Tuple[str, bool]]:
+        if not provider.breaker.acquire():
+            return None
+        provider.stats.requests += 1
+        started = time.monotonic()
+        try:
+            text, is_important = await provider.service.generate_response(content, user_id, context)
+            if not text:
+                raise ProviderResponseError(provider.name, "empty response")
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            raise
+        except Exception as e:
+            provider.stats.record(FULL, None, ok=False)
+            provider.breaker.record_failure(e)
+            logger.warning(f"⚠️ {provider.name} failed: {e}")
+            return None
+
+        if provider.breaker.record_success():
+            provider.stats.reset_outcomes()
+        provider.stats.record(FULL, time.monotonic() - started, ok=True)
+        return text, is_important
+
+    async def _attempt_stream(
+        self, provider: _Provider, content: str, user_id: str, context: str
+    ) -> Optional[ResponseStream]:
+        if not provider.breaker.acquire():
+            return None
+        provider.stats.requests += 1
+        started = time.monotonic()
+        try:
+            stream = provider.service.stream_response(content, user_id, context)
+        except Exception as e:
+            provider.stats.record(FIRST_PART, None, ok=False)
+            provider.breaker.record_failure(e)
+            logger.warning(f"⚠️ Could not start {provider.name} stream: {e}")
+            return None
+
+        try:
+            has_part = await stream.wait_first_part()
+        except asyncio.CancelledError:
+            stream.cancel()
+            provider.breaker.release()
+            raise
+        if not has_part:
+            error = stream.error or ProviderResponseError(provider.name, "stream produced no text")
+            provider.stats.record(FIRST_PART, None, ok=False)
+            provider.breaker.record_failure(error)
+            logger.warning(f"⚠️ {provider.name} stream produced no text ({stream.error})")
+            return None
+
+        first_part = time.monotonic() - started
+
+        def finished(done: ResponseStream):
+            # The outcome counts once the stream ends: a failure mid-reply is still a failure
+            if done.cancelled:
+                provider.breaker.release()
+                return
+            if done.error is None:
+                if provider.breaker.record_success():
+                    provider.stats.reset_outcomes()
+            else:
+                provider.breaker.record_failure(done.error)
+            provider.stats.record(FIRST_PART, first_part, ok=done.error is None)
+
+        stream.add_done_callback(finished)
+        return stream
+
+    # =========================================================================
+    # Stats
+    # =========================================================================
+
+    def get_stats(self) -> List[dict]:
+        result = []
+        for p in self.providers:
+            s = p.stats
+            result.append({
+                'name': p.name,
+                'healthy': s.healthy,
+                'circuit': p.breaker.state,
+                'skipped': p.breaker.skipped,
+                'requests': s.requests,
+                'errors': s.errors,
+                'error_rate': round(s.error_rate, 2),
+                'p50': round(s.percentile(FULL, 50), 2),
+                'p90': round(s.percentile(FULL, 90), 2),
+                'p50_first_part': round(s.percentile(FIRST_PART, 50), 2),
+                'p90_first_part': round(s.percentile(FIRST_PART, 90), 2),
+                'hedges': s.hedges,
+                'hedges_won': s.hedges_won,
+                'cancelled': s.cancelled,
+            })
+        return result
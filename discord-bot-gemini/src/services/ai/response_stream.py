@@ -0,0 +1,201 @@
+"""
+Response Stream - Incremental delivery of a streamed LLM completion.
+
+Providers turn their wire format (Ollama NDJSON, Gemini SSE) into an async
+iterator of raw text chunks; ResponseStream pumps it in the background,
+removes [INFO:...] tags even when split across chunks, and cuts the text
+into natural message parts as soon as a line or sentence is complete.
+Consumers iterate the parts while the model is still generating.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+from utils.text_processing import (
+    INFO_TAG_RE,
+    SENTENCE_END_RE,
+    normalise_whitespace,
+    tag_replacement,
+)
+
+logger = logging.getLogger("discord_bot.ResponseStream")
+
+_INFO_PREFIX = "[info:"
+# Longest tag we wait for before treating a '[' as plain text
+_MAX_TAG_LEN = 32
+
+_DONE = object()
+
+
+class InfoTagFilter:
+    """Removes [INFO:...] tags from a chunked stream, holding back partial tags."""
+
+    def __init__(self):
+        self._pending = ""
+        self.is_important = False
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        text = self._strip_tags(text)
+
+        # Hold back a trailing '[' that may still become an INFO tag
+        start = text.rfind("[")
+        if start != -1 and len(text) - start < _MAX_TAG_LEN:
+            tail = text[start:].lower()
+            if "]" not in tail and (
+                _INFO_PREFIX.startswith(tail) or tail.startswith(_INFO_PREFIX)
+            ):
+                self._pending = text[start:]
+                text = text[:start]
+        return text
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return text
+
+    def _strip_tags(self, text: str) -> str:
+        def replace(match):
+            if match.group(1).lower() == "important":
+                self.is_important = True
+            # Keep a line break the tag sat on, so line-based splitting still works
+            return tag_replacement(match)
+
+        return INFO_TAG_RE.sub(replace, text)
+
+
+class StreamPartSplitter:
+    """Cuts growing text into parts at line breaks, else at sentence ends."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        parts: List[str] = []
+
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            parts.extend(self._split_sentences(line + " ", final=True))
+
+        parts.extend(self._split_sentences(self._buffer, final=False))
+        return [p for p in parts if p]
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+    def _split_sentences(self, text: str, final: bool) -> List[str]:
+        parts: List[str] = []
+        consumed = 0
+        for match in SENTENCE_END_RE.finditer(text):
+            parts.append(text[consumed:match.end()].strip())
+            consumed = match.end()
+        rest = text[consumed:]
+        if final:
+            parts.append(rest.strip())
+        else:
+            self._buffer = rest
+        return parts
+
+
+class ResponseStream:
+    """
+    Async iterator of message parts from a streamed completion.
+
+    The source is consumed by a background task as soon as the stream is
+    created, so generation is never throttled by a slow consumer (e.g. typing
+    simulation). After `wait()` returns, `text` holds the full cleaned reply;
+    if the stream failed (`error` is set) it holds only the parts that were
+    produced, i.e. what a consumer actually delivered.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[str],
+        clean: Optional[Callable[[str], str]] = None,
+        provider: str = "llm",
+    ):
+        self.provider = provider
+        # Tags may leave doubled spaces where their surrounding whitespace was split across chunks
+        self._clean = clean or normalise_whitespace
+        self._tags = InfoTagFilter()
+        self._splitter = StreamPartSplitter()
+        self._parts: asyncio.Queue = asyncio.Queue()
+        self._raw: List[str] = []
+        self._produced: List[str] = []
+        self._first_part = asyncio.Event()
+        self.parts_produced = 0
+        self.text = ""
+        self.error: Optional[BaseException] = None
+        self._task = asyncio.get_running_loop().create_task(self._pump(chunks))
+
+    @property
+    def is_important(self) -> bool:
+        return self._tags.is_important
+
+    async def _pump(self, chunks: AsyncIterator[str]):
+        try:
+            async for chunk in chunks:
+                self._emit(self._splitter.feed(self._accept(self._tags.feed(chunk))))
+            self._emit(self._splitter.feed(self._accept(self._tags.flush())))
+            self._emit(self._splitter.flush())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+            logger.error(f"❌ {self.provider} stream failed after {self.parts_produced} part(s): {e}")
+        finally:
+            if self.error is not None:
+                # Text still buffered in the splitter was never delivered
+                self.text = "\n".join(self._produced)
+            else:
+                self.text = self._clean("".join(self._raw)) if self._raw else ""
+            self._parts.put_nowait(_DONE)
+            self._first_part.set()
+
+    def _accept(self, text: str) -> str:
+        if text:
+            self._raw.append(text)
+        return text
+
+    def _emit(self, parts: List[str]):
+        for part in parts:
+            part = self._clean(part)
+            if not part:
+                continue
+            self.parts_produced += 1
+            self._produced.append(part)
+            self._parts.put_nowait(part)
+            self._first_part.set()
+
+    async def wait_first_part(self) -> bool:
+        """Wait until the first part is ready; False if the stream ended without one."""
+        await self._first_part.wait()
+        return self.parts_produced > 0
+
+    async def wait(self):
+        """Wait for generation to finish; returns (full text, is_important)."""
+        await asyncio.shield(self._task)
+        return self.text, self.is_important
+
+    def cancel(self):
+        self._task.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._task.cancelled()
+
+    def add_done_callback(self, callback: Callable[["ResponseStream"], None]):
+        """Call `callback(stream)` once generation has finished, failed or been cancelled."""
+        self._task.add_done_callback(lambda _: callback(self))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        part = await self._parts.get()
+        if part is _DONE:
+            # Keep the sentinel for any later iteration
+            self._parts.put_nowait(_DONE)
+            raise StopAsyncIteration
+        return part
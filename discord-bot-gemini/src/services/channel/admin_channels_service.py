@@ -7,13 +7,14 @@ import json
 import logging
 from typing import Optional
 from config.settings import Config
+from utils.async_io import write_json_atomic, write_json_async
 
 logger = logging.getLogger('discord_bot.AdminChannelsService')
 
 class AdminChannelsService(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data_file = Config.DATA_DIR / 'bot_channels.json'
+        self.data_file = Config.STATE_DIR / 'bot_channels.json'
         self.bot_channels = self.load_bot_channels()
 
     def load_bot_channels(self):
@@ -30,9 +31,15 @@ class AdminChannelsService(commands.Cog):
     def save_bot_channels(self):
         """Save bot channels to file"""
         try:
-            self.data_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.bot_channels, f, indent=2, ensure_ascii=False)
+            write_json_atomic(self.data_file, self.bot_channels)
+        except Exception as e:
+            logger.error(f"Error saving bot channels: {e}")
+
+    async def save_bot_channels_async(self):
+        """Save bot channels on the data I/O thread (snapshot taken on the loop)"""
+        snapshot = {guild_id: list(channels) for guild_id, channels in self.bot_channels.items()}
+        try:
+            await write_json_async(self.data_file, snapshot)
         except Exception as e:
             logger.error(f"Error saving bot channels: {e}")
 
@@ -59,7 +66,7 @@ class AdminChannelsService(commands.Cog):
         
         if channel.id not in self.bot_channels[guild_id]:
             self.bot_channels[guild_id].append(channel.id)
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
             
             embed = discord.Embed(
                 title="✅ Đã thêm kênh bot",
@@ -92,7 +99,7 @@ class AdminChannelsService(commands.Cog):
             if not self.bot_channels[guild_id]:
                 del self.bot_channels[guild_id]
                 
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
             
             embed = discord.Embed(
                 title="✅ Đã xóa kênh bot",
@@ -147,7 +154,7 @@ class AdminChannelsService(commands.Cog):
         
         if guild_id in self.bot_channels:
             del self.bot_channels[guild_id]
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
         
         embed = discord.Embed(
             title="✅ Đã xóa tất cả kênh bot",
@@ -177,7 +184,7 @@ class AdminChannelsService(commands.Cog):
         
         if channel.id not in self.bot_channels[guild_id]:
             self.bot_channels[guild_id].append(channel.id)
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
             await ctx.send(f"✅ Đã thêm {channel.mention} vào danh sách kênh bot")
         else:
             await ctx.send(f"⚠️ {channel.mention} đã có trong danh sách")
@@ -203,7 +210,7 @@ class AdminChannelsService(commands.Cog):
             if not self.bot_channels[guild_id]:
                 del self.bot_channels[guild_id]
                 
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
             await ctx.send(f"✅ Đã xóa {channel.mention} khỏi danh sách kênh bot")
         else:
             await ctx.send(f"⚠️ {channel.mention} không có trong danh sách")
@@ -241,7 +248,7 @@ class AdminChannelsService(commands.Cog):
         
         if guild_id in self.bot_channels:
             del self.bot_channels[guild_id]
-            self.save_bot_channels()
+            await self.save_bot_channels_async()
         
         await ctx.send("✅ Đã xóa tất cả kênh bot. Bot bây giờ hoạt động ở mọi kênh.")
 
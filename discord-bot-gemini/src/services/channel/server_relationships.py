@@ -1,5 +1,6 @@
 from discord.ext import commands
-import os
+from config.settings import Config
+from utils.async_io import run_io
 
 class ServerRelationshipsCog(commands.Cog):
     """
@@ -7,17 +8,19 @@ class ServerRelationshipsCog(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.server_summary_path = os.path.join(base_dir, 'data', 'server_relationships.json')
 
     @commands.command(name='server_relationships')
     async def server_relationships_command(self, ctx):
         """Show the server-wide relationship summary (AI-generated)"""
-        if not os.path.exists(self.server_summary_path):
+        llm_service = self.bot.get_cog('LLMMessageService')
+        if llm_service is None:
             await ctx.reply("Chưa có tổng kết mối quan hệ server.")
             return
-        with open(self.server_summary_path, 'r', encoding='utf-8') as f:
-            summary = f.read()
+        # Regenerated here, at most once per SERVER_SUMMARY_MAX_AGE, instead of on every flush
+        path = await llm_service.relationship_service.refresh_server_relationships_summary(
+            Config.SERVER_SUMMARY_MAX_AGE
+        )
+        summary = await run_io(path.read_text, 'utf-8')
         # Discord message limit
         if len(summary) <= 2000:
             await ctx.reply(summary)
@@ -24,6 +24,13 @@ class QueueCommands(commands.Cog):
             return llm_service.queue_manager
         return None
 
+    def _get_admission_controller(self):
+        """Get AdmissionController from LLMMessageService."""
+        llm_service = self.bot.get_cog('LLMMessageService')
+        if llm_service and hasattr(llm_service, 'admission'):
+            return llm_service.admission
+        return None
+
     @commands.command(name='queue_status')
     async def queue_status_command(self, ctx):
         """Check conversation queue status."""
@@ -36,23 +43,124 @@ class QueueCommands(commands.Cog):
         
         embed = discord.Embed(title="📋 Conversation Queue Status", color=discord.Color.blue())
         
-        if status['currently_responding_to']:
+        if status['active_users']:
+            responding = "\n".join(
+                [f"User ID: {u['user_id']} ({u['lock_duration']}s)" for u in status['active_users'][:10]]
+            )
             embed.add_field(
-                name="🔒 Currently Responding To", 
-                value=f"User ID: {status['currently_responding_to']} ({status['lock_duration']}s)", 
+                name=f"🔒 Currently Responding To ({status['active_users_count']})", 
+                value=responding, 
                 inline=False
             )
         else:
             embed.add_field(name="🔓 Status", value="Available", inline=False)
         
         embed.add_field(name="⏳ Pending Messages", value=str(status['pending_count']), inline=True)
+        embed.add_field(name="📏 Max Per User", value=str(status['max_pending_per_user']), inline=True)
         
         if status['pending_users']:
-            pending_display = ", ".join([f"User {uid}" for uid in status['pending_users']])
+            pending_display = ", ".join(
+                [f"User {p['user_id']} ({p['count']})" for p in status['pending_users'][:10]]
+            )
             embed.add_field(name="👥 Waiting Users", value=pending_display, inline=False)
+
+        memory = status['memory']
+        embed.add_field(
+            name="🧠 Conversation Memory",
+            value=(
+                f"{memory['users']} user(s), {memory['turns']} turn(s), "
+                f"{memory['bytes'] / 2**20:.1f}/{memory['max_bytes'] / 2**20:.0f} MiB\n"
+                f"Evicted: {memory['evicted_idle']} idle, {memory['evicted_memory']} over cap | "
+                f"Warm-started: {status['warm_started_users']}"
+            ),
+            inline=False
+        )
+
+        shared = status.get('shared_state')
+        if shared:
+            embed.add_field(
+                name="🔗 Shared State",
+                value=(
+                    f"{shared['address']} ({'connected' if shared['connected'] else 'local fallback'})\n"
+                    f"Remote calls: {shared['remote_calls']} | Fallbacks: {shared['fallback_calls']} | "
+                    f"Locked elsewhere: {status['remote_locked_count']}"
+                ),
+                inline=False
+            )
+
+        llm_service = self.bot.get_cog('LLMMessageService')
+        debouncer = getattr(llm_service, 'debouncer', None)
+        if debouncer and debouncer.enabled:
+            d = debouncer.get_stats()
+            embed.add_field(
+                name="🧩 Debounce",
+                value=f"Window: {d['window']}s | Open bursts: {d['open_bursts']}\n{d['messages_in']} messages → {d['turns_out']} turns",
+                inline=False
+            )
+
+        delivery_queue = getattr(llm_service, 'delivery_queue', None)
+        if delivery_queue:
+            dq = delivery_queue.get_stats()
+            embed.add_field(
+                name="📤 Delivery",
+                value=f"Typing in {dq['active_channels']} channel(s), {dq['pending']} queued | Sent: {dq['delivered']} | Failed: {dq['failed']}",
+                inline=False
+            )
+
+        router = getattr(llm_service, 'router', None)
+        if router and router.providers:
+            circuit_icons = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+            lines = [
+                f"{circuit_icons[p['circuit']]}{'' if p['healthy'] else '⚠️'} {p['name']}: p50 {p['p50']}s / p90 {p['p90']}s "
+                f"(first part {p['p50_first_part']}s / {p['p90_first_part']}s) | "
+                f"Errors: {p['error_rate']:.0%} of {p['requests']} | "
+                f"Hedged: {p['hedges']} ({p['hedges_won']} won) | Skipped: {p['skipped']}"
+                for p in router.get_stats()
+            ]
+            embed.add_field(name="🔀 LLM Providers", value="\n".join(lines)[:1024], inline=False)
+
+        admission = self._get_admission_controller()
+        if admission:
+            stats = admission.get_stats()
+            embed.add_field(
+                name="🚦 LLM Admission",
+                value=(
+                    f"In flight: {stats['in_flight']}/{stats['max_in_flight']}\n"
+                    f"Waiting: {stats['queue_depth']}/{stats['max_queue_depth']} (level {stats['level']})\n"
+                    f"Admitted: {stats['admitted']} | Degraded: {sum(stats['degraded'][1:])}\n"
+                    f"Rejected: {stats['rejected_full']} full, {stats['rejected_deadline']} timeout\n"
+                    f"Max wait: {stats['max_wait_seen']}s"
+                ),
+                inline=False
+            )
         
         await ctx.reply(embed=embed)
 
+    @commands.command(name='fair_status')
+    async def fair_status_command(self, ctx):
+        """Show per-tenant LLM wait times from the fair scheduler."""
+        admission = self._get_admission_controller()
+        if not admission:
+            await ctx.reply("❌ Admission controller not available")
+            return
+
+        tenants = admission.scheduler.get_tenant_stats()
+        if not tenants:
+            await ctx.reply("📭 No LLM requests scheduled yet")
+            return
+
+        embed = discord.Embed(title="⚖️ Fair Scheduling - Wait Times", color=discord.Color.blue())
+        for t in tenants:
+            embed.add_field(
+                name=t['tenant'],
+                value=(
+                    f"Served: {t['served']} | Waiting: {t['waiting']}\n"
+                    f"p50: {t['p50_wait']}s | p99: {t['p99_wait']}s | max: {t['max_wait']}s"
+                ),
+                inline=False
+            )
+        await ctx.reply(embed=embed)
+
     @commands.command(name='clear_queue')
     async def clear_queue_command(self, ctx):
         """Clear pending message queue (requires Manage Messages permission)."""
@@ -82,6 +190,18 @@ class QueueCommands(commands.Cog):
         embed.add_field(name="Processed Messages", value=debug_info['processed_count'], inline=True)
         embed.add_field(name="Currently Processing", value=debug_info['processing_count'], inline=True)
         embed.add_field(name="Message Locks", value=debug_info['locks_count'], inline=True)
+
+        dedup = debug_info.get('dedup_stats')
+        if dedup:
+            embed.add_field(
+                name="🧹 Dedup Ring",
+                value=(
+                    f"{dedup['entries']}/{dedup['max_entries']} ids (TTL {int(dedup['ttl'])}s)\n"
+                    f"Duplicates blocked: {dedup['hits']} | Expired: {dedup['expired']} | Evicted: {dedup['evicted']}"
+                    + (f"\nBloom negatives: {dedup['bloom_negatives']}" if dedup['bloom'] else "")
+                ),
+                inline=False
+            )
         
         if debug_info['recent_processed']:
             recent = "\n".join([f"`{msg}`" for msg in debug_info['recent_processed']])
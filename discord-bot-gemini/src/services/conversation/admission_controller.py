@@ -0,0 +1,163 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from config.settings import Config
+from services.conversation.fair_scheduler import FairScheduler
+
+logger = logging.getLogger('discord_bot.AdmissionController')
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call is shed (queue full or deadline exceeded)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionTicket:
+    """Grant for one in-flight LLM call; `level` tells the caller how much to degrade."""
+    __slots__ = ('level', 'wait_time')
+
+    def __init__(self, level: int, wait_time: float):
+        self.level = level
+        self.wait_time = wait_time
+
+
+class AdmissionController:
+    """
+    Global admission control for LLM calls.
+
+    Caps concurrent generations, queues the rest with a deadline and rejects
+    new work once the queue is full. Waiters are served in weighted fair
+    order across guilds/DM users (see FairScheduler), not FIFO. While a backlog exists, admitted calls
+    get a degradation level so the bot stays responsive instead of every
+    request hitting the model timeout:
+        1 - skip typing simulation
+        2 - shrink the prompt context
+        3 - route to the backup provider
+    """
+
+    LEVEL_NORMAL = 0
+    LEVEL_SKIP_TYPING = 1
+    LEVEL_SHRINK_CONTEXT = 2
+    LEVEL_BACKUP_PROVIDER = 3
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue_depth: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.max_in_flight = max(1, max_in_flight or Config.LLM_MAX_IN_FLIGHT)
+        self.max_queue_depth = max_queue_depth or Config.LLM_MAX_QUEUE_DEPTH
+        self.queue_timeout = queue_timeout or Config.LLM_QUEUE_TIMEOUT
+        # Queue depth at which each degradation level starts
+        self.level_thresholds = (
+            (self.LEVEL_BACKUP_PROVIDER, Config.DEGRADE_BACKUP_PROVIDER_DEPTH),
+            (self.LEVEL_SHRINK_CONTEXT, Config.DEGRADE_SHRINK_CONTEXT_DEPTH),
+            (self.LEVEL_SKIP_TYPING, Config.DEGRADE_SKIP_TYPING_DEPTH),
+        )
+
+        self._in_flight = 0
+        self._waiters = FairScheduler()
+
+        # Counters shown in the "LLM Admission" section of !queue_status
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.degraded = [0, 0, 0, 0]
+        self.max_wait_seen = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def degradation_level(self) -> int:
+        depth = len(self._waiters)
+        for level, threshold in self.level_thresholds:
+            if threshold and depth >= threshold:
+                return level
+        return self.LEVEL_NORMAL
+
+    @property
+    def scheduler(self) -> FairScheduler:
+        return self._waiters
+
+    async def acquire(self, guild_id: Optional[str] = None, user_id: str = '') -> AdmissionTicket:
+        """Wait for an LLM slot. Raises AdmissionRejected when shedding load."""
+        start = time.monotonic()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._waiters.record_wait(FairScheduler.tenant_key(guild_id, user_id), 0.0)
+            return self._grant(start)
+
+        if len(self._waiters) >= self.max_queue_depth:
+            self.rejected_full += 1
+            logger.warning(f"🚦 LLM queue full ({len(self._waiters)}), shedding request")
+            raise AdmissionRejected('queue_full')
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.push(future, guild_id, user_id)
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard_waiter(future)
+            self.rejected_deadline += 1
+            logger.warning(f"🚦 LLM queue deadline exceeded ({self.queue_timeout}s)")
+            raise AdmissionRejected('deadline')
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just before cancellation - pass it on
+                self.release()
+            else:
+                self._discard_waiter(future)
+            raise
+        # The releasing caller handed its slot over; _in_flight already counts us
+        return self._grant(start)
+
+    def release(self):
+        """Free a slot, handing it directly to the next waiter in fair order if any."""
+        while self._waiters:
+            future = self._waiters.pop()
+            if future is not None and not future.done():
+                future.set_result(None)
+                return
+        self._in_flight = max(0, self._in_flight - 1)
+
+    @asynccontextmanager
+    async def admit(self, guild_id: Optional[str] = None, user_id: str = ''):
+        ticket = await self.acquire(guild_id, user_id)
+        try:
+            yield ticket
+        finally:
+            self.release()
+
+    def _grant(self, start: float) -> AdmissionTicket:
+        wait_time = time.monotonic() - start
+        level = self.degradation_level()
+        self.admitted += 1
+        self.degraded[level] += 1
+        self.max_wait_seen = max(self.max_wait_seen, wait_time)
+        if level:
+            logger.info(f"🚦 Admitted with degradation level {level} (queue={len(self._waiters)})")
+        return AdmissionTicket(level, wait_time)
+
+    def _discard_waiter(self, future: asyncio.Future):
+        self._waiters.remove(future)
+
+    def get_stats(self) -> dict:
+        return {
+            'in_flight': self._in_flight,
+            'max_in_flight': self.max_in_flight,
+            'queue_depth': len(self._waiters),
+            'max_queue_depth': self.max_queue_depth,
+            'level': self.degradation_level(),
+            'admitted': self.admitted,
+            'rejected_full': self.rejected_full,
+            'rejected_deadline': self.rejected_deadline,
+            'degraded': list(self.degraded),
+            'max_wait_seen': round(self.max_wait_seen, 2),
+        }
@@ -1,49 +1,138 @@
+import math
+import time
 import logging
-from datetime import datetime, timedelta
-from typing import Tuple
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config.settings import Config
 
 logger = logging.getLogger('discord_bot.AntiSpamService')
 
+# Seconds between idle-bucket sweeps
+SWEEP_INTERVAL = 60.0
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'cooldown_until')
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.cooldown_until = 0.0
+
+
+class _TokenBucketLimiter:
+    """
+    Token buckets for one scope (user, channel or guild).
+
+    Buckets hold up to `capacity` tokens and refill at capacity per `window`
+    seconds. They are kept in last-activity order, so idle ones (already
+    refilled to full, i.e. identical to a fresh bucket) are evicted from the
+    front without scanning the rest.
+    """
+
+    def __init__(self, capacity: int, window: float = 60.0, cooldown: float = 0.0):
+        self.capacity = capacity
+        self.rate = capacity / window if capacity else 0.0
+        self.cooldown = cooldown
+        self.idle_ttl = max(window, cooldown)
+        self.buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def get(self, key: str, now: float) -> _Bucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket(float(self.capacity), now)
+            return bucket
+        self.buckets.move_to_end(key)
+        bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        return bucket
+
+    def seconds_until_token(self, bucket: _Bucket) -> int:
+        return max(1, math.ceil((1.0 - bucket.tokens) / self.rate)) if self.rate else 0
+
+    def sweep(self, now: float) -> int:
+        removed = 0
+        buckets = self.buckets
+        while buckets:
+            bucket = buckets[next(iter(buckets))]
+            if now - bucket.updated < self.idle_ttl:
+                break
+            buckets.popitem(last=False)
+            removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+
 class AntiSpamService:
-    """Handles anti-spam protection"""
-    
-    def __init__(self, max_messages_per_minute: int = 5, cooldown_duration: int = 30):
-        self.user_message_times = {}
-        self.spam_cooldowns = {}
-        self.max_messages_per_minute = max_messages_per_minute
-        self.spam_cooldown_duration = cooldown_duration
-    
-    def check_spam(self, user_id: str) -> Tuple[bool, int]:
+    """Handles anti-spam protection (per-user token buckets plus channel/guild limits)"""
+
+    def __init__(self, max_messages_per_minute: Optional[int] = None, cooldown_duration: Optional[int] = None):
+        self.max_messages_per_minute = max_messages_per_minute or Config.SPAM_USER_MAX_PER_MINUTE
+        self.spam_cooldown_duration = cooldown_duration or Config.SPAM_COOLDOWN
+        self.users = _TokenBucketLimiter(self.max_messages_per_minute, cooldown=self.spam_cooldown_duration)
+        self.channels = _TokenBucketLimiter(Config.SPAM_CHANNEL_MAX_PER_MINUTE)
+        self.guilds = _TokenBucketLimiter(Config.SPAM_GUILD_MAX_PER_MINUTE)
+        self._last_sweep = time.monotonic()
+
+    def check_spam(self, user_id: str, guild_id: Optional[str] = None,
+                   channel_id: Optional[str] = None) -> Tuple[bool, int]:
         """Check if user is spamming. Returns (is_spam, remaining_cooldown)"""
-        current_time = datetime.utcnow()
-        
+        scope, remaining = self.check_spam_scoped(user_id, guild_id, channel_id)
+        return scope is not None, remaining
+
+    def check_spam_scoped(self, user_id: str, guild_id: Optional[str] = None,
+                          channel_id: Optional[str] = None) -> Tuple[Optional[str], int]:
+        """
+        Like check_spam but reports which limit was hit: 'user', 'channel',
+        'guild' or None. Only a user limit starts a cooldown.
+        """
+        now = time.monotonic()
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep(now)
+
+        user = self.users.get(user_id, now)
         # Check if user is in cooldown
-        if user_id in self.spam_cooldowns:
-            cooldown_end = self.spam_cooldowns[user_id]
-            if current_time < cooldown_end:
-                remaining = int((cooldown_end - current_time).total_seconds())
-                return True, remaining
-            else:
-                del self.spam_cooldowns[user_id]
-        
-        # Initialize and clean old message times
-        if user_id not in self.user_message_times:
-            self.user_message_times[user_id] = []
-        
-        one_minute_ago = current_time - timedelta(minutes=1)
-        self.user_message_times[user_id] = [
-            msg_time for msg_time in self.user_message_times[user_id] 
-            if msg_time > one_minute_ago
-        ]
-        
-        # Add current message time
-        self.user_message_times[user_id].append(current_time)
-        
-        # Check if exceeds limit
-        if len(self.user_message_times[user_id]) > self.max_messages_per_minute:
-            cooldown_end = current_time + timedelta(seconds=self.spam_cooldown_duration)
-            self.spam_cooldowns[user_id] = cooldown_end
-            logger.warning(f"🚫 User {user_id} spam detected! {self.spam_cooldown_duration}s cooldown")
-            return True, self.spam_cooldown_duration
-        
-        return False, 0
\ No newline at end of file
+        if user.cooldown_until > now:
+            return 'user', math.ceil(user.cooldown_until - now)
+
+        # Take a token from every applicable bucket, or from none of them
+        scoped = [('user', self.users, user)]
+        if channel_id and self.channels.enabled:
+            scoped.append(('channel', self.channels, self.channels.get(channel_id, now)))
+        if guild_id and self.guilds.enabled:
+            scoped.append(('guild', self.guilds, self.guilds.get(guild_id, now)))
+
+        for scope, limiter, bucket in scoped:
+            if bucket.tokens < 1.0:
+                if scope == 'user':
+                    user.cooldown_until = now + self.spam_cooldown_duration
+                    logger.warning(f"🚫 User {user_id} spam detected! {self.spam_cooldown_duration}s cooldown")
+                    return scope, self.spam_cooldown_duration
+                logger.debug(f"🚫 {scope} limit reached ({channel_id if scope == 'channel' else guild_id})")
+                return scope, limiter.seconds_until_token(bucket)
+
+        for _, _, bucket in scoped:
+            bucket.tokens -= 1.0
+        return None, 0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop buckets of users/channels/guilds that have gone idle"""
+        now = now if now is not None else time.monotonic()
+        self._last_sweep = now
+        removed = self.users.sweep(now) + self.channels.sweep(now) + self.guilds.sweep(now)
+        if removed:
+            logger.debug(f"🧹 Anti-spam swept {removed} idle buckets")
+        return removed
+
+    def get_stats(self) -> dict:
+        return {
+            'tracked_users': len(self.users),
+            'tracked_channels': len(self.channels),
+            'tracked_guilds': len(self.guilds),
+        }
@@ -1,8 +1,16 @@
+import os
+import time
+import heapq
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Dict, Set
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set
 import json
 from config.settings import Config
+from utils.async_io import file_lock, get_io_executor, read_json, run_io, write_json_atomic
+from services.conversation.conversation_memory import ConversationMemory, Turn
+from services.state.state_client import get_state_client
 
 logger = logging.getLogger("discord_bot.ConversationManager")
 
@@ -14,10 +22,35 @@ class ConversationManager:
         # Changed from single user lock to set of active users for concurrency
         self.active_users: Set[str] = set()
         self.user_lock_times: Dict[str, datetime] = {}
+        # With a state server, a user's lock is also a lease shared by all bot processes
+        self.state = get_state_client()
+        self.lease_ttl = Config.CONVERSATION_LEASE_TTL
+        # Users whose lock is held by another process -> when it was taken there
+        self.remote_lock_times: Dict[str, datetime] = {}
+        self._remote_waits: Dict[str, asyncio.Task] = {}
 
-        self.pending_messages: List[Dict] = []
-        self.conversation_history = {}
-        self.max_history_length = 10
+        # Per-user queues of messages that arrived while the user was locked
+        self.pending_queues: Dict[str, asyncio.Queue] = {}
+        self.max_pending_per_user = Config.PENDING_QUEUE_MAX_DEPTH
+        # Called with (message, merged_content, user_id) when a queue is drained
+        self._pending_handler: Optional[Callable[..., Awaitable]] = None
+        self._drain_tasks: Set[asyncio.Task] = set()
+        self.max_history_length = Config.CONVERSATION_HISTORY_TURNS
+        # Users whose persistent history has been loaded (or found empty) since boot;
+        # an evicted user is warm-started again on their next turn
+        self._warmed: Set[str] = set()
+        self.conversation_history = ConversationMemory(
+            self.max_history_length,
+            idle_ttl=Config.CONVERSATION_IDLE_TTL,
+            max_bytes=int(Config.CONVERSATION_MEMORY_MAX_MB * 2**20),
+            on_evict=self._warmed.discard,
+        )
+        self._warming: Dict[str, asyncio.Task] = {}
+        self.warm_loads = 0
+
+    @staticmethod
+    def _lease_key(user_id: str) -> str:
+        return f"conversation:{user_id}"
 
     def set_conversation_lock(self, user_id: str):
         """Lock conversation for a specific user"""
@@ -25,13 +58,44 @@ class ConversationManager:
         self.user_lock_times[user_id] = datetime.utcnow()
         logger.info(f"🔒 Conversation locked for user {user_id}")
 
+    async def acquire_conversation_lock(self, user_id: str) -> bool:
+        """Lock the user's conversation unless it is already locked here or in another bot process"""
+        if user_id in self.active_users:
+            return False
+        if self.state is None:
+            self.set_conversation_lock(user_id)
+            return True
+        # Claimed locally first, so another turn of this process cannot slip in during the round trip
+        self.active_users.add(user_id)
+        acquired, held_for = await self.state.acquire_lease(self._lease_key(user_id), self.lease_ttl)
+        if not acquired:
+            self.active_users.discard(user_id)
+            self.remote_lock_times[user_id] = datetime.utcnow() - timedelta(seconds=held_for)
+            logger.info(f"🔒 Conversation for user {user_id} is locked by another bot process")
+            return False
+        self.remote_lock_times.pop(user_id, None)
+        self.set_conversation_lock(user_id)
+        return True
+
     def release_conversation_lock(self, user_id: str):
-        """Release conversation lock for a specific user"""
+        """Release conversation lock for a specific user and drain their pending queue"""
         if user_id in self.active_users:
             self.active_users.discard(user_id)
             self.user_lock_times.pop(user_id, None)
+            if self.state is not None:
+                self.state.release_lease(self._lease_key(user_id))
             logger.info(f"🔓 Conversation unlocked for user {user_id}")
 
+        queue = self.pending_queues.get(user_id)
+        if queue is not None and not queue.empty() and self._pending_handler:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            task = loop.create_task(self._drain_pending(user_id))
+            self._drain_tasks.add(task)
+            task.add_done_callback(self._drain_tasks.discard)
+
     def is_conversation_locked(self, user_id: str) -> bool:
         """Check if conversation is locked for this specific user"""
         # Now we only check if THIS user is already being processed
@@ -40,119 +104,287 @@ class ConversationManager:
 
     def get_lock_duration(self, user_id: str) -> int:
         """Get how long conversation has been locked for a user (in seconds)"""
-        if user_id in self.user_lock_times:
-            return int(
-                (datetime.utcnow() - self.user_lock_times[user_id]).total_seconds()
-            )
+        locked_at = self.user_lock_times.get(user_id) or self.remote_lock_times.get(user_id)
+        if locked_at:
+            return int((datetime.utcnow() - locked_at).total_seconds())
         return 0
 
-    def add_to_pending_queue(self, message, content: str):
-        """Add message to pending queue"""
-        self.pending_messages.append(
-            {"message": message, "content": content, "timestamp": datetime.utcnow()}
-        )
-        logger.info(f"⏳ User {message.author.id} added to pending queue")
+    def set_pending_handler(self, handler: Callable[..., Awaitable]):
+        """Register the coroutine that answers drained messages: handler(message, content, user_id)"""
+        self._pending_handler = handler
+
+    def add_to_pending_queue(self, message, content: str) -> bool:
+        """Queue a message for a locked user. Returns False if the user's queue is full."""
+        user_id = str(message.author.id)
+        queue = self.pending_queues.get(user_id)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_pending_per_user)
+            self.pending_queues[user_id] = queue
+        try:
+            queue.put_nowait(
+                {"message": message, "content": content, "timestamp": datetime.utcnow()}
+            )
+        except asyncio.QueueFull:
+            logger.warning(f"⚠️ Pending queue full for user {user_id}, message dropped")
+            return False
+        logger.info(f"⏳ User {user_id} added to pending queue ({queue.qsize()})")
+        if user_id not in self.active_users:
+            # Locked by another process: no local release will drain this queue
+            self._wait_for_remote_release(user_id)
+        return True
+
+    def get_pending_count(self, user_id: str) -> int:
+        queue = self.pending_queues.get(user_id)
+        return queue.qsize() if queue is not None else 0
+
+    def _wait_for_remote_release(self, user_id: str):
+        if user_id in self._remote_waits or self._pending_handler is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._poll_remote_lock(user_id))
+        self._remote_waits[user_id] = task
+        task.add_done_callback(lambda _: self._end_remote_wait(user_id))
+
+    def _end_remote_wait(self, user_id: str):
+        self._remote_waits.pop(user_id, None)
+        self.remote_lock_times.pop(user_id, None)
+
+    async def _poll_remote_lock(self, user_id: str):
+        """Drain a user's queue once the other process holding their lock lets go"""
+        while self.get_pending_count(user_id):
+            await asyncio.sleep(Config.CONVERSATION_LEASE_POLL)
+            if user_id in self.active_users:
+                return  # answering here now; the local release drains the queue
+            if await self._drain_pending(user_id):
+                return
+
+    async def _drain_pending(self, user_id: str) -> bool:
+        """Answer everything queued for a user as one merged request (False if still locked)"""
+        # Another message may have taken the lock first; it drains on its own release
+        if not await self.acquire_conversation_lock(user_id):
+            return False
+        queue = self.pending_queues.pop(user_id, None)
+        if queue is None or queue.empty():
+            self.release_conversation_lock(user_id)
+            return True
+
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait())
+
+        # Reply to the latest message with all queued fragments as one prompt;
+        # the handler runs with the lock held and releases it when done
+        merged_content = "\n".join(item["content"] for item in items)
+        logger.info(f"📨 Draining {len(items)} queued message(s) for user {user_id}")
+        try:
+            await self._pending_handler(items[-1]["message"], merged_content, user_id)
+        except Exception as e:
+            logger.error(f"❌ Error processing queued messages for {user_id}: {e}")
+        return True
+
+    def drain_tasks(self) -> Set[asyncio.Task]:
+        """Queued-message drains started by lock releases in this process"""
+        return set(self._drain_tasks)
+
+    def cancel_pending(self) -> int:
+        """Stop waiting on locks held elsewhere and drop all queued messages (shutdown)"""
+        for task in list(self._remote_waits.values()):
+            task.cancel()
+        return self.clear_pending_queue()
 
     def clear_pending_queue(self) -> int:
-        """Clear pending queue and return count"""
-        count = len(self.pending_messages)
-        self.pending_messages.clear()
+        """Clear all pending queues and return the number of dropped messages"""
+        count = sum(queue.qsize() for queue in self.pending_queues.values())
+        self.pending_queues.clear()
         return count
 
-    def add_to_history(self, user_id: str, user_message: str, bot_response: str):
-        """Add conversation to in-memory history"""
-        timestamp = datetime.utcnow().isoformat()
+    def add_to_history(self, user_id: str, user_message: str, bot_response: str) -> Turn:
+        """Add conversation to in-memory history (the oldest turn drops out past max_history_length)"""
+        return self.conversation_history.append(user_id, user_message, bot_response)
 
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
+    def remove_from_history(self, user_id: str, turn: Turn):
+        """Forget a turn added by add_to_history (its reply never reached the user)"""
+        self.conversation_history.remove(user_id, turn)
 
-        self.conversation_history[user_id].append(
-            {"user": user_message, "bot": bot_response, "timestamp": timestamp}
-        )
+    async def warm_start(self, user_id: str):
+        """
+        Fill the user's in-memory history from their persistent log on their
+        first turn after boot, so context survives restarts without reading
+        every file at startup.
+        """
+        if user_id in self._warmed:
+            return
+        task = self._warming.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load_into_memory(user_id))
+            self._warming[user_id] = task
+            task.add_done_callback(lambda _: self._warming.pop(user_id, None))
+        await asyncio.shield(task)
 
-        # Keep only recent history in memory
-        if len(self.conversation_history[user_id]) > self.max_history_length:
-            self.conversation_history[user_id] = self.conversation_history[user_id][
-                -self.max_history_length :
-            ]
+    async def _load_into_memory(self, user_id: str):
+        try:
+            exchanges = await run_io(self._load_history_tail, user_id)
+        except Exception as e:
+            logger.error(f"❌ Error warm-loading history for {user_id}: {e}")
+            exchanges = []
+        self._warmed.add(user_id)
+        # Turns added since boot are newer than (and already saved after) the file's tail
+        if exchanges and user_id not in self.conversation_history:
+            self.conversation_history.load(user_id, exchanges)
+            self.warm_loads += 1
+            logger.debug(f"♻️ Warm-started {len(exchanges)} exchange(s) for user {user_id}")
 
-    def get_conversation_context(self, user_id: str) -> str:
-        """Get recent conversation context"""
-        if user_id not in self.conversation_history:
-            return ""
+    def _history_file(self, user_id: str) -> Path:
+        return Config.USER_SUMMARIES_DIR / f"{user_id}_history.json"
+
+    def _load_history_tail(self, user_id: str) -> List[Turn]:
+        """Last max_history_length user/assistant pairs of the persistent log (I/O thread)"""
+        history = read_json(self._history_file(user_id), [])
+        if not isinstance(history, list):
+            return []
+        exchanges = []
+        user_entry = None
+        for entry in history:
+            if not isinstance(entry, dict):
+                continue
+            if entry.get("role") == "user":
+                user_entry = entry
+            elif entry.get("role") == "assistant" and user_entry is not None:
+                exchanges.append(Turn(
+                    user_entry.get("content", ""),
+                    entry.get("content", ""),
+                    self._parse_timestamp(entry.get("timestamp")),
+                ))
+                user_entry = None
+        return exchanges[-self.max_history_length:]
 
+    @staticmethod
+    def _parse_timestamp(value) -> float:
+        try:
+            # The log stores naive UTC (utcnow) timestamps
+            return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
+    async def prefetch_recent_histories(self, max_users: int, max_age_hours: float) -> int:
+        """Warm-start the users whose history files changed most recently (optional, at startup)"""
+        directory = Config.USER_SUMMARIES_DIR
+        cutoff = time.time() - max_age_hours * 3600
+
+        def recent_users() -> List[str]:
+            if not directory.exists():
+                return []
+            candidates = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith("_history.json"):
+                        continue
+                    mtime = entry.stat().st_mtime
+                    if mtime >= cutoff:
+                        candidates.append((mtime, entry.name[: -len("_history.json")]))
+            return [user_id for _, user_id in heapq.nlargest(max_users, candidates)]
+
+        user_ids = await run_io(recent_users)
+        # One file per I/O job so reply-path reads and writes interleave with the prefetch
+        for user_id in user_ids:
+            await self.warm_start(user_id)
+        logger.info(f"♻️ Prefetched conversation history of {len(user_ids)} recently active user(s)")
+        return len(user_ids)
+
+    def get_conversation_context(self, user_id: str, max_exchanges: int = 3) -> str:
+        """Get recent conversation context"""
         context_parts = []
-        for entry in self.conversation_history[user_id][-3:]:  # Last 3 exchanges
-            context_parts.append(f"User: {entry['user']}")
-            context_parts.append(f"Bot: {entry['bot']}")
+        for turn in self.conversation_history.recent(user_id, max_exchanges):
+            context_parts.append(f"User: {turn.user}")
+            context_parts.append(f"Bot: {turn.bot}")
 
         return "\n".join(context_parts) if context_parts else ""
 
     def save_to_persistent_history(
         self, user_id: str, user_message: str, bot_response: str
     ):
-        """Save conversation to persistent file storage (runs in background thread)"""
+        """Save conversation to persistent file storage (runs on the data I/O thread)"""
         import asyncio
 
         def _save_sync():
             try:
                 history_dir = Config.USER_SUMMARIES_DIR
-                history_file = history_dir / f"{user_id}_history.json"
+                history_file = self._history_file(user_id)
 
                 history_dir.mkdir(parents=True, exist_ok=True)
                 timestamp = datetime.utcnow().isoformat()
 
-                # Load existing history
-                history = []
-                if history_file.exists():
-                    try:
-                        with open(history_file, "r", encoding="utf-8") as f:
-                            history = json.load(f)
-                    except Exception as e:
-                        logger.error(f"❌ Error loading existing history: {e}")
-                        history = []
-
-                # Add new messages
-                history.extend(
-                    [
-                        {
-                            "role": "user",
-                            "content": user_message,
-                            "timestamp": timestamp,
-                        },
-                        {
-                            "role": "assistant",
-                            "content": bot_response,
-                            "timestamp": timestamp,
-                        },
-                    ]
-                )
-
-                # Keep only recent history
-                if len(history) > 100:
-                    history = history[-100:]
-
-                # Save back to file
-                with open(history_file, "w", encoding="utf-8") as f:
-                    json.dump(history, f, ensure_ascii=False, indent=2)
+                # Other shard processes append to the same file: hold the lock
+                # across the read-modify-write so neither append is lost
+                with file_lock(history_file):
+                    # Load existing history
+                    history = []
+                    if history_file.exists():
+                        try:
+                            with open(history_file, "r", encoding="utf-8") as f:
+                                history = json.load(f)
+                        except Exception as e:
+                            logger.error(f"❌ Error loading existing history: {e}")
+                            history = []
+
+                    # Add new messages
+                    history.extend(
+                        [
+                            {
+                                "role": "user",
+                                "content": user_message,
+                                "timestamp": timestamp,
+                            },
+                            {
+                                "role": "assistant",
+                                "content": bot_response,
+                                "timestamp": timestamp,
+                            },
+                        ]
+                    )
+
+                    # Keep only recent history
+                    if len(history) > 100:
+                        history = history[-100:]
+
+                    # Save back to file
+                    write_json_atomic(history_file, history)
 
                 logger.debug(f"💾 Saved conversation history for user {user_id}")
             except Exception as e:
                 logger.error(f"❌ Error saving persistent history for {user_id}: {e}")
 
-        # Run in thread pool to avoid blocking event loop
+        # Run on the single data I/O thread: keeps the event loop free and
+        # serialises read-modify-write of the same user's file
         try:
             loop = asyncio.get_running_loop()
-            loop.run_in_executor(None, _save_sync)
+            loop.run_in_executor(get_io_executor(), _save_sync)
         except RuntimeError:
             # No event loop running, execute synchronously
             _save_sync()
 
     def get_queue_status(self) -> dict:
         """Get queue status information"""
-        pending_users = [pm["message"].author.id for pm in self.pending_messages[-3:]]
+        active_users = [
+            {"user_id": user_id, "lock_duration": self.get_lock_duration(user_id)}
+            for user_id in self.active_users
+        ]
+        pending_users = [
+            {"user_id": user_id, "count": queue.qsize()}
+            for user_id, queue in self.pending_queues.items()
+            if not queue.empty()
+        ]
         return {
-            "active_users_count": len(self.active_users),
-            "pending_count": len(self.pending_messages),
+            "active_users": active_users,
+            "active_users_count": len(active_users),
+            "pending_count": sum(p["count"] for p in pending_users),
             "pending_users": pending_users,
+            "max_pending_per_user": self.max_pending_per_user,
+            "remote_locked_count": len(self._remote_waits),
+            "warm_started_users": self.warm_loads,
+            "memory": self.conversation_history.get_stats(),
+            "shared_state": self.state.get_stats() if self.state else None,
         }
@@ -0,0 +1,166 @@
+"""
+Conversation Memory - Bounded in-memory history of recent exchanges per user.
+
+Each user's exchanges live in a deque(maxlen=N) of slotted Turn records, so
+appending past N drops the oldest turn in O(1) instead of re-slicing a list.
+Users are kept in last-activity order: users idle for longer than the TTL
+are evicted from the front, and the least recently active users are also
+evicted whenever the estimated memory use goes over the cap. Memory cost is
+proportional to recently active users, not to everyone seen since boot.
+"""
+import sys
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, List, Optional
+
+logger = logging.getLogger('discord_bot.ConversationMemory')
+
+# Seconds between idle-user sweeps
+SWEEP_INTERVAL = 60.0
+# Approximate fixed cost of a Turn in its deque and of a user's entry
+_TURN_OVERHEAD = sys.getsizeof(object()) + 3 * 8 + 8
+_USER_OVERHEAD = 1024
+
+
+class Turn:
+    """One exchange: what the user said and what the bot replied."""
+
+    __slots__ = ('user', 'bot', 'timestamp')
+
+    def __init__(self, user: str, bot: str, timestamp: float):
+        self.user = user
+        self.bot = bot
+        self.timestamp = timestamp
+
+    def size(self) -> int:
+        return _TURN_OVERHEAD + sys.getsizeof(self.user) + sys.getsizeof(self.bot)
+
+
+class _UserHistory:
+    __slots__ = ('turns', 'last_active', 'size')
+
+    def __init__(self, max_turns: int, now: float):
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.last_active = now
+        self.size = _USER_OVERHEAD
+
+
+class ConversationMemory:
+    def __init__(self, max_turns: int, idle_ttl: float, max_bytes: int,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_turns = max(1, max_turns)
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._on_evict = on_evict
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()
+        self.bytes = 0
+        self._last_sweep = time.monotonic()
+        self.evicted_idle = 0
+        self.evicted_memory = 0
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _touch(self, user_id: str, now: float) -> _UserHistory:
+        history = self._users.get(user_id)
+        if history is None:
+            history = self._users[user_id] = _UserHistory(self.max_turns, now)
+            self.bytes += history.size
+        else:
+            self._users.move_to_end(user_id)
+            history.last_active = now
+        return history
+
+    def _push(self, history: _UserHistory, turn: Turn):
+        if len(history.turns) == history.turns.maxlen:
+            dropped = history.turns[0].size()
+            history.size -= dropped
+            self.bytes -= dropped
+        history.turns.append(turn)
+        added = turn.size()
+        history.size += added
+        self.bytes += added
+
+    def append(self, user_id: str, user_message: str, bot_response: str, timestamp: Optional[float] = None) -> Turn:
+        now = time.monotonic()
+        history = self._touch(user_id, now)
+        turn = Turn(user_message, bot_response, timestamp if timestamp is not None else time.time())
+        self._push(history, turn)
+        self._enforce(now, keep=user_id)
+        return turn
+
+    def remove(self, user_id: str, turn: Turn) -> bool:
+        """Take back a turn returned by append() (e.g. its reply was never delivered)."""
+        history = self._users.get(user_id)
+        if history is None:
+            return False
+        for i, kept in enumerate(history.turns):
+            if kept is turn:
+                del history.turns[i]
+                history.size -= turn.size()
+                self.bytes -= turn.size()
+                return True
+        return False
+
+    def load(self, user_id: str, turns: Iterable[Turn]):
+        """Seed a user's history (oldest first), e.g. from the persistent log."""
+        now = time.monotonic()
+        history = self._touch(user_id, now)
+        for turn in turns:
+            self._push(history, turn)
+        self._enforce(now, keep=user_id)
+
+    def recent(self, user_id: str, count: int) -> List[Turn]:
+        """Up to `count` most recent turns, oldest first."""
+        history = self._users.get(user_id)
+        if history is None or count <= 0:
+            return []
+        turns = history.turns
+        return list(turns)[-count:] if count < len(turns) else list(turns)
+
+    def _enforce(self, now: float, keep: str):
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep(now)
+        # Over the cap: drop the least recently active users (never the one just written)
+        while self.bytes > self.max_bytes and len(self._users) > 1:
+            user_id = next(iter(self._users))
+            if user_id == keep:
+                break
+            self._evict(user_id)
+            self.evicted_memory += 1
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evict users idle for longer than the TTL"""
+        now = now if now is not None else time.monotonic()
+        self._last_sweep = now
+        removed = 0
+        while self._users:
+            user_id = next(iter(self._users))
+            if now - self._users[user_id].last_active < self.idle_ttl:
+                break
+            self._evict(user_id)
+            removed += 1
+        if removed:
+            self.evicted_idle += removed
+            logger.debug(f"🧹 Evicted conversation memory of {removed} idle user(s)")
+        return removed
+
+    def _evict(self, user_id: str):
+        history = self._users.pop(user_id)
+        self.bytes -= history.size
+        if self._on_evict is not None:
+            self._on_evict(user_id)
+
+    def get_stats(self) -> dict:
+        return {
+            'users': len(self._users),
+            'turns': sum(len(h.turns) for h in self._users.values()),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'evicted_idle': self.evicted_idle,
+            'evicted_memory': self.evicted_memory,
+        }
@@ -0,0 +1,182 @@
+import time
+import heapq
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from config.settings import Config
+
+# Wait samples kept per tenant for percentile metrics
+WAIT_SAMPLES = 256
+# Wait metrics of tenants not served for this long are dropped; at most
+# MAX_TENANT_STATS tenants (least recently served evicted first) are kept,
+# since every DM user is a tenant of their own
+TENANT_STATS_TTL = 3600.0
+MAX_TENANT_STATS = 1000
+
+
+class _Flow:
+    """Backlog of one tenant: a guild (round-robin over its users) or a single DM user."""
+    __slots__ = ('key', 'weight', 'users', 'size', 'finish')
+
+    def __init__(self, key: str, weight: float):
+        self.key = key
+        self.weight = weight
+        self.users: "OrderedDict[str, Deque[Tuple[Any, float]]]" = OrderedDict()
+        self.size = 0
+        self.finish = 0.0
+
+
+class _TenantStats:
+    __slots__ = ('served', 'waits', 'last_served')
+
+    def __init__(self):
+        self.served = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.last_served = 0.0
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class FairScheduler:
+    """
+    Weighted fair queue for LLM work.
+
+    Each guild is one flow and each DM user is a flow of their own. Flows are
+    served in order of virtual finish time (start + 1/weight), so a guild
+    with a deep backlog cannot starve a quiet one, and a premium guild gets
+    proportionally more turns. Inside a guild, users take turns round-robin.
+    """
+
+    def __init__(self):
+        self.dm_weight = Config.FAIR_DM_WEIGHT
+        self.guild_weight = Config.FAIR_GUILD_WEIGHT
+        self.premium_weight = Config.FAIR_PREMIUM_WEIGHT
+        self.premium_guilds = set(Config.PREMIUM_GUILD_IDS)
+
+        self._flows: Dict[str, _Flow] = {}
+        self._heap: List[Tuple[float, int, _Flow]] = []
+        self._seq = 0
+        self._virtual_time = 0.0
+        self._size = 0
+        # item -> (flow key, user id) so deadline expiry can remove a waiter
+        self._index: Dict[Any, Tuple[str, str]] = {}
+        # Last-served order, so idle tenants are evicted from the front
+        self._stats: "OrderedDict[str, _TenantStats]" = OrderedDict()
+
+    @staticmethod
+    def tenant_key(guild_id: Optional[str], user_id: str) -> str:
+        return f"guild:{guild_id}" if guild_id else f"dm:{user_id}"
+
+    def weight_for(self, guild_id: Optional[str]) -> float:
+        if not guild_id:
+            return self.dm_weight
+        if guild_id in self.premium_guilds:
+            return self.premium_weight
+        return self.guild_weight
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: Any, guild_id: Optional[str], user_id: str):
+        key = self.tenant_key(guild_id, user_id)
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow(key, max(0.01, self.weight_for(guild_id)))
+        if flow.size == 0:
+            # Newly backlogged flow starts at the current virtual time
+            flow.finish = self._virtual_time + 1.0 / flow.weight
+            self._push_flow(flow)
+        flow.users.setdefault(user_id, deque()).append((item, time.monotonic()))
+        flow.size += 1
+        self._size += 1
+        self._index[item] = (key, user_id)
+
+    def pop(self) -> Optional[Any]:
+        """Next item in fair order, or None when empty."""
+        while self._heap:
+            tag, _, flow = heapq.heappop(self._heap)
+            if self._flows.get(flow.key) is not flow or flow.size == 0 or tag != flow.finish:
+                continue  # stale heap entry
+            user_id, queue = next(iter(flow.users.items()))
+            item, enqueued_at = queue.popleft()
+            if queue:
+                flow.users.move_to_end(user_id)
+            else:
+                del flow.users[user_id]
+            flow.size -= 1
+            self._size -= 1
+            self._index.pop(item, None)
+            self._virtual_time = tag
+            if flow.size:
+                flow.finish = tag + 1.0 / flow.weight
+                self._push_flow(flow)
+            else:
+                del self._flows[flow.key]
+            self.record_wait(flow.key, time.monotonic() - enqueued_at)
+            return item
+        return None
+
+    def remove(self, item: Any) -> bool:
+        """Drop a waiting item (e.g. its deadline passed). Returns False if not queued."""
+        location = self._index.pop(item, None)
+        if location is None:
+            return False
+        key, user_id = location
+        flow = self._flows[key]
+        queue = flow.users[user_id]
+        for entry in queue:
+            if entry[0] == item:
+                queue.remove(entry)
+                break
+        if not queue:
+            del flow.users[user_id]
+        flow.size -= 1
+        self._size -= 1
+        if flow.size == 0:
+            del self._flows[key]
+        return True
+
+    def record_wait(self, tenant: str, seconds: float):
+        now = time.monotonic()
+        stats = self._stats.get(tenant)
+        if stats is None:
+            stats = self._stats[tenant] = _TenantStats()
+        else:
+            self._stats.move_to_end(tenant)
+        stats.served += 1
+        stats.waits.append(seconds)
+        stats.last_served = now
+        self._evict_stats(now)
+
+    def _evict_stats(self, now: float):
+        while self._stats:
+            tenant, oldest = next(iter(self._stats.items()))
+            if len(self._stats) <= MAX_TENANT_STATS and now - oldest.last_served < TENANT_STATS_TTL:
+                break
+            del self._stats[tenant]
+
+    def _push_flow(self, flow: _Flow):
+        self._seq += 1
+        heapq.heappush(self._heap, (flow.finish, self._seq, flow))
+
+    def get_tenant_stats(self, limit: int = 10) -> List[dict]:
+        """Per-tenant wait metrics, worst p99 first."""
+        self._evict_stats(time.monotonic())
+        result = []
+        for tenant, stats in self._stats.items():
+            waits = sorted(stats.waits)
+            flow = self._flows.get(tenant)
+            result.append({
+                'tenant': tenant,
+                'served': stats.served,
+                'waiting': flow.size if flow else 0,
+                'p50_wait': round(_percentile(waits, 50), 2),
+                'p99_wait': round(_percentile(waits, 99), 2),
+                'max_wait': round(waits[-1], 2) if waits else 0.0,
+            })
+        result.sort(key=lambda s: s['p99_wait'], reverse=True)
+        return result[:limit]
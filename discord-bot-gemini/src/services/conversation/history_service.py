@@ -2,17 +2,16 @@ import json
 import os
 import logging
 from typing import List, Dict, Optional
+from config.settings import Config
 
 logger = logging.getLogger(__name__)
 
 class HistoryService:
     def __init__(self, summaries_dir: Optional[str] = None):
         # FIXED: Use absolute path if not provided
-        # Chuẩn hóa: Luôn lưu vào src/data/user_summaries
+        # Chuẩn hóa: Luôn lưu vào src/data/user_summaries (dùng chung cho mọi shard)
         if summaries_dir is None or not os.path.isabs(summaries_dir):
-            # Chuẩn hóa: lấy đúng project root
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            self.summaries_dir = os.path.join(project_root, 'data', 'user_summaries')
+            self.summaries_dir = str(Config.USER_SUMMARIES_DIR)
         else:
             self.summaries_dir = summaries_dir
         
@@ -0,0 +1,123 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger('discord_bot.MessageDebouncer')
+
+
+class _Burst:
+    __slots__ = ('items', 'first_at', 'timer')
+
+    def __init__(self, now: float):
+        self.items: List[Tuple[object, str]] = []
+        self.first_at = now
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MergedMessage:
+    """
+    Stands in for a burst's messages: behaves like the first fragment (so the
+    reply goes to it) but carries the mentions of every fragment.
+    """
+
+    def __init__(self, messages: List[object]):
+        self._first = messages[0]
+        self.messages = messages
+        mentions: Dict[int, object] = {}
+        for message in messages:
+            for member in getattr(message, 'mentions', None) or []:
+                mentions.setdefault(member.id, member)
+        self.mentions = list(mentions.values())
+
+    def __getattr__(self, name: str):
+        return getattr(self._first, name)
+
+
+class MessageDebouncer:
+    """
+    Merges rapid-fire messages into one LLM turn.
+
+    People type in fragments ("ê", "cho hỏi", "cái này sao vậy"). Each message
+    from the same user in the same channel restarts a short quiet window;
+    when the window passes (or the burst hits max_wait / max_messages) the
+    fragments are handed to the handler as one newline-joined prompt,
+    replying to the first message with the mentions of all of them.
+    """
+
+    def __init__(self, window: Optional[float] = None, max_wait: Optional[float] = None,
+                 max_messages: Optional[int] = None):
+        self.window = Config.DEBOUNCE_WINDOW if window is None else window
+        self.max_wait = max_wait or Config.DEBOUNCE_MAX_WAIT
+        self.max_messages = max_messages or Config.DEBOUNCE_MAX_MESSAGES
+        self._handler: Optional[Callable[..., Awaitable]] = None
+        self._bursts: Dict[Tuple[str, str], _Burst] = {}
+        self._tasks: set = set()
+
+        self.messages_in = 0
+        self.turns_out = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def set_handler(self, handler: Callable[..., Awaitable]):
+        """Register the coroutine that answers a merged burst: handler(message, content, user_id)"""
+        self._handler = handler
+
+    def add(self, message, content: str):
+        user_id = str(message.author.id)
+        key = (user_id, str(message.channel.id))
+        now = time.monotonic()
+
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst(now)
+        burst.items.append((message, content))
+        self.messages_in += 1
+
+        if burst.timer is not None:
+            burst.timer.cancel()
+        if len(burst.items) >= self.max_messages:
+            delay = 0.0
+        else:
+            delay = max(0.0, min(self.window, burst.first_at + self.max_wait - now))
+        burst.timer = asyncio.get_running_loop().call_later(delay, self._fire, key)
+
+    def _fire(self, key: Tuple[str, str]):
+        burst = self._bursts.pop(key, None)
+        if burst is None or not burst.items:
+            return
+        task = asyncio.create_task(self._dispatch(key[0], burst.items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, user_id: str, items: List[Tuple[object, str]]):
+        self.turns_out += 1
+        merged_content = "\n".join(content for _, content in items)
+        if len(items) > 1:
+            logger.info(f"🧩 Merged {len(items)} messages from user {user_id} into one turn")
+        try:
+            message = items[0][0] if len(items) == 1 else MergedMessage([m for m, _ in items])
+            await self._handler(message, merged_content, user_id)
+        except Exception as e:
+            logger.error(f"❌ Error handling debounced messages for {user_id}: {e}")
+
+    async def flush_all(self):
+        """Dispatch every open burst now (e.g. on shutdown)"""
+        for key in list(self._bursts):
+            burst = self._bursts.get(key)
+            if burst and burst.timer is not None:
+                burst.timer.cancel()
+            self._fire(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            'window': self.window,
+            'open_bursts': len(self._bursts),
+            'messages_in': self.messages_in,
+            'turns_out': self.turns_out,
+        }
@@ -0,0 +1,144 @@
+import math
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Hashable, List, Optional
+from config.settings import Config
+
+
+class BloomFilter:
+    """
+    Two-generation Bloom filter sized for `capacity` keys per generation.
+
+    Bloom filters cannot delete, so the current generation is retired once it
+    has taken `capacity` new keys; a key is looked up in both generations.
+    The dedup ring evicts a key after at most `capacity` newer keys, so every
+    key it still holds is in one of the two generations and a negative answer
+    is always a true negative. Refreshing a key sets its bits again without
+    counting towards rotation.
+    """
+    __slots__ = ('size', 'hashes', 'capacity', '_current', '_previous', '_count')
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._current = bytearray((self.size + 7) // 8)
+        self._previous = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, key: Hashable):
+        h1 = hash(key)
+        h2 = hash((key, 0x9E3779B9)) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: Hashable, new: bool = True):
+        if new and self._count >= self.capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+        bits = self._current
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        if new:
+            self._count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        positions = list(self._positions(key))
+        for bits in (self._current, self._previous):
+            if all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+                return True
+        return False
+
+
+class MessageDeduplicator:
+    """
+    Bounded, time-ordered record of recently seen message keys.
+
+    Keys live in an insertion-ordered ring (OrderedDict) with a fixed TTL, so
+    the oldest entry is always at the front: expiry and capacity eviction pop
+    from the front in O(1) and memory is bounded by `max_entries`.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 use_bloom: Optional[bool] = None):
+        self.max_entries = max(1, max_entries or Config.DEDUP_MAX_ENTRIES)
+        self.ttl = ttl or Config.DEDUP_TTL
+        if use_bloom is None:
+            use_bloom = Config.DEDUP_USE_BLOOM
+        self._bloom = BloomFilter(self.max_entries, Config.DEDUP_BLOOM_FP_RATE) if use_bloom else None
+        # key -> expiry (monotonic seconds)
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bloom_negatives = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.seen(key)
+
+    def seen(self, key: Hashable) -> bool:
+        """True if the key was marked within the TTL."""
+        now = time.monotonic()
+        self._expire(now)
+        if self._bloom is not None and key not in self._bloom:
+            self.bloom_negatives += 1
+            self.misses += 1
+            return False
+        if key in self._seen:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def mark(self, key: Hashable):
+        now = time.monotonic()
+        is_new = key not in self._seen
+        if not is_new:
+            self._seen.move_to_end(key)
+        if self._bloom is not None:
+            self._bloom.add(key, new=is_new)
+        self._seen[key] = now + self.ttl
+        self._expire(now)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+
+    def check_and_mark(self, key: Hashable) -> bool:
+        """Mark the key; returns True if it was already seen (duplicate)."""
+        if self.seen(key):
+            return True
+        self.mark(key)
+        return False
+
+    def _expire(self, now: float):
+        seen = self._seen
+        while seen:
+            oldest_key = next(iter(seen))
+            if seen[oldest_key] > now:
+                break
+            seen.popitem(last=False)
+            self.expired += 1
+
+    def recent(self, count: int = 5) -> List[Hashable]:
+        """Most recently marked keys, newest last."""
+        return list(reversed(list(islice(reversed(self._seen), count))))
+
+    def get_stats(self) -> dict:
+        return {
+            'entries': len(self._seen),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'bloom': self._bloom is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bloom_negatives': self.bloom_negatives,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
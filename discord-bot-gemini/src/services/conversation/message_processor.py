@@ -1,7 +1,6 @@
-import asyncio
 import logging
-from datetime import datetime
-from typing import Optional
+from services.conversation.message_deduplicator import MessageDeduplicator
+from services.state.state_client import get_state_client
 
 logger = logging.getLogger('discord_bot.MessageProcessor')
 
@@ -9,80 +8,69 @@ class MessageProcessor:
     """Handles message processing and duplicate prevention"""
     
     def __init__(self):
-        self.processed_messages = set()
+        # Bounded, TTL-ordered record of handled messages (replaces the old
+        # unbounded sets and arbitrary-half pruning)
+        self.processed_messages = MessageDeduplicator()
         self.processing_messages = set()
-        self.message_locks = {}
+        # With a state server, gateway ids are also deduplicated across bot processes
+        self.state = get_state_client()
         
     def create_message_key(self, message) -> str:
         """Create unique message identifier"""
         return f"{message.id}_{message.author.id}_{message.channel.id}"
+
+    async def mark_received(self, message) -> bool:
+        """Record a gateway message event; returns False if this id was already received"""
+        if self.processed_messages.check_and_mark(message.id):
+            return False
+        if self.state is not None:
+            # Another bot process on the same gateway events may have taken it
+            return not await self.state.check_and_mark(f"message:{message.id}")
+        return True
     
     async def should_process_message(self, message) -> bool:
         """Check if message should be processed (anti-duplicate)"""
         message_key = self.create_message_key(message)
         
-        # Check if already processed
-        if message_key in self.processed_messages:
-            logger.debug(f"🔄 Message {message_key} already processed")
-            return False
-            
         # Check if currently processing
         if message_key in self.processing_messages:
             logger.debug(f"🔄 Message {message_key} currently processing")
             return False
+
+        # Check if already processed
+        if self.processed_messages.seen(message_key):
+            logger.debug(f"🔄 Message {message_key} already processed")
+            return False
             
         return True
     
     async def process_with_lock(self, message, process_func):
-        """Process message with lock protection"""
+        """Process message at most once (in-flight keys act as the lock)"""
         message_key = self.create_message_key(message)
         
-        # Create lock if not exists
-        if message_key not in self.message_locks:
-            self.message_locks[message_key] = asyncio.Lock()
-        
-        # Try to acquire lock
-        if self.message_locks[message_key].locked():
+        if message_key in self.processing_messages:
             logger.debug(f"🔒 Message {message_key} lock already acquired")
             return
+        if self.processed_messages.seen(message_key):
+            return
             
-        async with self.message_locks[message_key]:
-            # Double check
-            if message_key in self.processed_messages:
-                return
-            
-            # Mark as processing
-            self.processing_messages.add(message_key)
-            
-            try:
-                await process_func(message)
-            finally:
-                # Mark as processed and cleanup
-                self.processed_messages.add(message_key)
-                self.processing_messages.discard(message_key)
-                self._cleanup_old_data()
-    
-    def _cleanup_old_data(self):
-        """Clean up old processed messages and locks"""
-        if len(self.processed_messages) > 500:
-            old_messages = list(self.processed_messages)[:250]
-            for old_msg in old_messages:
-                self.processed_messages.discard(old_msg)
-        
-        if len(self.message_locks) > 100:
-            old_locks = list(self.message_locks.keys())[:50]
-            for old_lock_key in old_locks:
-                if old_lock_key in self.message_locks and not self.message_locks[old_lock_key].locked():
-                    del self.message_locks[old_lock_key]
+        # Mark as processing
+        self.processing_messages.add(message_key)
+        try:
+            await process_func(message)
+        finally:
+            # Mark as processed
+            self.processed_messages.mark(message_key)
+            self.processing_messages.discard(message_key)
     
     def get_debug_info(self) -> dict:
         """Get debug information"""
-        locked_messages = [key for key, lock in self.message_locks.items() if lock.locked()]
         return {
             'processed_count': len(self.processed_messages),
             'processing_count': len(self.processing_messages),
-            'locks_count': len(self.message_locks),
-            'recent_processed': list(self.processed_messages)[-5:],
+            'locks_count': len(self.processing_messages),
+            'recent_processed': self.processed_messages.recent(5),
             'current_processing': list(self.processing_messages),
-            'locked_messages': locked_messages[-5:]
-        }
\ No newline at end of file
+            'locked_messages': list(self.processing_messages)[-5:],
+            'dedup_stats': self.processed_messages.get_stats()
+        }
@@ -0,0 +1,150 @@
+"""
+Shutdown Coordinator - Stops the bot without losing replies or data.
+
+Runs from DiscordBot.close() while the gateway and HTTP client are still
+up, in this order:
+
+1. stop intake: new messages are ignored (and left unmarked, so another
+   bot process sharing the state server can answer them);
+2. answer what was already accepted: debounced bursts, running turns and
+   queued messages, then deliver their replies, all within SHUTDOWN_TIMEOUT;
+3. wait for background jobs (relationship processing, summary updates)
+   for what is left of the deadline, then cancel the rest;
+4. run relationship extraction on buffered messages if time remains;
+5. flush dirty stores, stop the provider health prober, close the
+   Ollama/Gemini HTTP sessions and the state server connection, and wait
+   for every queued file write.
+
+Step 5 always runs in full; steps 2-4 are bounded by the deadline.
+"""
+import time
+import asyncio
+import logging
+from typing import Iterable, Optional
+
+from config.settings import Config
+from services.state.state_client import close_state_client
+from utils.async_io import get_io_executor, shutdown_io_executor
+
+logger = logging.getLogger('discord_bot.ShutdownCoordinator')
+
+
+class ShutdownCoordinator:
+    def __init__(self, bot, timeout: Optional[float] = None):
+        self.bot = bot
+        self.timeout = Config.SHUTDOWN_TIMEOUT if timeout is None else timeout
+        self._deadline = 0.0
+        self.report: dict = {}
+
+    def _remaining(self) -> float:
+        return max(0.0, self._deadline - time.monotonic())
+
+    async def run(self) -> dict:
+        started = time.monotonic()
+        self._deadline = started + self.timeout
+        logger.info(f"🛑 Shutting down (up to {self.timeout:.0f}s to finish replies)...")
+
+        llm_service = self.bot.get_cog('LLMMessageService')
+        if llm_service is not None:
+            llm_service.stop_intake()
+            await self._step("drain replies", self._drain_replies(llm_service))
+            await self._step("background jobs", self._wait_background(llm_service))
+            await self._step("relationship extraction", self._run_extraction(llm_service))
+            await self._step("flush stores", self._flush_stores(llm_service))
+            await self._step("close sessions", self._close_sessions(llm_service))
+        await self._step("close state client", close_state_client())
+        await self._step("finish file writes", self._finish_writes())
+
+        self.report['seconds'] = round(time.monotonic() - started, 1)
+        logger.info("🛑 Shutdown complete: " + ", ".join(f"{k}={v}" for k, v in self.report.items()))
+        return self.report
+
+    async def _step(self, name: str, coro):
+        # One failing step must not keep the others (above all the flushes) from running
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"❌ Shutdown step '{name}' failed: {e}")
+            self.report.setdefault('failed_steps', []).append(name)
+
+    async def _wait(self, tasks: Iterable[asyncio.Task]) -> int:
+        """Wait for tasks until the deadline; returns how many are still running."""
+        tasks = [t for t in tasks if not t.done() and t is not asyncio.current_task()]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=self._remaining())
+        return len(pending)
+
+    async def _drain_replies(self, llm_service):
+        delivery_queue = llm_service.delivery_queue
+        delivered_before = delivery_queue.delivered
+        debouncer = llm_service.debouncer
+        bursts = debouncer.get_stats()['open_bursts']
+        self.report['bursts_flushed'] = bursts
+        if bursts:
+            # Dispatches every open burst as a turn and waits for those turns
+            try:
+                await asyncio.wait_for(debouncer.flush_all(), self._remaining())
+            except asyncio.TimeoutError:
+                pass
+
+        # Turns release their lock on completion, which may start a drain of
+        # queued messages; keep waiting until no new work appears
+        completed = 0
+        unfinished = 0
+        while True:
+            turns = {t for t in llm_service.in_flight_turns() if not t.done()}
+            if not turns:
+                break
+            unfinished = await self._wait(turns)
+            completed += len(turns) - unfinished
+            if unfinished or not self._remaining():
+                break
+        conversation_manager = llm_service.queue_manager.conversation_manager
+        self.report['turns_completed'] = completed
+        self.report['turns_unfinished'] = unfinished
+        self.report['queued_messages_dropped'] = conversation_manager.cancel_pending()
+
+        await delivery_queue.drain(timeout=self._remaining())
+        self.report['replies_delivered'] = delivery_queue.delivered - delivered_before
+        self.report['replies_undelivered'] = delivery_queue.pending_count()
+
+    async def _wait_background(self, llm_service):
+        tasks = llm_service.background_tasks()
+        pending = await self._wait(tasks)
+        self.report['background_jobs_finished'] = len(tasks) - pending
+        if pending:
+            for task in llm_service.background_tasks():
+                task.cancel()
+            self.report['background_jobs_cancelled'] = pending
+
+    async def _run_extraction(self, llm_service):
+        extractor = llm_service.relationship_service.extractor
+        # Extraction needs LLM calls: only attempted while time is left
+        if extractor.pending_count() and self._remaining():
+            try:
+                await asyncio.wait_for(extractor.flush_all(), self._remaining())
+            except asyncio.TimeoutError:
+                pass
+        self.report['extraction_messages_dropped'] = extractor.pending_count()
+        await extractor.close()
+
+    async def _flush_stores(self, llm_service):
+        flushed = await llm_service.relationship_service.close()
+        self.report['relationship_files_flushed'] = len(flushed)
+
+    async def _close_sessions(self, llm_service):
+        # The prober shares the provider sessions
+        await llm_service.health_prober.stop()
+        closed = []
+        for name in ('ollama_service', 'gemini_service'):
+            service = getattr(llm_service, name, None)
+            if service is not None and service.session is not None:
+                await service.close()
+                closed.append(name)
+        self.report['sessions_closed'] = len(closed)
+
+    async def _finish_writes(self):
+        # History/summary writes queued on the data I/O thread; wait for them off the loop
+        self.report['file_writes_pending'] = get_io_executor()._work_queue.qsize()
+        await asyncio.get_running_loop().run_in_executor(None, shutdown_io_executor)
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import discord
+from config.settings import Config
 
 logger = logging.getLogger("discord_bot.ContextBuilder")
 
@@ -35,10 +37,110 @@ class ContextBuilder:
             content = content.replace(f"<@!{self.bot.user.id}>", "").strip()
         return content
 
+    async def assemble_context(
+        self,
+        message,
+        content: str,
+        user_id: str,
+        context: str,
+        include_relationships: bool = True,
+        include_mentions: bool = True,
+    ) -> str:
+        """
+        Build enhanced context with profile, relationships and mentioned users
+        fetched concurrently. File loads run on the data I/O thread and each
+        stage has its own timeout; a slow stage is left out of the prompt
+        instead of delaying the reply. The relationship section is built on
+        the loop, because it reads RelationshipService's live dicts, which the
+        loop mutates. It is synchronous, so its stage timeout cannot cut it
+        short; it only touches this user's relationships (name index) and
+        mention-matrix row.
+        """
+        user_summary, relationship_section, mentioned_users_info = await asyncio.gather(
+            self._run_stage(
+                "profile", self.summary_service.get_user_summary_async(user_id)
+            ),
+            self._run_stage(
+                "relationships",
+                self._relationship_stage(user_id),
+            )
+            if include_relationships
+            else self._empty_stage(),
+            self._run_stage(
+                "mentions", self.get_mentioned_users_info_async(content, message)
+            )
+            if include_mentions
+            else self._empty_stage(),
+        )
+        return self.compose_context(
+            user_id, user_summary, mentioned_users_info, context, relationship_section
+        )
+
+    async def _run_stage(self, name: str, coro) -> str:
+        try:
+            return await asyncio.wait_for(coro, timeout=Config.CONTEXT_STAGE_TIMEOUT) or ""
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⚠️ Context stage '{name}' timed out after {Config.CONTEXT_STAGE_TIMEOUT}s, skipping"
+            )
+        except Exception as e:
+            logger.error(f"Error in context stage '{name}': {e}")
+        return ""
+
+    @staticmethod
+    async def _empty_stage() -> str:
+        return ""
+
+    async def _relationship_stage(self, user_id: str) -> str:
+        # Runs to completion once started (no await inside): kept small by the indexes
+        return self.build_relationship_section(user_id)
+
     def build_enhanced_context(
-        self, user_id: str, user_summary: str, mentioned_users_info: str, context: str
+        self,
+        user_id: str,
+        user_summary: str,
+        mentioned_users_info: str,
+        context: str,
+        include_relationships: bool = True,
     ) -> str:
-        """Build enhanced context for AI"""
+        """Build enhanced context for AI (include_relationships=False gives a shorter prompt under load)"""
+        relationship_section = ""
+        if include_relationships:
+            try:
+                relationship_section = self.build_relationship_section(user_id)
+            except Exception as e:
+                logger.error(f"Error getting relationship context: {e}")
+        return self.compose_context(
+            user_id, user_summary, mentioned_users_info, context, relationship_section
+        )
+
+    def build_relationship_section(self, user_id: str) -> str:
+        """Relationship and frequent-contact section (must run on the event loop)"""
+        user_display_name = self.relationship_service.get_user_display_name(user_id)
+        user_relationships = self.relationship_service.get_user_relationships(user_id)
+        interaction_stats = self.relationship_service.get_interaction_stats(user_id)
+        if not user_relationships and interaction_stats.get("total_interactions", 0) <= 0:
+            return ""
+        section = f"=== MỐI QUAN HỆ VÀ TƯƠNG TÁC CỦA {user_display_name} ===\n"
+        if user_relationships:
+            section += "Mối quan hệ:\n"
+            for rel in user_relationships[:5]:
+                section += f"- {rel['other_person']}: {rel['relationship_type']}\n"
+        if interaction_stats.get("top_contacts"):
+            section += "\nNgười liên lạc thường xuyên:\n"
+            for contact in interaction_stats["top_contacts"][:3]:
+                section += f"- {contact['name']}: {contact['interaction_count']} lần tương tác\n"
+        return section + "\n"
+
+    def compose_context(
+        self,
+        user_id: str,
+        user_summary: str,
+        mentioned_users_info: str,
+        context: str,
+        relationship_section: str = "",
+    ) -> str:
+        """Assemble the prompt context from already-fetched sections"""
         enhanced_context = ""
 
         # Check if we know the user's real name
@@ -65,29 +167,7 @@ class ContextBuilder:
         if not real_name_known:
             enhanced_context += f'=== LƯU Ý QUAN TRỌNG ===\nNgười dùng chưa cho biết tên thật.\nHÃY GỌI HỌ LÀ: "{discord_name}" (đây là tên hiển thị của họ).\n\n'
 
-        try:
-            user_display_name = self.relationship_service.get_user_display_name(user_id)
-            user_relationships = self.relationship_service.get_user_relationships(
-                user_id
-            )
-            interaction_stats = self.relationship_service.get_interaction_stats(user_id)
-            if user_relationships or interaction_stats.get("total_interactions", 0) > 0:
-                enhanced_context += (
-                    f"=== MỐI QUAN HỆ VÀ TƯƠNG TÁC CỦA {user_display_name} ===\n"
-                )
-                if user_relationships:
-                    enhanced_context += "Mối quan hệ:\n"
-                    for rel in user_relationships[:5]:
-                        enhanced_context += (
-                            f"- {rel['other_person']}: {rel['relationship_type']}\n"
-                        )
-                if interaction_stats.get("top_contacts"):
-                    enhanced_context += "\nNgười liên lạc thường xuyên:\n"
-                    for contact in interaction_stats["top_contacts"][:3]:
-                        enhanced_context += f"- {contact['name']}: {contact['interaction_count']} lần tương tác\n"
-                enhanced_context += "\n"
-        except Exception as e:
-            logger.error(f"Error getting relationship context: {e}")
+        enhanced_context += relationship_section
         if mentioned_users_info:
             enhanced_context += (
                 f"=== THÔNG TIN VỀ NGƯỜI ĐƯỢC NHẮC ĐẾN ===\n{mentioned_users_info}\n\n"
@@ -117,14 +197,13 @@ class ContextBuilder:
         except Exception:
             return None
 
-    def get_mentioned_users_info(self, content: str, message=None) -> str:
-        """Get information about mentioned users, prefer display name/nickname over ID"""
+    def _mentioned_display_names(self, content: str, message=None) -> list:
+        """[(user_id, display_name)] for each <@id> mention in content"""
         import re
 
         user_mentions = re.findall(r"<@!?(\d+)>", content)
         if not user_mentions:
-            return ""
-        mentioned_info_parts = []
+            return []
         mention_name_map = {}
         if message and hasattr(message, "mentions"):
             for m in message.mentions:
@@ -135,28 +214,65 @@ class ContextBuilder:
                     or str(m.id)
                 )
                 mention_name_map[str(m.id)] = display
+        result = []
         for mentioned_user_id in user_mentions:
             display_name = mention_name_map.get(mentioned_user_id)
             if not display_name and hasattr(self, "relationship_service"):
                 display_name = self.relationship_service.get_user_display_name(
                     mentioned_user_id
                 )
-            if not display_name:
-                display_name = mentioned_user_id
+            result.append((mentioned_user_id, display_name or mentioned_user_id))
+        return result
+
+    @staticmethod
+    def _format_mentioned_user(
+        mentioned_user_id: str, display_name: str, mentioned_user_summary: str
+    ) -> str:
+        if mentioned_user_summary:
+            return f"{display_name} (ID: {mentioned_user_id}):\n{mentioned_user_summary}"
+        return f"{display_name} (ID: {mentioned_user_id}): Chưa có thông tin"
+
+    def get_mentioned_users_info(self, content: str, message=None) -> str:
+        """Get information about mentioned users, prefer display name/nickname over ID"""
+        mentioned_info_parts = []
+        for mentioned_user_id, display_name in self._mentioned_display_names(
+            content, message
+        ):
             try:
                 mentioned_user_summary = self.summary_service.get_user_summary(
                     mentioned_user_id
                 )
-                if mentioned_user_summary:
-                    mentioned_info_parts.append(
-                        f"{display_name} (ID: {mentioned_user_id}):\n{mentioned_user_summary}"
-                    )
-                else:
-                    mentioned_info_parts.append(
-                        f"{display_name} (ID: {mentioned_user_id}): Chưa có thông tin"
+                mentioned_info_parts.append(
+                    self._format_mentioned_user(
+                        mentioned_user_id, display_name, mentioned_user_summary
                     )
+                )
             except Exception as e:
                 logger.error(
                     f"Error getting info for mentioned user {mentioned_user_id}: {e}"
                 )
         return "\n\n".join(mentioned_info_parts) if mentioned_info_parts else ""
+
+    async def get_mentioned_users_info_async(self, content: str, message=None) -> str:
+        """Like get_mentioned_users_info, loading all mentioned summaries concurrently"""
+        mentioned = self._mentioned_display_names(content, message)
+        if not mentioned:
+            return ""
+        summaries = await asyncio.gather(
+            *(
+                self.summary_service.get_user_summary_async(uid)
+                for uid, _ in mentioned
+            ),
+            return_exceptions=True,
+        )
+        mentioned_info_parts = []
+        for (mentioned_user_id, display_name), summary in zip(mentioned, summaries):
+            if isinstance(summary, Exception):
+                logger.error(
+                    f"Error getting info for mentioned user {mentioned_user_id}: {summary}"
+                )
+                continue
+            mentioned_info_parts.append(
+                self._format_mentioned_user(mentioned_user_id, display_name, summary)
+            )
+        return "\n\n".join(mentioned_info_parts) if mentioned_info_parts else ""
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger("discord_bot.DeliveryQueue")
+
+DeliveryJob = Callable[[], Awaitable]
+
+
+class DeliveryQueue:
+    """
+    Per-channel FIFO of reply deliveries.
+
+    Generated replies are handed over here so the typing simulation plays
+    out without holding the user's conversation lock; the next generation
+    can start while the previous reply is still being "typed". Each channel
+    has one worker, so replies in a channel never interleave. Workers exit
+    when their channel is idle.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self.delivered = 0
+        self.failed = 0
+
+    def enqueue(self, channel_id, job: DeliveryJob) -> asyncio.Future:
+        """Queue a delivery; the returned future resolves once it has been sent."""
+        key = str(channel_id)
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+        queue.put_nowait((job, done))
+        if key not in self._workers:
+            self._workers[key] = loop.create_task(self._run(key, queue))
+        return done
+
+    async def _run(self, key: str, queue: asyncio.Queue):
+        try:
+            while not queue.empty():
+                job, done = queue.get_nowait()
+                try:
+                    await job()
+                    self.delivered += 1
+                    if not done.done():
+                        done.set_result(True)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"❌ Error delivering response in channel {key}: {e}")
+                    if not done.done():
+                        done.set_result(False)
+        finally:
+            self._workers.pop(key, None)
+            if queue.empty():
+                self._queues.pop(key, None)
+
+    def pending_count(self, channel_id=None) -> int:
+        if channel_id is not None:
+            queue = self._queues.get(str(channel_id))
+            return queue.qsize() if queue else 0
+        return sum(q.qsize() for q in self._queues.values())
+
+    async def drain(self, timeout: float = None):
+        """Wait until all queued deliveries are sent (e.g. on shutdown)"""
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            'active_channels': len(self._workers),
+            'pending': self.pending_count(),
+            'delivered': self.delivered,
+            'failed': self.failed,
+        }
@@ -1,13 +1,24 @@
+import asyncio
 import logging
+from typing import Set
 from discord.ext import commands
 from services.ai.gemini_service import GeminiService
 from services.ai.ollama_service import OllamaService
+from services.ai.provider_router import ProviderRouter
+from services.ai.health_prober import HealthProber
 from services.messeger.message_queue import MessageQueueManager
 from services.messeger.context_builder import ContextBuilder
+from services.messeger.delivery_queue import DeliveryQueue
+from services.conversation.message_debouncer import MessageDebouncer
+from services.conversation.admission_controller import (
+    AdmissionController,
+    AdmissionRejected,
+)
 from services.relationship.relationship_service import RelationshipService
+from services.relationship.name_extractor import extract_self_name
 from services.user_summary.summary_service import SummaryService
 from config.settings import Config
-import re
+from utils.text_processing import split_natural
 
 logger = logging.getLogger("discord_bot.LLMMessageService")
 
@@ -18,32 +29,60 @@ class LLMMessageService(commands.Cog):
 
         # Initialize AI services
         self.ollama_service = OllamaService()
-        self.gemini_service = GeminiService() if Config.USE_OLLAMA_BACKUP else None
+        self.gemini_service = GeminiService() if Config.GEMINI_API_KEY else None
+        # Replies go to the fastest healthy provider; slow requests are hedged
+        self.router = ProviderRouter([
+            ("Ollama", self.ollama_service if Config.USE_OLLAMA_BACKUP else None),
+            ("Gemini", self.gemini_service),
+        ])
+        # Opens a provider's circuit as soon as its health endpoint stops answering
+        self.health_prober = HealthProber(self.router)
 
         # Use Ollama as primary service for summaries/relationships
         self.summary_service = SummaryService(self.ollama_service)
         self.relationship_service = RelationshipService(self.ollama_service)
         self.queue_manager = MessageQueueManager()
+        # Global cap on concurrent LLM calls with staged degradation under load
+        self.admission = AdmissionController()
+        # Replies are typed out per channel without holding the user's lock
+        self.delivery_queue = DeliveryQueue()
         self.context_builder = ContextBuilder(
             bot, self.summary_service, self.relationship_service
         )
-        self._processed_message_ids = set()  # Dùng set để lưu các message đã xử lý
+        # Messages queued while a user was busy are answered together on lock release
+        self.queue_manager.set_pending_handler(self._process_ai_response)
+        # Rapid-fire fragments are merged before they reach the lock/queue
+        self.debouncer = MessageDebouncer()
+        self.debouncer.set_handler(self._handle_turn)
+        # Shutdown bookkeeping: intake switch, running turns, fire-and-forget jobs
+        self.accepting = True
+        self._active_turns: Set[asyncio.Task] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+
+        logger.info(
+            f"🤖 LLMMessageService initialized with providers: {', '.join(self.router.names)}"
+            + (" (hedged)" if self.router.hedge_enabled else "")
+        )
 
-        if self.gemini_service:
-            logger.info(
-                "🤖 LLMMessageService initialized with Ollama (primary) + Gemini (backup)"
+    async def cog_load(self):
+        self.health_prober.start()
+        if Config.HISTORY_PREFETCH_USERS > 0:
+            self._spawn(
+                self.queue_manager.conversation_manager.prefetch_recent_histories(
+                    Config.HISTORY_PREFETCH_USERS, Config.HISTORY_PREFETCH_MAX_AGE_HOURS
+                )
             )
-        else:
-            logger.info("🤖 LLMMessageService initialized with Ollama only")
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author == self.bot.user:
             return
+        # Shutting down: leave the message unmarked so another bot process can take it
+        if not self.accepting:
+            return
         # Chỉ xử lý nếu chưa xử lý message này
-        if message.id in self._processed_message_ids:
+        if not await self.queue_manager.message_processor.mark_received(message):
             return
-        self._processed_message_ids.add(message.id)
         # Nếu là lệnh command (! hoặc /), bỏ qua - discord.py tự động xử lý commands
         if message.content and (
             message.content.startswith("!") or message.content.startswith("/")
@@ -69,82 +108,121 @@ class LLMMessageService(commands.Cog):
             return
         user_id = str(message.author.id)
         # Process relationship data in background (don't block response)
-        import asyncio
-
-        asyncio.create_task(self._process_relationship_data(message, content, user_id))
-        is_spam, cooldown_remaining = self.queue_manager.is_spam(user_id)
-        if is_spam:
+        self._spawn(self._process_relationship_data(message, content, user_id))
+        # Every message is charged to the rate limits, including fragments the
+        # debouncer merges into one turn
+        if not await self._check_spam(message, user_id):
+            return
+        if self.debouncer.enabled:
+            # Wait briefly for follow-up fragments; they are answered as one turn
+            self.debouncer.add(message, content)
+            return
+        await self._handle_turn(message, content, user_id)
+
+    async def _check_spam(self, message, user_id: str) -> bool:
+        """Charge one message to the user/channel/guild buckets; False if it is rate limited"""
+        spam_scope, cooldown_remaining = await self.queue_manager.check_spam_scoped(
+            user_id,
+            str(message.guild.id) if message.guild else None,
+            str(message.channel.id) if message.guild else None,
+        )
+        if spam_scope == "user":
             spam_msg = f"🚫 **Anti-Spam**: Bạn đang gửi tin nhắn quá nhanh! Vui lòng đợi {cooldown_remaining}s."
             await message.reply(spam_msg)
-            return
-        if self.queue_manager.is_conversation_locked(user_id):
-            duration = self.queue_manager.get_lock_duration(user_id)
-            busy_msg = f"⏳ Tôi đang xử lý tin nhắn trước của bạn ({duration}s). Xin đợi một chút nhé!"
-            await message.reply(busy_msg)
-            self.queue_manager.add_to_pending_queue(message, content)
+            return False
+        if spam_scope:
+            # Channel/guild flood: replying would only add to it
+            logger.info(f"🚫 {spam_scope} rate limit reached, skipping message from {user_id}")
+            return False
+        return True
+
+    async def _handle_turn(self, message, content: str, user_id: str):
+        """Queue behind the user's lock or answer one (possibly merged) turn"""
+        # Locked here or (with a state server) in another bot process
+        if not await self.queue_manager.acquire_conversation_lock(user_id):
+            if not self.queue_manager.add_to_pending_queue(message, content):
+                await message.reply(
+                    "⏳ Bạn đã gửi quá nhiều tin nhắn trong lúc chờ. Đợi tôi trả lời xong đã nhé!"
+                )
+                return
+            # Only announce once per wait; later fragments are merged silently
+            if self.queue_manager.get_pending_count(user_id) == 1:
+                duration = self.queue_manager.get_lock_duration(user_id)
+                busy_msg = f"⏳ Tôi đang xử lý tin nhắn trước của bạn ({duration}s). Tôi sẽ trả lời tin này ngay sau nhé!"
+                await message.reply(busy_msg)
             return
         await self._process_ai_response(message, content, user_id)
 
     async def _process_ai_response(self, message, content: str, user_id: str):
+        """Answer a turn; called with the user's conversation lock held and releases it"""
         response_sent = False
+        turn = asyncio.current_task()
+        self._active_turns.add(turn)
         try:
-            self.queue_manager.set_conversation_lock(user_id)
-            context = self.queue_manager.get_conversation_context(user_id)
-            user_summary = self.summary_service.get_user_summary(user_id)
-            mentioned_users_info = self.context_builder.get_mentioned_users_info(
-                content, message
-            )
-            enhanced_context = self.context_builder.build_enhanced_context(
-                user_id, user_summary, mentioned_users_info, context
-            )
-
             async with message.channel.typing():
-                # Try Ollama first, fallback to Gemini if enabled
-                response = None
-                is_important = False
                 try:
-                    (
-                        response,
-                        is_important,
-                    ) = await self.ollama_service.generate_response(
-                        content, user_id, enhanced_context
+                    ticket = await self.admission.acquire(
+                        str(message.guild.id) if message.guild else None, user_id
                     )
-                except Exception as ollama_error:
-                    logger.warning(f"⚠️ Ollama error: {ollama_error}")
-                    if self.gemini_service:
-                        logger.info("✨ Falling back to Gemini...")
-                        try:
-                            gemini_response = (
-                                await self.gemini_service.generate_response(
-                                    content, user_id, enhanced_context
-                                )
-                            )
-                            # Gemini doesn't return tuple, wrap it
-                            response = (
-                                gemini_response
-                                if isinstance(gemini_response, str)
-                                else gemini_response[0]
-                            )
-                            is_important = False
-                        except Exception as gemini_error:
-                            logger.error(f"❌ Gemini also failed: {gemini_error}")
-
-                if response and len(response.strip()) > 0:
-                    await self.send_response_in_parts(message, response, user_id)
-                    response_sent = True
-                    self.queue_manager.add_to_history(user_id, content, response)
-                    self.queue_manager.save_to_persistent_history(
-                        user_id, content, response
+                except AdmissionRejected as rejected:
+                    logger.warning(f"🚦 Rejected AI response for {user_id}: {rejected.reason}")
+                    await message.reply(
+                        "🚦 Tôi đang bận trả lời quá nhiều người, bạn thử lại sau ít phút nhé!"
                     )
+                    response_sent = True
+                    return
 
-                    # Trigger update if LLM detected important info OR context nearly full
-                    if is_important or self.summary_service.is_context_nearly_full(
-                        user_id
-                    ):
-                        # Run summary update in background (don't block response)
-                        import asyncio
+                simulate_typing = ticket.level < AdmissionController.LEVEL_SKIP_TYPING
+                prefer_backup = ticket.level >= AdmissionController.LEVEL_BACKUP_PROVIDER
+                stream = None
+                delivered = None
+                # Release the LLM slot as soon as generation is done, not after delivery
+                try:
+                    enhanced_context = await self._build_context_for_level(
+                        message, content, user_id, ticket.level
+                    )
+                    if Config.LLM_STREAMING:
+                        stream = await self.router.start_stream(
+                            content, user_id, enhanced_context, prefer_backup
+                        )
+                    if stream:
+                        # Parts are delivered while the rest is still generating
+                        delivered = self.delivery_queue.enqueue(
+                            message.channel.id,
+                            lambda: self.send_stream_in_parts(
+                                message, stream, user_id, simulate_typing=simulate_typing
+                            ),
+                        )
+                        response_sent = True
+                        response, is_important = await stream.wait()
+                    else:
+                        response, is_important = await self.router.generate(
+                            content, user_id, enhanced_context, prefer_backup
+                        )
+                finally:
+                    self.admission.release()
 
-                        asyncio.create_task(self._update_summary_background(user_id))
+                if response and len(response.strip()) > 0:
+                    if not stream:
+                        # Hand delivery (typing simulation) to the channel's delivery
+                        # queue; the user's lock is released right after this
+                        delivered = self.delivery_queue.enqueue(
+                            message.channel.id,
+                            lambda: self.send_response_in_parts(
+                                message, response, user_id, simulate_typing=simulate_typing
+                            ),
+                        )
+                        response_sent = True
+                    # In-memory history is updated now so the next turn already sees
+                    # this reply (after a failed stream: only the parts that were sent);
+                    # it is persisted, or taken back, once delivery has finished
+                    history_turn = self.queue_manager.add_to_history(user_id, content, response)
+                    self._spawn(
+                        self._finish_delivered_turn(
+                            delivered, message, user_id, content, response, history_turn,
+                            is_important, broke_off=bool(stream and stream.error),
+                        )
+                    )
                 else:
                     await message.reply(
                         "Xin lỗi, tôi không thể tạo phản hồi cho tin nhắn này."
@@ -155,11 +233,78 @@ class LLMMessageService(commands.Cog):
             if not response_sent:
                 await message.reply("Xin lỗi, đã có lỗi xảy ra khi tạo phản hồi.")
         finally:
+            self._active_turns.discard(turn)
             self.queue_manager.release_conversation_lock(user_id)
 
-    async def _update_summary_background(self, user_id: str):
+    async def _finish_delivered_turn(
+        self, delivered: asyncio.Future, message, user_id: str, content: str,
+        response: str, history_turn, is_important: bool, broke_off: bool,
+    ):
+        """Record a turn once its reply is delivered; roll it back if delivery failed"""
+        if not await delivered:
+            # The user never got this reply: forget it and apologise instead
+            self.queue_manager.remove_from_history(user_id, history_turn)
+            try:
+                await message.reply("Xin lỗi, đã có lỗi xảy ra khi gửi phản hồi.")
+            except Exception as e:
+                logger.error(f"❌ Could not send delivery apology to {user_id}: {e}")
+            return
+        self.queue_manager.save_to_persistent_history(user_id, content, response)
+        if broke_off:
+            # The reply broke off: apologise after the parts already sent
+            self.delivery_queue.enqueue(
+                message.channel.id,
+                lambda: message.channel.send("Xin lỗi, đã có lỗi xảy ra khi tạo phản hồi."),
+            )
+            return
+        # Update summary in background if LLM detected important info
+        # OR context nearly full (don't block response)
+        await self._update_summary_background(user_id, is_important)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run a background job; it is tracked so shutdown can wait for it"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def stop_intake(self):
+        """Ignore new messages from now on (shutdown)"""
+        self.accepting = False
+
+    def in_flight_turns(self) -> Set[asyncio.Task]:
+        """Turns still being answered, plus queued-message drains about to start one"""
+        return self._active_turns | self.queue_manager.conversation_manager.drain_tasks()
+
+    def background_tasks(self) -> Set[asyncio.Task]:
+        return set(self._background_tasks)
+
+    async def _build_context_for_level(
+        self, message, content: str, user_id: str, level: int
+    ) -> str:
+        """Build the prompt context, dropping optional sections when degraded"""
+        shrink = level >= AdmissionController.LEVEL_SHRINK_CONTEXT
+        # First turn after a restart: recent exchanges come from the persistent log
+        await self.queue_manager.warm_start_history(user_id)
+        context = self.queue_manager.get_conversation_context(
+            user_id, max_exchanges=1 if shrink else 3
+        )
+        return await self.context_builder.assemble_context(
+            message,
+            content,
+            user_id,
+            context,
+            include_relationships=not shrink,
+            include_mentions=not shrink,
+        )
+
+    async def _update_summary_background(self, user_id: str, is_important: bool = True):
         """Update user summary in background without blocking response"""
         try:
+            if not is_important and not await self.summary_service.is_context_nearly_full_async(
+                user_id
+            ):
+                return
             await self.summary_service.update_summary_smart(
                 user_id, self.ollama_service
             )
@@ -167,13 +312,15 @@ class LLMMessageService(commands.Cog):
         except Exception as e:
             logger.error(f"❌ Error updating summary for {user_id}: {e}")
 
-    async def send_response_in_parts(self, message, response: str, user_id: str):
-        """Send response with realistic typing simulation"""
+    async def send_response_in_parts(
+        self, message, response: str, user_id: str, simulate_typing: bool = True
+    ):
+        """Send response with realistic typing simulation (skipped when simulate_typing is False)"""
         import random
         import asyncio
 
         # Check if typing simulation is enabled
-        if not Config.ENABLE_TYPING_SIMULATION:
+        if not Config.ENABLE_TYPING_SIMULATION or not simulate_typing:
             # Send response normally without typing effect
             if len(response) <= 2000:
                 await message.reply(response)
@@ -188,7 +335,7 @@ class LLMMessageService(commands.Cog):
             return
 
         # Split response into sentences/parts
-        response_parts = self._split_response_naturally(response)
+        response_parts = split_natural(response)
 
         # Send each part with typing simulation
         for i, part in enumerate(response_parts):
@@ -211,33 +358,33 @@ class LLMMessageService(commands.Cog):
             if i < len(response_parts) - 1:
                 await asyncio.sleep(random.uniform(0.3, Config.PART_BREAK_DELAY))
 
-    def _split_response_naturally(self, response: str) -> list:
-        """
-        Split response into natural parts for typing simulation.
-        Ưu tiên: newlines trước, rồi mới dấu câu.
-        """
-        import re
-
-        response = response.strip()
-        if not response:
-            return []
-
-        # Ưu tiên: split theo newlines trước (Gen Z style thường xuống dòng nhiều)
-        if "\n" in response:
-            lines = response.split("\n")
-            return [line.strip() for line in lines if line.strip()]
-
-        # Fallback: split theo dấu câu nếu không có newlines
-        sentence_end_re = re.compile(r"([^.!?…~]+[.!?…~]+[\s\n]*)", re.UNICODE)
-        parts = sentence_end_re.findall(response)
-
-        # Nếu còn phần dư (không kết thúc bằng dấu câu), thêm vào cuối
-        consumed = "".join(parts)
-        if len(consumed) < len(response):
-            parts.append(response[len(consumed) :].strip())
+    async def send_stream_in_parts(
+        self, message, stream, user_id: str, simulate_typing: bool = True
+    ):
+        """Send parts of a ResponseStream as they complete, typing each one out"""
+        import time
+        import asyncio
 
-        # Loại bỏ phần rỗng và strip từng phần
-        return [p.strip() for p in parts if p.strip()]
+        simulate_typing = Config.ENABLE_TYPING_SIMULATION and simulate_typing
+        sent = 0
+        last_sent_at = time.monotonic()
+        async for part in stream:
+            for i in range(0, len(part), 2000):
+                chunk = part[i : i + 2000]
+                if simulate_typing:
+                    # Time spent waiting for the model already counts as typing
+                    remaining = self._calculate_typing_delay(chunk) - (
+                        time.monotonic() - last_sent_at
+                    )
+                    if remaining > 0:
+                        async with message.channel.typing():
+                            await asyncio.sleep(remaining)
+                if sent == 0:
+                    await message.reply(chunk)
+                else:
+                    await message.channel.send(chunk)
+                sent += 1
+                last_sent_at = time.monotonic()
 
     def _calculate_typing_delay(self, text: str) -> float:
         """Calculate realistic typing delay based on text length and complexity"""
@@ -289,6 +436,9 @@ class LLMMessageService(commands.Cog):
             # Extract mentioned users
             mentioned_user_ids = []
             for mention in message.mentions:
+                # The bot itself is not a social contact
+                if mention.id == self.bot.user.id:
+                    continue
                 mentioned_user_ids.append(str(mention.id))
                 # Update mentioned user's name info too
                 self.relationship_service.update_user_name(
@@ -300,35 +450,13 @@ class LLMMessageService(commands.Cog):
                     mention.global_name if hasattr(mention, "global_name") else None,
                 )
 
-            # Extract real names from message content if user mentions them
-            # Pattern để detect khi user nói về tên thật của ai đó
-            name_patterns = [
-                r"tên\s+(tôi|mình|em)\s+(?:là\s+)?(\w+)",  # "tên tôi là X"
-                r"(?:tôi|mình|em)\s+tên\s+(?:là\s+)?(\w+)",  # "tôi tên X"
-                r"(?:gọi|call)\s+(?:tôi|mình|em)\s+(?:là\s+)?(\w+)",  # "gọi tôi là X"
-                r"(\w+)\s+tên\s+(?:thật\s+)?(?:là\s+)?(\w+)",  # "A tên thật là B"
-            ]
-
-            for pattern in name_patterns:
-                matches = re.finditer(pattern, content.lower())
-                for match in matches:
-                    if len(match.groups()) == 2:
-                        # Case: "A tên là B"
-                        person_ref, real_name = match.groups()
-                        if person_ref in ["tôi", "mình", "em"]:
-                            # User talking about themselves
-                            self.relationship_service.update_user_name(
-                                user_id,
-                                author_username,
-                                author_username,
-                                real_name.title(),
-                            )
-                    elif len(match.groups()) == 1:
-                        # Case: "tôi tên X"
-                        real_name = match.groups()[0]
-                        self.relationship_service.update_user_name(
-                            user_id, author_username, author_username, real_name.title()
-                        )
+            # Extract the author's real name if they introduce themselves
+            # ("tên tôi là X", "mình tên X", "gọi em là X"); one update per message
+            real_name = extract_self_name(content)
+            if real_name:
+                self.relationship_service.update_user_name(
+                    user_id, author_username, author_username, real_name
+                )
 
             # Process the message through relationship service
             self.relationship_service.process_message(
@@ -337,6 +465,7 @@ class LLMMessageService(commands.Cog):
                 content,
                 mentioned_user_ids,
                 str(message.channel.id) if message.channel else None,
+                str(message.guild.id) if message.guild else None,
             )
 
             logger.debug(
@@ -2,6 +2,7 @@ import logging
 from services.conversation.conversation_manager import ConversationManager
 from services.conversation.anti_spam_service import AntiSpamService
 from services.conversation.message_processor import MessageProcessor
+from services.state.state_client import get_state_client
 
 logger = logging.getLogger('discord_bot.MessageQueue')
 
@@ -10,9 +11,16 @@ class MessageQueueManager:
         self.conversation_manager = ConversationManager()
         self.anti_spam = AntiSpamService()
         self.message_processor = MessageProcessor()
+        # Anti-spam buckets live on the state server when one is configured
+        self.state = get_state_client()
 
-    def is_spam(self, user_id: str):
-        return self.anti_spam.check_spam(user_id)
+    def is_spam(self, user_id: str, guild_id: str | None = None, channel_id: str | None = None):
+        return self.anti_spam.check_spam(user_id, guild_id, channel_id)
+
+    async def check_spam_scoped(self, user_id: str, guild_id: str | None = None, channel_id: str | None = None):
+        if self.state is not None:
+            return await self.state.check_rate(user_id, guild_id, channel_id)
+        return self.anti_spam.check_spam_scoped(user_id, guild_id, channel_id)
 
     def is_conversation_locked(self, user_id: str):
         return self.conversation_manager.is_conversation_locked(user_id)
@@ -20,23 +28,38 @@ class MessageQueueManager:
     def get_lock_duration(self, user_id: str):
         return self.conversation_manager.get_lock_duration(user_id)
 
-    def add_to_pending_queue(self, message, content):
-        self.conversation_manager.add_to_pending_queue(message, content)
+    def add_to_pending_queue(self, message, content) -> bool:
+        return self.conversation_manager.add_to_pending_queue(message, content)
+
+    def get_pending_count(self, user_id: str) -> int:
+        return self.conversation_manager.get_pending_count(user_id)
+
+    def set_pending_handler(self, handler):
+        self.conversation_manager.set_pending_handler(handler)
 
     def set_conversation_lock(self, user_id: str):
         self.conversation_manager.set_conversation_lock(user_id)
 
+    async def acquire_conversation_lock(self, user_id: str) -> bool:
+        return await self.conversation_manager.acquire_conversation_lock(user_id)
+
     def release_conversation_lock(self, user_id: str):
         self.conversation_manager.release_conversation_lock(user_id)
 
     def add_to_history(self, user_id: str, content: str, response: str):
-        self.conversation_manager.add_to_history(user_id, content, response)
+        return self.conversation_manager.add_to_history(user_id, content, response)
+
+    def remove_from_history(self, user_id: str, turn):
+        self.conversation_manager.remove_from_history(user_id, turn)
 
     def save_to_persistent_history(self, user_id: str, content: str, response: str):
         self.conversation_manager.save_to_persistent_history(user_id, content, response)
 
-    def get_conversation_context(self, user_id: str):
-        return self.conversation_manager.get_conversation_context(user_id)
+    async def warm_start_history(self, user_id: str):
+        await self.conversation_manager.warm_start(user_id)
+
+    def get_conversation_context(self, user_id: str, max_exchanges: int = 3):
+        return self.conversation_manager.get_conversation_context(user_id, max_exchanges)
 
     def get_queue_status(self):
         return self.conversation_manager.get_queue_status()
@@ -0,0 +1,184 @@
+"""
+Loop Monitor - Event-loop lag sampling and blocked-loop stack capture.
+
+Responsibility: Find blocking hot spots in production. A heartbeat task on
+the loop measures how late its wake-ups are (loop lag); a watchdog thread
+notices when the heartbeat stops and captures the loop thread's stack while
+the offending callback is still running.
+"""
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Deque, List, Optional
+from discord.ext import commands
+from config.settings import Config
+
+logger = logging.getLogger('discord_bot.LoopMonitor')
+
+# Lag samples kept for percentiles (one per LOOP_LAG_INTERVAL)
+LAG_SAMPLES = 1200
+
+
+class StallRecord:
+    """One period where the event loop did not run the heartbeat in time."""
+    __slots__ = ('started_at', 'beat', 'duration', 'stack', 'hot_spot')
+
+    def __init__(self, beat: float, stack: List[str], hot_spot: str):
+        self.started_at = time.time()
+        self.beat = beat
+        self.duration: Optional[float] = None  # set once the loop recovers
+        self.stack = stack
+        self.hot_spot = hot_spot
+
+
+def _hot_spot(frames: traceback.StackSummary) -> str:
+    """Innermost frame from our own code (else the innermost frame)."""
+    src_dir = str(Config.SRC_DIR)
+    for frame in reversed(frames):
+        if frame.filename.startswith(src_dir):
+            return f"{frame.filename[len(src_dir) + 1:]}:{frame.lineno} in {frame.name}"
+    if frames:
+        frame = frames[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class LoopMonitor(commands.Cog):
+    """Samples event-loop lag and records stalls with the blocking stack."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.interval = Config.LOOP_LAG_INTERVAL
+        self.threshold = Config.LOOP_STALL_THRESHOLD
+        self.lag_samples: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.stalls: Deque[StallRecord] = deque(maxlen=Config.LOOP_STALL_HISTORY)
+        self.total_stalls = 0
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._captured_beat = 0.0
+
+    async def cog_load(self):
+        if not Config.LOOP_MONITOR_ENABLED:
+            logger.info("⏱️ LoopMonitor disabled")
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"⏱️ LoopMonitor started (interval {self.interval}s, stall threshold {self.threshold}s)")
+
+    async def cog_unload(self):
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+    # =========================================================================
+    # Sampling
+    # =========================================================================
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            self._last_beat = before
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.interval)
+            self.lag_samples.append(lag)
+            self._last_beat = now
+
+            stall = self.stalls[-1] if self.stalls else None
+            if stall is not None and stall.beat == before and stall.duration is None:
+                stall.duration = lag
+                logger.warning(f"⏱️ Event loop was blocked for {lag:.2f}s at {stall.hot_spot}")
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is blocked."""
+        check_every = max(0.01, self.threshold / 4)
+        while not self._stop.wait(check_every):
+            beat = self._last_beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == self._captured_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = traceback.extract_stack(frame)
+            del frame
+            # The loop may have recovered while we were looking
+            if self._last_beat != beat:
+                continue
+            self._captured_beat = beat
+            record = StallRecord(beat, traceback.format_list(frames), _hot_spot(frames))
+            self.stalls.append(record)
+            self.total_stalls += 1
+            logger.warning(
+                f"⏱️ Event loop blocked >{overdue:.2f}s, running: {record.hot_spot}\n"
+                + "".join(record.stack[-8:])
+            )
+
+    # =========================================================================
+    # Stats
+    # =========================================================================
+
+    def get_stats(self) -> dict:
+        samples = sorted(self.lag_samples)
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+        return {
+            'samples': len(samples),
+            'p50_lag': round(pct(50) * 1000, 1),
+            'p99_lag': round(pct(99) * 1000, 1),
+            'max_lag': round((samples[-1] if samples else 0.0) * 1000, 1),
+            'total_stalls': self.total_stalls,
+        }
+
+    @commands.command(name='loop_lag')
+    @commands.has_permissions(manage_guild=True)
+    async def loop_lag_command(self, ctx, index: Optional[int] = None):
+        """Show event-loop lag and recent stalls; `!loop_lag <n>` shows stall n's stack."""
+        if index is not None:
+            stalls = list(self.stalls)
+            if not 1 <= index <= len(stalls):
+                await ctx.reply(f"❌ No stall #{index} (have {len(stalls)})")
+                return
+            record = stalls[-index]
+            stack = "".join(record.stack[-12:])
+            await ctx.reply(f"⏱️ Stall #{index} at `{record.hot_spot}`\n```\n{stack[-1800:]}\n```")
+            return
+
+        import discord
+        stats = self.get_stats()
+        embed = discord.Embed(title="⏱️ Event Loop Lag", color=discord.Color.blue())
+        embed.add_field(
+            name="Lag (last samples)",
+            value=f"p50: {stats['p50_lag']}ms | p99: {stats['p99_lag']}ms | max: {stats['max_lag']}ms",
+            inline=False
+        )
+        embed.add_field(name="Stalls", value=f"{stats['total_stalls']} (>{int(self.threshold * 1000)}ms)", inline=True)
+        if self.stalls:
+            lines = []
+            for i, record in enumerate(reversed(self.stalls), start=1):
+                duration = f"{record.duration:.2f}s" if record.duration is not None else "ongoing"
+                when = time.strftime('%H:%M:%S', time.localtime(record.started_at))
+                lines.append(f"#{i} {when} {duration} `{record.hot_spot}`")
+                if i >= 8:
+                    break
+            embed.add_field(name="Recent stalls", value="\n".join(lines)[:1024], inline=False)
+        await ctx.reply(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(LoopMonitor(bot))
@@ -0,0 +1,53 @@
+"""
+Name Extractor - Detects self-introductions ("tên tôi là X") in chat text.
+
+All phrasings are one precompiled alternation, matched case-insensitively
+against the original text, so a message is scanned once (and not at all
+when it has none of the keywords). Results are de-duplicated per message.
+"""
+import re
+from typing import List, Optional
+
+_SELF = r"(?:tôi|mình|em)"
+
+NAME_INTRO_RE = re.compile(
+    # "tên tôi là X" / "tên mình X"
+    rf"\btên\s+{_SELF}\s+(?:là\s+)?(\w+)"
+    # "tôi tên X" / "mình tên thật là X"
+    rf"|\b{_SELF}\s+tên\s+(?:thật\s+)?(?:là\s+)?(\w+)"
+    # "gọi tôi là X" / "call em X"
+    rf"|\b(?:gọi|call)\s+{_SELF}\s+(?:là\s+)?(\w+)",
+    re.IGNORECASE,
+)
+
+# Words that can follow the phrasing without being a name: what the optional
+# groups leave behind ("tôi tên là"), question words ("em tên gì vậy") and
+# sentence-final particles ("xem tên tôi đi")
+_NOT_NAMES = frozenset({
+    "là", "thật",
+    "gì", "gi", "j", "chi", "ai", "sao", "nào", "mấy",
+    "đi", "vậy", "vay", "nhỉ", "nhé", "nhe", "nha", "hả", "hở", "à", "ạ", "ơi",
+    "thế", "đó", "đấy", "chứ", "không", "ko", "k", "luôn", "với", "nữa", "rồi",
+})
+_KEYWORDS = ("tên", "gọi", "call")
+
+
+def extract_self_names(content: str) -> List[str]:
+    """All distinct names the author gives for themselves, in order of appearance."""
+    # Most messages contain none of the keywords; a C-level substring test skips the scan
+    lowered = content.lower()
+    if not any(keyword in lowered for keyword in _KEYWORDS):
+        return []
+    names: List[str] = []
+    for match in NAME_INTRO_RE.finditer(content):
+        name = match.group(match.lastindex).title()
+        if name.lower() in _NOT_NAMES or name in names:
+            continue
+        names.append(name)
+    return names
+
+
+def extract_self_name(content: str) -> Optional[str]:
+    """The name to record for a message: the last one given (later corrections win)."""
+    names = extract_self_names(content)
+    return names[-1] if names else None
@@ -0,0 +1,252 @@
+"""
+Name Matcher - Finds known member names in message text.
+
+An Aho-Corasick automaton over word tokens: every username, display name
+and real name is a phrase of casefolded words, so matches always fall on
+word boundaries ("An" never matches inside "Anh") and a message is scanned
+in one pass over its words, however many names are loaded.
+
+Names added after a build go to a small pending overlay that is checked by
+direct lookup; the automaton is rebuilt once the overlay grows past a
+threshold, so bursts of name updates do not each pay for a full rebuild.
+With a running event loop the rebuild happens on a worker thread and the
+new automaton is swapped in when ready.
+"""
+import re
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger('discord_bot.NameMatcher')
+
+Phrase = Tuple[str, ...]
+
+_WORD_RE = re.compile(r"\w+")
+
+# Pronouns / forms of address that are also common nicknames
+_STOP_WORDS = frozenset({
+    "anh", "em", "chị", "bạn", "mình", "tôi", "tao", "mày", "ông", "bà",
+    "cô", "chú", "bác", "con", "cháu", "nó", "họ", "ai", "gì", "ok", "admin", "bot",
+})
+# Names that are also everyday chat words ("mai" = tomorrow, "bình thường", "vui")
+_COMMON_WORDS = frozenset({
+    "mai", "nam", "hoa", "hòa", "đông", "xuân", "thu", "hạ", "vui", "may", "bình",
+    "thường", "thành", "trang", "sang", "tiến", "thắng", "thương", "long", "tài",
+    "phong", "khoa", "yên", "tâm", "lâm", "kim", "vàng", "bạc", "hồng", "xanh",
+    "trung", "quang", "sáng", "nhất", "nhi", "tú", "út", "bé", "béo", "gấu", "mèo",
+    "the", "and", "you", "one", "max", "sun", "win", "pro", "king", "boss", "love",
+    "happy", "game", "cool", "lol", "hello",
+})
+# Single-word names shorter than this ("An", "Vy") match too much ordinary text
+_MIN_SINGLE_WORD_LEN = 3
+
+
+def name_phrase(name: Optional[str]) -> Optional[Phrase]:
+    """Casefolded word tuple for a name, or None if it is too generic to match on."""
+    if not name:
+        return None
+    words = tuple(_WORD_RE.findall(name.casefold()))
+    if not words:
+        return None
+    if len(words) == 1:
+        word = words[0]
+        if len(word) < _MIN_SINGLE_WORD_LEN or word in _STOP_WORDS or word in _COMMON_WORDS or word.isdigit():
+            return None
+    return words
+
+
+class _Automaton:
+    """Immutable token-level Aho-Corasick automaton."""
+
+    __slots__ = ('goto', 'fail', 'output', 'max_len')
+
+    def __init__(self, phrases: Iterable[Phrase]):
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Tuple[Phrase, ...]] = [()]
+        max_len = 0
+        for phrase in phrases:
+            node = 0
+            for word in phrase:
+                nxt = goto[node].get(word)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][word] = nxt
+                    goto.append({})
+                    output.append(())
+                node = nxt
+            output[node] = (phrase,)
+            max_len = max(max_len, len(phrase))
+
+        # Breadth-first failure links; outputs are merged along them
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and word not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(word, 0)
+                fail[child] = target if target != child else 0
+                if output[fail[child]]:
+                    output[child] = output[child] + output[fail[child]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+        self.max_len = max_len
+
+    def scan(self, words: List[str]) -> List[Tuple[int, Phrase]]:
+        """(end index, phrase) for every phrase occurrence in the word list."""
+        goto, fail, output = self.goto, self.fail, self.output
+        hits: List[Tuple[int, Phrase]] = []
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            if output[node]:
+                for phrase in output[node]:
+                    hits.append((i, phrase))
+        return hits
+
+
+class NameMatcher:
+    """Maps name phrases to users and finds them in text."""
+
+    def __init__(self, rebuild_threshold: int = 256):
+        self.rebuild_threshold = rebuild_threshold
+        self._owners: Dict[Phrase, Set[int]] = {}
+        self._user_phrases: Dict[int, Set[Phrase]] = {}
+        self._automaton = _Automaton(())
+        self._built: Set[Phrase] = set()
+        self._pending: Set[Phrase] = set()
+        self._pending_max_len = 0
+        self.rebuilds = 0
+        self.last_build_seconds = 0.0
+        self._rebuilding = False
+
+    def set_names(self, user_id: int, names: Iterable[Optional[str]], rebuild: bool = True):
+        """Replace the names a user can be referred to by (rebuild=False for bulk loads)."""
+        phrases = {p for p in (name_phrase(n) for n in names) if p}
+        old = self._user_phrases.get(user_id, set())
+        if phrases == old:
+            return
+        for phrase in old - phrases:
+            owners = self._owners.get(phrase)
+            if owners:
+                owners.discard(user_id)  # empty sets are dropped on the next rebuild
+        for phrase in phrases - old:
+            self._owners.setdefault(phrase, set()).add(user_id)
+            # While a background build runs, the overlay also covers phrases it may lack
+            if phrase not in self._built or self._rebuilding:
+                self._pending.add(phrase)
+                self._pending_max_len = max(self._pending_max_len, len(phrase))
+        self._user_phrases[user_id] = phrases
+        if rebuild and len(self._pending) >= self.rebuild_threshold:
+            self._schedule_rebuild()
+
+    def rebuild(self):
+        """Fold pending phrases into a fresh automaton now and drop unowned ones."""
+        self._prune()
+        started = time.perf_counter()
+        phrases = list(self._owners)
+        self._install(_Automaton(phrases), phrases, time.perf_counter() - started)
+
+    def _schedule_rebuild(self):
+        if self._rebuilding:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.rebuild()
+            return
+        self._rebuilding = True
+        self._prune()
+        phrases = list(self._owners)
+
+        def build():
+            started = time.perf_counter()
+            return _Automaton(phrases), time.perf_counter() - started
+
+        def done(future):
+            self._rebuilding = False
+            try:
+                automaton, seconds = future.result()
+            except Exception as e:
+                logger.error(f"❌ Name automaton rebuild failed: {e}")
+                return
+            self._install(automaton, phrases, seconds)
+
+        loop.run_in_executor(None, build).add_done_callback(done)
+
+    def _prune(self):
+        self._owners = {phrase: owners for phrase, owners in self._owners.items() if owners}
+
+    def _install(self, automaton: "_Automaton", phrases: List[Phrase], seconds: float):
+        self._automaton = automaton
+        self._built = set(phrases)
+        # Names added while a background build ran stay in the overlay
+        self._pending -= self._built
+        self._pending_max_len = max((len(p) for p in self._pending), default=0)
+        self.rebuilds += 1
+        self.last_build_seconds = seconds
+        logger.debug(f"🔤 Name automaton rebuilt: {len(self._built)} names, "
+                     f"{len(automaton.goto)} nodes in {seconds * 1000:.1f}ms")
+
+    def find(self, text: str) -> List[Tuple[int, Phrase]]:
+        """
+        Users referred to by name in `text`, as (user_id, phrase).
+
+        Overlapping matches keep the longest phrase ("Hòa Bình" over "Hòa").
+        Names shared by several users are ambiguous and skipped.
+        """
+        words = _WORD_RE.findall(text.casefold())
+        if not words:
+            return []
+        hits = self._automaton.scan(words)
+        if self._pending:
+            hits.extend(self._scan_pending(words))
+        if not hits:
+            return []
+
+        # Longest match first, then leftmost; keep non-overlapping spans
+        hits.sort(key=lambda hit: (-len(hit[1]), hit[0]))
+        taken: Set[int] = set()
+        found: List[Tuple[int, Phrase]] = []
+        seen_users: Set[int] = set()
+        for end, phrase in hits:
+            span = range(end - len(phrase) + 1, end + 1)
+            if any(i in taken for i in span):
+                continue
+            owners = self._owners.get(phrase)
+            if not owners or len(owners) != 1:
+                continue
+            taken.update(span)
+            user_id = next(iter(owners))
+            if user_id not in seen_users:
+                seen_users.add(user_id)
+                found.append((user_id, phrase))
+        return found
+
+    def _scan_pending(self, words: List[str]) -> List[Tuple[int, Phrase]]:
+        hits = []
+        pending = self._pending
+        for i in range(len(words)):
+            for n in range(1, min(self._pending_max_len, i + 1) + 1):
+                phrase = tuple(words[i - n + 1:i + 1])
+                if phrase in pending:
+                    hits.append((i, phrase))
+        return hits
+
+    def get_stats(self) -> dict:
+        return {
+            'names': len(self._built) + len(self._pending),
+            'pending': len(self._pending),
+            'nodes': len(self._automaton.goto),
+            'rebuilds': self.rebuilds,
+            'last_build_ms': round(self.last_build_seconds * 1000, 1),
+        }
@@ -1,34 +1,30 @@
 import os
-import json
 import logging
 from typing import Dict
+from config.settings import Config
+from utils.async_io import read_json, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
 class RelationshipDataManager:
     def __init__(self):
-        # Always resolve to src/data/relationships
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.data_dir = os.path.join(base_dir, 'data', 'relationships')
+        # src/data/relationships (or the shard range's own directory when sharded)
+        self.data_dir = str(Config.RELATIONSHIPS_DIR)
         self.relationships_file = os.path.join(self.data_dir, 'relationships.json')
         self.user_names_file = os.path.join(self.data_dir, 'user_names.json')
         self.interactions_file = os.path.join(self.data_dir, 'interactions.json')
         self.conversation_history_file = os.path.join(self.data_dir, 'conversation_history.json')
 
     def load_json(self, file_path: str) -> Dict:
-        if not os.path.exists(file_path):
-            return {}
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(file_path, {})
         except Exception as e:
             logger.error(f"Error loading {file_path}: {e}")
             return {}
 
     def save_json(self, file_path: str, data: Dict):
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            write_json_atomic(file_path, data)
         except Exception as e:
             logger.error(f"Error saving {file_path}: {e}")
 
@@ -54,4 +50,4 @@ class RelationshipDataManager:
         return self.load_json(self.conversation_history_file)
 
     def save_conversation_history(self, conversation_history: Dict):
-        self.save_json(self.conversation_history_file, conversation_history) 
\ No newline at end of file
+        self.save_json(self.conversation_history_file, conversation_history)
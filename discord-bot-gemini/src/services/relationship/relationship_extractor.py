@@ -0,0 +1,208 @@
+"""
+RelationshipExtractor - Batched LLM relationship extraction.
+
+Responsibility: Buffer guild messages and periodically ask the LLM for
+relationship triples, merging the results into RelationshipService.
+One LLM call covers a whole batch instead of one call per message.
+"""
+import re
+import json
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RelationshipExtractor:
+    """Background pipeline: per-guild message buffers -> LLM -> relationship triples."""
+
+    # Key used for messages that do not belong to a guild (DMs)
+    NO_GUILD = 'dm'
+    # Buffers are bounded so a stalled LLM cannot grow memory without limit
+    MAX_BUFFERED_BATCHES = 5
+
+    def __init__(self, relationship_service, llm_service,
+                 batch_size: Optional[int] = None, interval: Optional[float] = None,
+                 min_confidence: Optional[float] = None):
+        self.relationship_service = relationship_service
+        self.llm_service = llm_service
+        self.batch_size = max(1, batch_size or Config.RELATIONSHIP_BATCH_SIZE)
+        self.interval = interval or Config.RELATIONSHIP_BATCH_INTERVAL
+        self.min_confidence = (
+            Config.RELATIONSHIP_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        )
+
+        self._buffers: Dict[str, Deque[Dict]] = {}
+        self._inflight: Set[str] = set()
+        self._periodic_task: Optional[asyncio.Task] = None
+        self.prompt_template = self._load_prompt_template()
+
+    def _load_prompt_template(self) -> str:
+        prompt_path = Config.PROMPTS_DIR / 'relationship_extraction_prompt.json'
+        if not prompt_path.exists():
+            raise FileNotFoundError(f"Prompt not found: {prompt_path}")
+        with open(prompt_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    # =========================================================================
+    # Buffering
+    # =========================================================================
+
+    def add_message(self, guild_id: Optional[str], author_id: str, author_name: str, content: str):
+        """Buffer a message for the next extraction batch of its guild."""
+        if not content or not content.strip():
+            return
+        guild_key = guild_id or self.NO_GUILD
+        buffer = self._buffers.get(guild_key)
+        if buffer is None:
+            buffer = deque(maxlen=self.batch_size * self.MAX_BUFFERED_BATCHES)
+            self._buffers[guild_key] = buffer
+        buffer.append({
+            'author_id': author_id,
+            'author_name': author_name,
+            'content': content[:500]
+        })
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts) - batches are flushed explicitly
+            return
+        self._ensure_periodic_task(loop)
+        if len(buffer) >= self.batch_size and guild_key not in self._inflight:
+            loop.create_task(self.flush_guild(guild_key))
+
+    def _ensure_periodic_task(self, loop: asyncio.AbstractEventLoop):
+        if self._periodic_task is None or self._periodic_task.done():
+            self._periodic_task = loop.create_task(self._run_periodic())
+
+    async def _run_periodic(self):
+        """Flush partially filled buffers every interval so quiet guilds are processed too."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush_all()
+            except Exception as e:
+                logger.error(f"❌ Relationship extraction cycle failed: {e}")
+
+    def pending_count(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    # =========================================================================
+    # Extraction
+    # =========================================================================
+
+    async def flush_all(self):
+        for guild_key in list(self._buffers.keys()):
+            await self.flush_guild(guild_key)
+
+    async def flush_guild(self, guild_key: str) -> int:
+        """Send the buffered messages of one guild to the LLM. Returns merged triple count."""
+        if guild_key in self._inflight:
+            return 0
+        buffer = self._buffers.get(guild_key)
+        if not buffer:
+            return 0
+
+        self._inflight.add(guild_key)
+        merged = 0
+        try:
+            while buffer:
+                batch = [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+                merged += await self._extract_batch(batch)
+        finally:
+            self._inflight.discard(guild_key)
+            if not buffer:
+                self._buffers.pop(guild_key, None)
+        return merged
+
+    async def _extract_batch(self, batch: List[Dict]) -> int:
+        prompt = self._build_prompt(batch)
+        try:
+            response = await self.llm_service.generate_summary(prompt)
+        except Exception as e:
+            logger.error(f"❌ LLM relationship extraction failed: {e}")
+            return 0
+        if not response:
+            logger.warning(f"⚠️ LLM returned no relationship data: {response}")
+            return 0
+
+        triples = self.parse_triples(response)
+        merged = 0
+        for triple in triples:
+            if triple['confidence'] < self.min_confidence:
+                continue
+            index = triple['message_index']
+            source = batch[index] if index is not None and 0 <= index < len(batch) else None
+            self.relationship_service._add_relationship(
+                triple['person1'],
+                triple['person2'],
+                triple['relationship_type'],
+                source['author_id'] if source else 'llm',
+                triple['context'] or (source['content'][:200] if source else ''),
+                triple['confidence'],
+                save=False
+            )
+            merged += 1
+
+        if merged:
+            self.relationship_service._save_relationships()
+        logger.info(f"🔗 Extracted {merged}/{len(triples)} relationships from {len(batch)} messages")
+        return merged
+
+    def _build_prompt(self, batch: List[Dict]) -> str:
+        lines = [
+            f"[{i}] {entry['author_name']}: {entry['content']}"
+            for i, entry in enumerate(batch)
+        ]
+        return self.prompt_template.replace('{messages}', "\n".join(lines))
+
+    @staticmethod
+    def parse_triples(text: str) -> List[Dict]:
+        """Parse the LLM's JSON array into validated relationship triples."""
+        match = re.search(r'\[.*\]', text, re.DOTALL)
+        if not match:
+            return []
+        try:
+            raw_items = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            logger.debug(f"Could not parse relationship triples: {text[:200]}")
+            return []
+        if not isinstance(raw_items, list):
+            return []
+
+        triples = []
+        for item in raw_items:
+            if not isinstance(item, dict):
+                continue
+            person1 = str(item.get('person1') or '').strip()
+            person2 = str(item.get('person2') or '').strip()
+            relationship_type = str(item.get('relationship_type') or '').strip()
+            if not person1 or not person2 or not relationship_type:
+                continue
+            if person1.lower() == person2.lower():
+                continue
+            try:
+                confidence = min(1.0, max(0.0, float(item.get('confidence', 0.5))))
+            except (TypeError, ValueError):
+                confidence = 0.5
+            try:
+                message_index = int(item['message_index']) if 'message_index' in item else None
+            except (TypeError, ValueError):
+                message_index = None
+            triples.append({
+                'person1': person1,
+                'person2': person2,
+                'relationship_type': relationship_type,
+                'confidence': confidence,
+                'message_index': message_index,
+                'context': str(item.get('context') or '')[:200]
+            })
+        return triples
+
+    async def close(self):
+        if self._periodic_task and not self._periodic_task.done():
+            self._periodic_task.cancel()
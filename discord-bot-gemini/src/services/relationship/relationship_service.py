@@ -1,35 +1,170 @@
 import os
+import time
+import asyncio
 import logging
-import aiofiles
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
+from pathlib import Path
 from collections import Counter
 from config.settings import Config
+from models.user import User
+from models.relationship import (
+    NAME_REFERENCE, InteractionRecord, ConversationMessage, ConversationThread,
+    RelationshipEntry, RelationshipRecord, intern_reporter, load_records
+)
 from services.relationship.relationship_data import RelationshipDataManager
+from services.relationship.relationship_extractor import RelationshipExtractor
+from services.relationship.user_id_interner import UserIdInterner
+from services.relationship.name_matcher import NameMatcher
+from utils.async_io import run_io, write_json_async
 
 logger = logging.getLogger(__name__)
 
+# Records serialized per slice of a write-behind flush before yielding to the loop
+SNAPSHOT_SLICE = 500
+
 class RelationshipService:
+    """
+    Tracks user names, mentions, group conversations and relationships.
+
+    User ids are interned as ints (UserIdInterner) and records are __slots__
+    classes from models/; public methods still take and return string ids.
+    """
+
     def __init__(self, llm_service):
         self.llm_service = llm_service
         
         # Use RelationshipDataManager for I/O operations (Repository Pattern)
         self.data_manager = RelationshipDataManager()
-        
-        self.data_dir = Config.DATA_DIR
-        self.relationships_dir = self.data_dir / 'relationships'
+
+        self.data_dir = Config.STATE_DIR
+        self.relationships_dir = Config.RELATIONSHIPS_DIR
         self.relationships_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Load existing data using data_manager
-        self.relationships = self.data_manager.load_relationships()
-        self.user_names = self.data_manager.load_user_names()
-        self.interactions = self.data_manager.load_interactions()
-        self.conversation_history = self.data_manager.load_conversation_history()
+
+        # Load existing data using data_manager, converting to compact records
+        self.ids = UserIdInterner()
+        # Channel ids get their own pool: they are not users and must not grow the user-id table
+        self.channel_ids = UserIdInterner()
+        self.relationships: Dict[str, RelationshipRecord] = self._load_relationships()
+        # Lowercased person name -> keys of the relationships it takes part in (insertion order)
+        self._relationship_keys_by_name: Dict[str, List[str]] = {}
+        for rel_key, record in self.relationships.items():
+            self._index_relationship(rel_key, record)
+        self.user_names: Dict[int, User] = self._load_user_names()
+        # Mention matrix: interactions[from_user][to_user] -> counter + recent-context ring
+        self.interactions: Dict[int, Dict[int, InteractionRecord]] = self._load_interactions()
+        self._mentions_received: Counter = Counter()
+        self._total_interactions = 0
+        self._rebuild_interaction_totals()
+        self.conversation_history: Dict[Tuple[int, ...], ConversationThread] = self._load_conversation_history()
+
+        # Known names -> users, for spotting members referred to by name in messages
+        self.name_matcher = NameMatcher(Config.NAME_MATCH_REBUILD_THRESHOLD)
+        for uid, user in self.user_names.items():
+            self.name_matcher.set_names(uid, self._name_variants(user), rebuild=False)
+        self.name_matcher.rebuild()
+
+        # Write-behind state: files marked dirty are flushed together after a short delay
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        # True while the flush task is still waiting for its delay (nothing taken yet)
+        self._flush_waiting = False
+        # server_relationships.json is regenerated on demand (!server_relationships)
+        self._server_summary_at = 0.0
+
+        # Batched LLM extraction of relationship triples from guild messages
+        self.extractor = RelationshipExtractor(self, llm_service)
         logger.info(f"🔗 RelationshipService initialized with {len(self.relationships)} relationships")
-    
+
+    # =========================================================================
+    # Loading / serialization (string ids only exist in the JSON files)
+    # =========================================================================
+
+    def _load_relationships(self) -> Dict[str, RelationshipRecord]:
+        raw = self.data_manager.load_relationships()
+        return {
+            key: RelationshipRecord.from_dict(data, self.ids.intern)
+            for key, data in raw.items() if isinstance(data, dict)
+        }
+
+    def _load_user_names(self) -> Dict[int, User]:
+        user_names = {}
+        for user_id, record in self.data_manager.load_user_names().items():
+            uid = self.ids.intern(user_id)
+            if uid is not None and isinstance(record, dict):
+                user_names[uid] = User.from_name_record(uid, record)
+        return user_names
+
+    def _load_interactions(self) -> Dict[int, Dict[int, InteractionRecord]]:
+        matrix: Dict[int, Dict[int, InteractionRecord]] = {}
+        for data in self.data_manager.load_interactions().values():
+            if not isinstance(data, dict):
+                continue
+            from_user = self.ids.intern(data.get('from_user'))
+            to_user = self.ids.intern(data.get('to_user'))
+            if from_user is None or to_user is None:
+                continue
+            matrix.setdefault(from_user, {})[to_user] = InteractionRecord.from_dict(
+                data, Config.INTERACTION_CONTEXT_RING
+            )
+        return matrix
+
+    def _rebuild_interaction_totals(self):
+        self._mentions_received.clear()
+        self._total_interactions = 0
+        for row in self.interactions.values():
+            for to_user, record in row.items():
+                self._mentions_received[to_user] += record.count
+                self._total_interactions += record.count
+
+    def _load_conversation_history(self) -> Dict[Tuple[int, ...], ConversationThread]:
+        records = load_records(
+            self.data_manager.load_conversation_history(),
+            lambda data: ConversationThread.from_dict(data, self.ids.intern, self.channel_ids.intern)
+        )
+        return {r.participants: r for r in records}
+
+    def _snapshot_source(self, name: str) -> Tuple[List[Any], Callable[[Any], Tuple[str, Dict]]]:
+        """Records of a data file (copied list) and the function turning one into its JSON (key, value)."""
+        if name == 'relationships':
+            return list(self.relationships.items()), lambda item: (item[0], item[1].to_dict())
+        if name == 'user_names':
+            return list(self.user_names.items()), lambda item: (str(item[0]), item[1].to_name_record())
+        if name == 'interactions':
+            rows = [(a, b, record) for a, row in self.interactions.items() for b, record in row.items()]
+            return rows, lambda item: (f"{item[0]}_{item[1]}", item[2].to_dict(item[0], item[1]))
+        if name == 'conversation_history':
+            return list(self.conversation_history.values()), lambda thread: (thread.key(), thread.to_dict())
+        raise KeyError(name)
+
+    def _to_dict(self, name: str) -> Dict:
+        items, convert = self._snapshot_source(name)
+        return dict(map(convert, items))
+
+    async def _to_dict_sliced(self, name: str) -> Dict:
+        """Like _to_dict, yielding to the event loop every SNAPSHOT_SLICE records.
+
+        Each record is converted in one go, so it is never seen mid-update; a
+        record changed between slices is marked dirty again and rewritten by
+        the next flush.
+        """
+        items, convert = self._snapshot_source(name)
+        data: Dict = {}
+        for start in range(0, len(items), SNAPSHOT_SLICE):
+            if start:
+                await asyncio.sleep(0)
+            data.update(map(convert, items[start:start + SNAPSHOT_SLICE]))
+        return data
+
+    async def refresh_server_relationships_summary(self, max_age: float) -> Path:
+        """Regenerate server_relationships.json if it is older than max_age seconds; returns its path."""
+        path = self.data_dir / "server_relationships.json"
+        if time.monotonic() - self._server_summary_at >= max_age or not path.exists():
+            await self.update_server_relationships_summary()
+        return path
+
     async def update_server_relationships_summary(self):
-        """Auto-generate and update server_relationships.txt with pure JSON data"""
-        import json
+        """Generate server_relationships.json with pure JSON data (O(users x relationships): on demand only)"""
         summary_data = self.get_all_users_summary()
         
         # Build pure JSON structure
@@ -40,14 +175,14 @@ class RelationshipService:
                 "total_interactions": summary_data["total_interactions"]
             },
             "users": summary_data["users"],
-            "relationships": list(self.relationships.values()),
-            "interactions": self.interactions,
+            "relationships": list((await self._to_dict_sliced('relationships')).values()),
+            "interactions": await self._to_dict_sliced('interactions'),
             "generated_at": datetime.now().isoformat()
         }
         
         server_summary_path = self.data_dir / "server_relationships.json"
-        async with aiofiles.open(server_summary_path, mode="w", encoding="utf-8") as f:
-            await f.write(json.dumps(json_data, ensure_ascii=False, indent=2))
+        await write_json_async(server_summary_path, json_data)
+        self._server_summary_at = time.monotonic()
 
     def _build_server_relationships_prompt(self, summary_data: dict) -> str:
         """Build prompt for AI to summarize all server relationships"""
@@ -74,161 +209,253 @@ class RelationshipService:
         prompt = prompt.replace('[DỮ LIỆU CHI TIẾT SẼ ĐƯỢC CHÈN Ở ĐÂY]', "\n".join(user_lines))
         return prompt
 
-    async def auto_update_server_summary_on_change(self):
-        """Call this after any relationship/interactions update to keep server_relationships.txt fresh."""
-        await self.update_server_relationships_summary()
-    
     def _save_relationships(self):
-        """Save relationship data to file - delegates to RelationshipDataManager."""
-        self.data_manager.save_relationships(self.relationships)
-        # Trigger server summary update (fire and forget)
-        try:
-            import asyncio
-            if asyncio.get_event_loop().is_running():
-                asyncio.create_task(self.auto_update_server_summary_on_change())
-        except Exception as e:
-            logger.error(f"Error scheduling server summary update: {e}")
-    
+        """Save relationship data (write-behind) - flushed through RelationshipDataManager."""
+        self._mark_dirty('relationships')
+
     def _save_user_names(self):
-        """Save user names mapping to file - delegates to RelationshipDataManager."""
-        self.data_manager.save_user_names(self.user_names)
-    
+        """Save user names mapping (write-behind) - flushed through RelationshipDataManager."""
+        self._mark_dirty('user_names')
+
     def _save_interactions(self):
-        """Save interaction data to file - delegates to RelationshipDataManager."""
-        self.data_manager.save_interactions(self.interactions)
-        # Trigger server summary update (fire and forget)
+        """Save interaction data (write-behind) - flushed through RelationshipDataManager."""
+        self._mark_dirty('interactions')
+
+    # =========================================================================
+    # Write-behind persistence
+    # =========================================================================
+
+    def _mark_dirty(self, name: str):
+        """Mark a data file dirty; one flush per RELATIONSHIP_FLUSH_DELAY covers all changes."""
+        self._dirty.add(name)
         try:
-            import asyncio
-            if asyncio.get_event_loop().is_running():
-                asyncio.create_task(self.auto_update_server_summary_on_change())
-        except Exception as e:
-            logger.error(f"Error scheduling server summary update: {e}")
-    
-    def _save_conversation_history(self):
-        """Save conversation history - delegates to RelationshipDataManager."""
-        self.data_manager.save_conversation_history(self.conversation_history)
-        # Trigger server summary update (fire and forget)
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts/tools) - write immediately
+            self.flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._schedule_flush(loop)
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop):
+        self._flush_waiting = True
+        self._flush_task = loop.create_task(self._flush_after_delay())
+
+    async def _flush_after_delay(self):
+        try:
+            await asyncio.sleep(Config.RELATIONSHIP_FLUSH_DELAY)
+        finally:
+            self._flush_waiting = False
         try:
-            import asyncio
-            if asyncio.get_event_loop().is_running():
-                asyncio.create_task(self.auto_update_server_summary_on_change())
+            await self.flush()
         except Exception as e:
-            logger.error(f"Error scheduling server summary update: {e}")
-    
+            # The unwritten files stay dirty and are retried after the next delay
+            logger.error(f"❌ Error flushing relationship data: {e}")
+        if self._dirty:
+            # Changed (or failed) while this flush was running: _mark_dirty saw it still active
+            self._schedule_flush(asyncio.get_running_loop())
+
+    def _write_snapshot(self, name: str, data: Dict):
+        writers = {
+            'relationships': self.data_manager.save_relationships,
+            'user_names': self.data_manager.save_user_names,
+            'interactions': self.data_manager.save_interactions,
+            'conversation_history': self.data_manager.save_conversation_history,
+        }
+        writers[name](data)
+
+    async def flush(self) -> List[str]:
+        """Write all dirty data files now. Records are serialized on the loop in
+        slices (they are only safe to read there), JSON encoding and writing run
+        on the data I/O thread. Returns the names of the files written.
+
+        A file leaves the dirty set only once written: if a write fails or the
+        flush is cancelled, the files not yet written are marked dirty again.
+        """
+        remaining, self._dirty = self._dirty, set()
+        written: List[str] = []
+        try:
+            while remaining:
+                name = next(iter(remaining))
+                data = await self._to_dict_sliced(name)
+                await run_io(self._write_snapshot, name, data)
+                remaining.discard(name)
+                written.append(name)
+        except BaseException:
+            self._dirty |= remaining
+            raise
+        if written:
+            logger.debug(f"💾 Flushed relationship data: {', '.join(written)}")
+        return written
+
+    async def close(self) -> List[str]:
+        """Stop the delayed flush and write everything dirty now (shutdown). Returns the files written."""
+        # A flush still waiting for its delay is cancelled; one already writing
+        # is awaited, since it holds the files it took from the dirty set
+        while self._flush_task is not None and not self._flush_task.done():
+            task = self._flush_task
+            if self._flush_waiting:
+                task.cancel()
+            await asyncio.wait([task])
+        self._flush_task = None
+        flushed: List[str] = []
+        # Changes made while a slice yielded are marked dirty again
+        while self._dirty:
+            flushed.extend(name for name in await self.flush() if name not in flushed)
+        return flushed
+
+    def flush_sync(self):
+        """Write all dirty data files on the current thread (same dirty-set handling as flush)."""
+        remaining, self._dirty = self._dirty, set()
+        try:
+            while remaining:
+                name = next(iter(remaining))
+                self._write_snapshot(name, self._to_dict(name))
+                remaining.discard(name)
+        except BaseException:
+            self._dirty |= remaining
+            raise
+
+    def _save_conversation_history(self):
+        """Save conversation history (write-behind) - flushed through RelationshipDataManager."""
+        self._mark_dirty('conversation_history')
+
     def update_user_name(self, user_id: str, username: str, display_name: Optional[str] = None, real_name: Optional[str] = None):
         """Update user name information"""
-        if user_id not in self.user_names:
-            self.user_names[user_id] = {
-                'username': username,
-                'display_name': display_name,
-                'real_name': real_name,
-                'name_history': [username],
-                'first_seen': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
-            }
+        uid = self.ids.intern(user_id)
+        if uid is None:
+            logger.warning(f"⚠️ Ignoring name update for invalid user id: {user_id}")
+            return
+        now = time.time()
+        user = self.user_names.get(uid)
+        if user is None:
+            self.user_names[uid] = User(
+                uid, username,
+                display_name=display_name,
+                real_name=real_name,
+                first_seen=now,
+                last_updated=now
+            )
         else:
             # Update existing info
-            self.user_names[user_id]['username'] = username
+            user.username = username
             if display_name:
-                self.user_names[user_id]['display_name'] = display_name
-            if real_name and real_name != self.user_names[user_id].get('real_name'):
-                self.user_names[user_id]['real_name'] = real_name
+                user.display_name = display_name
+            if real_name and real_name != user.real_name:
+                user.real_name = real_name
                 logger.info(f"📝 Real name updated for {user_id}: {real_name}")
             
             # Track name history
-            if username not in self.user_names[user_id]['name_history']:
-                self.user_names[user_id]['name_history'].append(username)
-            
-            self.user_names[user_id]['last_updated'] = datetime.now().isoformat()
-        
+            if username not in user.name_history:
+                user.name_history.append(username)
+
+            user.last_updated = now
+
+        self.name_matcher.set_names(uid, self._name_variants(self.user_names[uid]))
         self._save_user_names()
-    
+
+    @staticmethod
+    def _name_variants(user: User) -> Tuple[Optional[str], ...]:
+        return (user.username, user.display_name, user.real_name)
+
+    def find_name_references(self, author_id: str, message_content: str, exclude_user_ids: Optional[List[str]] = None) -> List[str]:
+        """Ids of known members referred to by name in a message (author and @mentioned excluded)"""
+        author = self.ids.lookup(author_id)
+        excluded = {self.ids.lookup(u) for u in exclude_user_ids or []}
+        return [
+            str(uid) for uid, _ in self.name_matcher.find(message_content)
+            if uid != author and uid not in excluded
+        ]
+
     def get_user_display_name(self, user_id: str) -> str:
         """Get the best display name for a user (real name > display name > username)"""
-        if user_id not in self.user_names:
-            return f"User_{user_id[-4:]}"  # Fallback với 4 số cuối của ID
-        
-        user_info = self.user_names[user_id]
-        
+        user = self.user_names.get(self.ids.lookup(user_id))
+        if user is None:
+            return f"User_{str(user_id)[-4:]}"  # Fallback với 4 số cuối của ID
+
         # Ưu tiên: tên thật > display name > username
-        if user_info.get('real_name'):
-            return user_info['real_name']
-        elif user_info.get('display_name'):
-            return user_info['display_name']
-        else:
-            return user_info['username']
-    
-    def process_message(self, author_id: str, author_username: str, message_content: str, mentioned_user_ids: Optional[List[str]] = None, channel_id: Optional[str] = None):
+        return user.best_name()
+
+    def process_message(self, author_id: str, author_username: str, message_content: str, mentioned_user_ids: Optional[List[str]] = None, channel_id: Optional[str] = None, guild_id: Optional[str] = None):
         """Process a message to update relationship information (giao cho LLM xử lý hoàn toàn)"""
         # Update author's name info
         self.update_user_name(author_id, author_username)
         # Record conversation for history
         self._record_conversation(author_id, message_content, mentioned_user_ids or [], channel_id)
-        # Không còn extract relationship info bằng pattern, mọi phân tích sẽ do LLM xử lý khi cần
+        # Count mentions in the interaction matrix (O(1) per mention, persisted write-behind)
+        if mentioned_user_ids:
+            self._record_interactions(author_id, mentioned_user_ids, 'mention', message_content)
+        # Members named without an @mention count as weaker 'name_reference' interactions
+        if Config.NAME_REFERENCES_ENABLED:
+            referenced = self.find_name_references(author_id, message_content, mentioned_user_ids)
+            if referenced:
+                self._record_interactions(author_id, referenced, NAME_REFERENCE, message_content)
+        # Buffer for batched LLM relationship extraction (one LLM call per batch)
+        self.extractor.add_message(guild_id, author_id, author_username, message_content)
     
     def _record_interactions(self, author_id: str, target_user_ids: List[str], interaction_type: str, context: str = ""):
         """Record interactions between users"""
-        timestamp = datetime.now().isoformat()
-        
+        author = self.ids.intern(author_id)
+        if author is None:
+            return
+        timestamp = time.time()
+        context = context[:200]  # Limit context length
+        row = self.interactions.get(author)
+        if row is None:
+            row = self.interactions[author] = {}
+
         for target_id in target_user_ids:
-            # Create interaction key
-            interaction_key = f"{author_id}_{target_id}"
-            
-            if interaction_key not in self.interactions:
-                self.interactions[interaction_key] = {
-                    'from_user': author_id,
-                    'to_user': target_id,
-                    'interactions': []
-                }
-            
-            # Add interaction
-            self.interactions[interaction_key]['interactions'].append({
-                'type': interaction_type,
-                'timestamp': timestamp,
-                'context': context[:200]  # Limit context length
-            })
-            
-            # Keep only recent interactions (last 100)
-            if len(self.interactions[interaction_key]['interactions']) > 100:
-                self.interactions[interaction_key]['interactions'] = \
-                    self.interactions[interaction_key]['interactions'][-100:]
-        
+            target = self.ids.intern(target_id)
+            if target is None or target == author:
+                continue
+
+            record = row.get(target)
+            if record is None:
+                record = row[target] = InteractionRecord()
+
+            # Count the interaction; only the recent contexts are kept in the ring
+            record.add(interaction_type, timestamp, context, Config.INTERACTION_CONTEXT_RING)
+            if interaction_type != NAME_REFERENCE:
+                # Name references are kept apart so mention totals are not inflated
+                self._mentions_received[target] += 1
+                self._total_interactions += 1
+
         self._save_interactions()
     
     def _record_conversation(self, author_id: str, message_content: str, mentioned_users: List[str], channel_id: Optional[str]):
         """Record conversation history between users"""
-        timestamp = datetime.now().isoformat()
-        
+        author = self.ids.intern(author_id)
+        if author is None:
+            return
+        mentioned = tuple(m for m in (self.ids.intern(u) for u in mentioned_users) if m is not None)
+
         # Record conversation entry
-        conversation_entry = {
-            'author_id': author_id,
-            'message': message_content[:500],  # Limit message length
-            'mentioned_users': mentioned_users,
-            'channel_id': channel_id,
-            'timestamp': timestamp
-        }
-        
+        conversation_entry = ConversationMessage(
+            author,
+            message_content[:500],  # Limit message length
+            mentioned,
+            self.channel_ids.intern(channel_id),
+            time.time()
+        )
+
         # Group conversations by participants
-        participants = sorted([author_id] + mentioned_users)
-        conversation_key = "_".join(participants)
-        
-        if conversation_key not in self.conversation_history:
-            self.conversation_history[conversation_key] = {
-                'participants': participants,
-                'messages': []
-            }
-        
-        self.conversation_history[conversation_key]['messages'].append(conversation_entry)
-        
+        participants = tuple(sorted(set((author,) + mentioned)))
+
+        thread = self.conversation_history.get(participants)
+        if thread is None:
+            thread = ConversationThread(participants)
+            self.conversation_history[participants] = thread
+
+        thread.messages.append(conversation_entry)
+
         # Keep only recent messages (last 50 per conversation)
-        if len(self.conversation_history[conversation_key]['messages']) > 50:
-            self.conversation_history[conversation_key]['messages'] = \
-                self.conversation_history[conversation_key]['messages'][-50:]
-        
+        if len(thread.messages) > 50:
+            del thread.messages[:-50]
+
         self._save_conversation_history()
     
-    def _add_relationship(self, person1: str, person2: str, relationship_type: str, reported_by: str, context: str, confidence: float):
-        """Add or update a relationship"""
+    def _add_relationship(self, person1: str, person2: str, relationship_type: str, reported_by: str, context: str, confidence: float, save: bool = True):
+        """Add or update a relationship (save=False lets batch callers save once at the end)"""
         # Normalize names and create a consistent key
         person1_lower = person1.lower().strip()
         person2_lower = person2.lower().strip()
@@ -240,36 +467,35 @@ class RelationshipService:
         else:
             rel_key = f"{person2_lower}_{person1_lower}"
             persons = (person2, person1)
-        
-        timestamp = datetime.now().isoformat()
-        
-        if rel_key not in self.relationships:
-            self.relationships[rel_key] = {
-                'person1': persons[0],
-                'person2': persons[1],
-                'relationship_history': []
-            }
-        
+
+        record = self.relationships.get(rel_key)
+        if record is None:
+            record = RelationshipRecord(persons[0], persons[1])
+            self.relationships[rel_key] = record
+            self._index_relationship(rel_key, record)
+
         # Add relationship entry
-        relationship_entry = {
-            'type': relationship_type,
-            'reported_by': reported_by,
-            'context': context,
-            'confidence': confidence,
-            'timestamp': timestamp
-        }
-        
-        self.relationships[rel_key]['relationship_history'].append(relationship_entry)
-        
+        record.history.append(RelationshipEntry(
+            relationship_type,
+            intern_reporter(reported_by, self.ids.intern),
+            context,
+            confidence,
+            time.time()
+        ))
+
         # Keep only recent relationship updates (last 20)
-        if len(self.relationships[rel_key]['relationship_history']) > 20:
-            self.relationships[rel_key]['relationship_history'] = \
-                self.relationships[rel_key]['relationship_history'][-20:]
-        
-        self._save_relationships()
+        if len(record.history) > 20:
+            del record.history[:-20]
+
+        if save:
+            self._save_relationships()
         
         logger.info(f"🔗 Added relationship: {person1} - {person2} ({relationship_type}) reported by {reported_by}")
     
+    def _index_relationship(self, rel_key: str, record: RelationshipRecord):
+        for person in {record.person1.lower(), record.person2.lower()}:
+            self._relationship_keys_by_name.setdefault(person, []).append(rel_key)
+
     def get_user_relationships(self, user_identifier: str) -> List[Dict]:
         """Get all relationships for a user (by ID, username, or real name)"""
         relationships = []
@@ -280,28 +506,30 @@ class RelationshipService:
             return relationships
         
         # Get username from user_names (person1/person2 in relationships use username, not display_name)
-        user_info = self.user_names.get(user_id, {})
-        username = user_info.get('username', '').lower()
+        user = self.user_names.get(self.ids.lookup(user_id))
+        username = user.username.lower() if user and user.username else ''
         if not username:
             return relationships
-        
-        for rel_key, rel_data in self.relationships.items():
-            person1 = rel_data['person1'].lower()
-            person2 = rel_data['person2'].lower()
-            
+
+        # Only this user's relationships (name index), not a scan of the whole graph
+        for rel_key in self._relationship_keys_by_name.get(username, ()):
+            record = self.relationships[rel_key]
+            person1 = record.person1.lower()
+            person2 = record.person2.lower()
+
             if username == person1 or username == person2:
                 # Get the latest relationship status
-                if rel_data['relationship_history']:
-                    latest_rel = rel_data['relationship_history'][-1]
-                    other_person = rel_data['person2'] if username == person1 else rel_data['person1']
-                    
+                if record.history:
+                    latest_rel = record.history[-1]
+                    other_person = record.person2 if username == person1 else record.person1
+
                     relationships.append({
                         'other_person': other_person,
-                        'relationship_type': latest_rel['type'],
-                        'reported_by': latest_rel['reported_by'],
-                        'context': latest_rel['context'],
-                        'timestamp': latest_rel['timestamp'],
-                        'confidence': latest_rel['confidence']
+                        'relationship_type': latest_rel.type,
+                        'reported_by': self.ids.to_str(latest_rel.reported_by),
+                        'context': latest_rel.context,
+                        'timestamp': datetime.fromtimestamp(latest_rel.timestamp).isoformat(),
+                        'confidence': latest_rel.confidence
                     })
         
         return relationships
@@ -311,26 +539,23 @@ class RelationshipService:
         user_id = self._resolve_user_identifier(user_identifier)
         if not user_id:
             return {}
-        
-        # Count mentions and interactions
-        mentions_sent = 0
-        mentions_received = 0
-        frequent_contacts = Counter()
-        
-        for interaction_key, interaction_data in self.interactions.items():
-            if interaction_data['from_user'] == user_id:
-                mentions_sent += len(interaction_data['interactions'])
-                frequent_contacts[interaction_data['to_user']] += len(interaction_data['interactions'])
-            elif interaction_data['to_user'] == user_id:
-                mentions_received += len(interaction_data['interactions'])
-        
+        uid = self.ids.lookup(user_id)
+
+        # Sent = this user's matrix row; received is maintained incrementally per column
+        row = self.interactions.get(uid, {})
+        frequent_contacts = Counter({
+            to_user: record.count for to_user, record in row.items() if record.count
+        })
+        mentions_sent = sum(frequent_contacts.values())
+        mentions_received = self._mentions_received.get(uid, 0)
+
         # Get top contacts
         top_contacts = []
         for contact_id, count in frequent_contacts.most_common(5):
-            contact_name = self.get_user_display_name(contact_id)
+            contact_name = self.get_user_display_name(str(contact_id))
             top_contacts.append({
                 'name': contact_name,
-                'user_id': contact_id,
+                'user_id': str(contact_id),
                 'interaction_count': count
             })
         
@@ -338,6 +563,7 @@ class RelationshipService:
             'mentions_sent': mentions_sent,
             'mentions_received': mentions_received,
             'total_interactions': mentions_sent + mentions_received,
+            'name_references_sent': sum(record.name_references for record in row.values()),
             'top_contacts': top_contacts
         }
     
@@ -350,30 +576,25 @@ class RelationshipService:
             return "Không tìm thấy thông tin người dùng."
         
         # Find conversation between these users
-        participants = sorted([user1_id, user2_id])
-        conversation_key = "_".join(participants)
-        
-        if conversation_key not in self.conversation_history:
+        participants = tuple(sorted({self.ids.lookup(user1_id), self.ids.lookup(user2_id)}))
+
+        thread = self.conversation_history.get(participants)
+        if thread is None:
             return f"Không có lịch sử trò chuyện giữa {self.get_user_display_name(user1_id)} và {self.get_user_display_name(user2_id)}."
         
         # Filter messages from the last N days
-        cutoff_date = datetime.now() - timedelta(days=days_back)
-        recent_messages = []
-        
-        for msg in self.conversation_history[conversation_key]['messages']:
-            msg_date = datetime.fromisoformat(msg['timestamp'])
-            if msg_date >= cutoff_date:
-                recent_messages.append(msg)
-        
+        cutoff = (datetime.now() - timedelta(days=days_back)).timestamp()
+        recent_messages = [msg for msg in thread.messages if msg.timestamp >= cutoff]
+
         if not recent_messages:
             return f"Không có cuộc trò chuyện nào trong {days_back} ngày qua giữa {self.get_user_display_name(user1_id)} và {self.get_user_display_name(user2_id)}."
         
         # Format conversation for summary
         conversation_text = ""
         for msg in recent_messages[-10:]:  # Last 10 messages
-            author_name = self.get_user_display_name(msg['author_id'])
-            conversation_text += f"{author_name}: {msg['message']}\n"
-        
+            author_name = self.get_user_display_name(str(msg.author_id))
+            conversation_text += f"{author_name}: {msg.message}\n"
+
         return f"Cuộc trò chuyện gần đây giữa {self.get_user_display_name(user1_id)} và {self.get_user_display_name(user2_id)}:\n\n{conversation_text}"
     
     async def generate_relationship_analysis(self, user_identifier: str) -> str:
@@ -425,51 +646,54 @@ class RelationshipService:
     def _resolve_user_identifier(self, identifier: str) -> Optional[str]:
         """Resolve user identifier (ID, username, or real name) to user ID"""
         # Direct ID match
-        if identifier in self.user_names:
-            return identifier
-        
+        uid = self.ids.lookup(identifier)
+        if uid is not None and uid in self.user_names:
+            return str(uid)
+
         # Search by username or real name
-        identifier_lower = identifier.lower().strip()
-        
-        for user_id, user_info in self.user_names.items():
+        identifier_lower = str(identifier).lower().strip()
+
+        for uid, user in list(self.user_names.items()):
             # Check username
-            if user_info.get('username', '').lower() == identifier_lower:
-                return user_id
-            
+            if (user.username or '').lower() == identifier_lower:
+                return str(uid)
+
             # Check display name
-            if user_info.get('display_name', '').lower() == identifier_lower:
-                return user_id
-            
+            if (user.display_name or '').lower() == identifier_lower:
+                return str(uid)
+
             # Check real name
-            if user_info.get('real_name', '').lower() == identifier_lower:
-                return user_id
-            
+            if (user.real_name or '').lower() == identifier_lower:
+                return str(uid)
+
             # Check name history
-            for name in user_info.get('name_history', []):
+            for name in user.name_history:
                 if name.lower() == identifier_lower:
-                    return user_id
-        
+                    return str(uid)
+
         return None
     
     def search_relationships_by_keyword(self, keyword: str) -> List[Dict]:
         """Search relationships by keyword in context"""
         results = []
         keyword_lower = keyword.lower()
-        
-        for rel_key, rel_data in self.relationships.items():
-            for rel_entry in rel_data['relationship_history']:
-                if keyword_lower in rel_entry['context'].lower():
+
+        for record in list(self.relationships.values()):
+            for rel_entry in record.history:
+                if keyword_lower in rel_entry.context.lower():
                     results.append({
-                        'person1': rel_data['person1'],
-                        'person2': rel_data['person2'],
-                        'relationship_type': rel_entry['type'],
-                        'context': rel_entry['context'],
-                        'timestamp': rel_entry['timestamp'],
-                        'reported_by': self.get_user_display_name(rel_entry['reported_by'])
+                        'person1': record.person1,
+                        'person2': record.person2,
+                        'relationship_type': rel_entry.type,
+                        'context': rel_entry.context,
+                        'timestamp': rel_entry.timestamp,
+                        'reported_by': self.get_user_display_name(self.ids.to_str(rel_entry.reported_by))
                     })
         
         # Sort by timestamp (newest first)
         results.sort(key=lambda x: x['timestamp'], reverse=True)
+        for result in results:
+            result['timestamp'] = datetime.fromtimestamp(result['timestamp']).isoformat()
         return results[:10]  # Return top 10 results
     
     def get_user_mentions_to(self, user_identifier: str, target_identifier: str) -> List[Dict]:
@@ -479,30 +703,40 @@ class RelationshipService:
         
         if not user_id or not target_id:
             return []
-        
-        interaction_key = f"{user_id}_{target_id}"
-        
-        if interaction_key in self.interactions:
-            return self.interactions[interaction_key]['interactions']
-        
+
+        record = self.interactions.get(self.ids.lookup(user_id), {}).get(self.ids.lookup(target_id))
+
+        if record is not None:
+            return record.event_dicts()
+
         return []
-    
+
+    def get_mention_count(self, user_identifier: str, target_identifier: str) -> int:
+        """Total mentions from one user to another (including those no longer in the context ring)"""
+        user_id = self._resolve_user_identifier(user_identifier)
+        target_id = self._resolve_user_identifier(target_identifier)
+        if not user_id or not target_id:
+            return 0
+        record = self.interactions.get(self.ids.lookup(user_id), {}).get(self.ids.lookup(target_id))
+        return record.count if record is not None else 0
+
     def get_all_users_summary(self) -> Dict:
         """Get summary of all tracked users"""
         summary = {
             'total_users': len(self.user_names),
             'total_relationships': len(self.relationships),
-            'total_interactions': sum(len(data['interactions']) for data in self.interactions.values()),
+            'total_interactions': self._total_interactions,
             'users': []
         }
-        
-        for user_id, user_info in self.user_names.items():
+
+        for uid, user in list(self.user_names.items()):
+            user_id = str(uid)
             user_summary = {
                 'user_id': user_id,
-                'display_name': self.get_user_display_name(user_id),
-                'username': user_info.get('username', ''),
-                'real_name': user_info.get('real_name', ''),
-                'first_seen': user_info.get('first_seen', ''),
+                'display_name': user.best_name(),
+                'username': user.username or '',
+                'real_name': user.real_name or '',
+                'first_seen': datetime.fromtimestamp(user.first_seen).isoformat() if user.first_seen else '',
                 'relationship_count': len(self.get_user_relationships(user_id)),
                 'interaction_stats': self.get_interaction_stats(user_id)
             }
@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+
+
+class UserIdInterner:
+    """
+    Interns Discord user ids as ints.
+
+    Snowflakes arrive as decimal strings and used to be repeated as dict keys
+    and list items across every relationship structure. Internally they are
+    stored as one shared int object per user; string ids only exist at the
+    service's API boundary (see to_str).
+    """
+
+    __slots__ = ('_pool',)
+
+    def __init__(self):
+        self._pool: Dict[int, int] = {}
+
+    def intern(self, user_id) -> Optional[int]:
+        """Return the shared int for a user id (str or int), or None if it is not numeric."""
+        if user_id is None or user_id == '':
+            return None
+        try:
+            value = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return self._pool.setdefault(value, value)
+
+    def lookup(self, user_id) -> Optional[int]:
+        """Like intern() but never grows the pool (for read-only queries)."""
+        try:
+            return self._pool.get(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def to_str(user_id: Optional[int]) -> str:
+        return str(user_id) if user_id is not None else ""
+
+    def __len__(self) -> int:
+        return len(self._pool)
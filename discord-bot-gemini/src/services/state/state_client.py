@@ -0,0 +1,280 @@
+"""
+State Client - Connection from a bot process to the shared state server.
+
+Requests are pipelined on one connection and matched to replies by id.
+When the server is unreachable (not started, restarting, too slow) every
+call falls back to an in-process StateStore, so the bot keeps working with
+per-process locks and limits, and reconnects at most every
+RECONNECT_INTERVAL seconds.
+
+A slow reply only makes that one call fall back (its late reply is dropped
+by id); the connection, and with it the leases the server ties to it, is
+given up after MAX_MISSED_REPLIES timeouts in a row. Leases this process
+holds are renewed while held (a turn can outlast the TTL) and re-acquired
+after a reconnect.
+"""
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from config.settings import Config
+from services.state.state_server import StateStore, parse_address, MAX_LINE
+
+logger = logging.getLogger('discord_bot.StateClient')
+
+RECONNECT_INTERVAL = 5.0
+# Consecutive unanswered calls before the connection is considered dead
+MAX_MISSED_REPLIES = 3
+# Held leases are renewed every TTL * LEASE_RENEW_FRACTION seconds
+LEASE_RENEW_FRACTION = 1 / 3
+LEASE_RENEW_IDLE = 10.0
+
+
+class StateClient:
+    def __init__(self, address: str, timeout: Optional[float] = None, owner: Optional[str] = None):
+        self.address = address
+        self.timeout = timeout or Config.STATE_SERVER_TIMEOUT
+        # Identifies this process's leases on the server
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._local = StateStore()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._renew_task: Optional[asyncio.Task] = None
+        self._lease_added: Optional[asyncio.Event] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._retry_at = 0.0
+        self._missed_replies = 0
+        # Leases this process holds: key -> ttl
+        self._held: Dict[str, float] = {}
+        self.remote_calls = 0
+        self.fallback_calls = 0
+        self.late_replies = 0
+        self.lease_renewals = 0
+        self.leases_lost = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self) -> bool:
+        if self.connected:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            host, port = parse_address(self.address)
+            try:
+                if port is None:
+                    opening = asyncio.open_unix_connection(host, limit=MAX_LINE)
+                else:
+                    opening = asyncio.open_connection(host, port, limit=MAX_LINE)
+                self._reader, self._writer = await asyncio.wait_for(opening, self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+                logger.warning(f"⚠️ State server {self.address} unavailable ({e}), using process-local state")
+                return False
+            self._reader_task = asyncio.create_task(self._read_replies(self._reader))
+            self._missed_replies = 0
+            self._send_nowait('hello', {})
+            logger.info(f"🔗 Connected to state server {self.address} as {self.owner}")
+            # The server dropped our leases with the old connection: take them back
+            if self._held:
+                self._renew_held()
+                logger.info(f"🔐 Re-acquiring {len(self._held)} held lease(s) after reconnect")
+            self._renew_task = asyncio.create_task(self._renew_leases())
+            return True
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.pop(reply.get('id'), None)
+                if future is None or future.done():
+                    self.late_replies += 1
+                    continue
+                if 'error' in reply:
+                    future.set_exception(RuntimeError(reply['error']))
+                else:
+                    future.set_result(reply.get('result'))
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"⚠️ State server connection lost: {e}")
+        finally:
+            # A newer connection may already have replaced this one
+            if self._reader is reader:
+                self._disconnect()
+
+    def _send(self, op: str, args: dict) -> Tuple[int, Optional[asyncio.Future]]:
+        """Write a request now (keeps requests in call order); no future if not connected."""
+        if not self.connected:
+            return 0, None
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        request = {'id': self._next_id, 'op': op, 'owner': self.owner, **args}
+        self._writer.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        return self._next_id, future
+
+    def _send_nowait(self, op: str, args: dict) -> Optional[asyncio.Future]:
+        _, future = self._send(op, args)
+        if future is not None:
+            # Fire-and-forget: a lost reply only matters for leases, which disconnect/TTL cover
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    async def _call(self, op: str, **args) -> Optional[dict]:
+        """Run an op on the server; None means use the local store instead."""
+        if not await self._ensure_connected():
+            self.fallback_calls += 1
+            return None
+        request_id, future = self._send(op, args)
+        if future is None:
+            self.fallback_calls += 1
+            return None
+        try:
+            result = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # Keep the connection (and the leases tied to it); its reply is dropped when it comes
+            self._pending.pop(request_id, None)
+            self._missed_replies += 1
+            self.fallback_calls += 1
+            if self._missed_replies >= MAX_MISSED_REPLIES:
+                logger.warning(f"⚠️ State server missed {self._missed_replies} replies in a row, reconnecting")
+                self._disconnect()
+            else:
+                logger.warning(f"⚠️ State server did not answer {op} within {self.timeout}s, using local state for it")
+            return None
+        except (RuntimeError, ConnectionError) as e:
+            logger.error(f"❌ State server {op} failed: {e}")
+            self.fallback_calls += 1
+            return None
+        self._missed_replies = 0
+        self.remote_calls += 1
+        return result
+
+    def _renew_held(self):
+        """Re-send acquire (a renewal for the owner) for every held lease."""
+        for key, ttl in list(self._held.items()):
+            future = self._send_nowait('acquire', {'key': key, 'ttl': ttl})
+            if future is not None:
+                future.add_done_callback(lambda f, key=key: self._on_renewed(key, f))
+
+    def _on_renewed(self, key: str, future: asyncio.Future):
+        if future.cancelled() or future.exception() is not None:
+            return  # connection lost: re-acquired after the reconnect
+        if future.result().get('acquired'):
+            self.lease_renewals += 1
+            return
+        # Expired and taken by another process (e.g. while we were disconnected)
+        if self._held.pop(key, None) is not None:
+            self.leases_lost += 1
+            logger.warning(f"⚠️ Lease {key} is now held by {future.result().get('owner')}")
+
+    async def _renew_leases(self):
+        """Keep held leases alive while a turn outlasts their TTL."""
+        if self._lease_added is None:
+            self._lease_added = asyncio.Event()
+        while True:
+            ttl = min(self._held.values(), default=0.0)
+            self._lease_added.clear()
+            try:
+                # A new lease may need an earlier renewal: recompute the interval
+                await asyncio.wait_for(self._lease_added.wait(),
+                                       ttl * LEASE_RENEW_FRACTION if ttl else LEASE_RENEW_IDLE)
+            except asyncio.TimeoutError:
+                self._renew_held()
+
+    def _disconnect(self):
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+        for task in (self._reader_task, self._renew_task):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        self._reader_task = self._renew_task = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("state server connection closed"))
+
+    async def acquire_lease(self, key: str, ttl: float) -> Tuple[bool, float]:
+        """Returns (acquired, seconds the current holder has held it)."""
+        result = await self._call('acquire', key=key, ttl=ttl)
+        if result is None:
+            result = self._local.acquire(key, self.owner, ttl)
+        if result['acquired']:
+            if key not in self._held and self._lease_added is not None:
+                self._lease_added.set()
+            self._held[key] = ttl
+        return result['acquired'], result.get('held_for', 0.0)
+
+    def release_lease(self, key: str):
+        """Release without waiting; sent before any request made after this call."""
+        self._held.pop(key, None)
+        self._local.release(key, self.owner)
+        self._send_nowait('release', {'key': key})
+
+    async def check_and_mark(self, key: str) -> bool:
+        """Marks the key; True if any process marked it before."""
+        result = await self._call('check_and_mark', key=key)
+        if result is None:
+            result = self._local.check_and_mark(key)
+        return result['duplicate']
+
+    async def check_rate(self, user_id: str, guild_id: Optional[str] = None,
+                         channel_id: Optional[str] = None) -> Tuple[Optional[str], int]:
+        """Shared anti-spam check; same contract as AntiSpamService.check_spam_scoped."""
+        result = await self._call('check_rate', user_id=user_id, guild_id=guild_id, channel_id=channel_id)
+        if result is None:
+            result = self._local.check_rate(user_id, guild_id, channel_id)
+        return result['scope'], result['remaining']
+
+    async def close(self):
+        if self.connected:
+            await self._writer.drain()
+        self._disconnect()
+
+    def get_stats(self) -> dict:
+        return {
+            'address': self.address,
+            'connected': self.connected,
+            'owner': self.owner,
+            'remote_calls': self.remote_calls,
+            'fallback_calls': self.fallback_calls,
+            'late_replies': self.late_replies,
+            'held_leases': len(self._held),
+            'lease_renewals': self.lease_renewals,
+            'leases_lost': self.leases_lost,
+        }
+
+
+_client: Optional[StateClient] = None
+
+
+def get_state_client() -> Optional[StateClient]:
+    """The process-wide client, or None when STATE_SERVER is not configured."""
+    global _client
+    if _client is None and Config.STATE_SERVER:
+        _client = StateClient(Config.STATE_SERVER)
+    return _client
+
+
+async def close_state_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
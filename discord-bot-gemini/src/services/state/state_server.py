@@ -0,0 +1,217 @@
+"""
+State Server - Conversation leases, rate limits and dedup shared by bot processes.
+
+Several bot processes on one host (blue/green deploys, scale-out workers)
+receive the same gateway events, so per-process locks, anti-spam buckets
+and seen-message sets stop being authoritative. This module keeps that
+state in one place: a StateStore, served to the processes over a unix
+socket (or a localhost TCP port) by StateServer.
+
+The protocol is one JSON object per line. Requests carry an "id" and an
+"op"; the reply echoes the id with either "result" or "error". A client
+may pipeline requests on one connection; they are answered in order.
+Leases held by a connection are released when it closes, so a crashed
+process never keeps a user locked for longer than it takes the socket to
+drop (the TTL covers hung processes).
+
+Run it with scripts/state_server.py.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+from services.conversation.anti_spam_service import AntiSpamService
+from services.conversation.message_deduplicator import MessageDeduplicator
+
+logger = logging.getLogger('discord_bot.StateServer')
+
+# Seconds between sweeps of expired leases
+LEASE_SWEEP_INTERVAL = 60.0
+# Longest accepted request line
+MAX_LINE = 64 * 1024
+
+
+def parse_address(address: str) -> Tuple[str, Optional[int]]:
+    """'host:port' -> (host, port) for TCP; anything else is a unix socket path -> (path, None)."""
+    host, sep, port = address.rpartition(':')
+    if sep and host and port.isdigit() and '/' not in address:
+        return host, int(port)
+    return address, None
+
+
+class _Lease:
+    __slots__ = ('owner', 'acquired_at', 'expires_at')
+
+    def __init__(self, owner: str, now: float, ttl: float):
+        self.owner = owner
+        self.acquired_at = now
+        self.expires_at = now + ttl
+
+
+class StateStore:
+    """
+    The shared state itself. Operations are synchronous and atomic (they run
+    on one event loop), and the same class is the in-process fallback of the
+    client when no server is reachable.
+    """
+
+    def __init__(self):
+        self.leases: Dict[str, _Lease] = {}
+        self.anti_spam = AntiSpamService()
+        self.dedup = MessageDeduplicator()
+        self._last_sweep = time.monotonic()
+        self.lease_conflicts = 0
+
+    def acquire(self, key: str, owner: str, ttl: float) -> dict:
+        """Take or renew a lease. A held lease reports its owner and age instead."""
+        now = time.monotonic()
+        if now - self._last_sweep >= LEASE_SWEEP_INTERVAL:
+            self.sweep(now)
+        lease = self.leases.get(key)
+        if lease is None or lease.expires_at <= now:
+            self.leases[key] = _Lease(owner, now, ttl)
+            return {'acquired': True, 'held_for': 0.0}
+        if lease.owner == owner:
+            lease.expires_at = now + ttl
+            return {'acquired': True, 'held_for': round(now - lease.acquired_at, 1)}
+        self.lease_conflicts += 1
+        return {'acquired': False, 'owner': lease.owner, 'held_for': round(now - lease.acquired_at, 1)}
+
+    def release(self, key: str, owner: str) -> dict:
+        lease = self.leases.get(key)
+        if lease is None or lease.owner != owner:
+            return {'released': False}
+        del self.leases[key]
+        return {'released': True}
+
+    def release_owner(self, owner: str) -> int:
+        """Drop every lease of an owner (its connection closed)."""
+        keys = [key for key, lease in self.leases.items() if lease.owner == owner]
+        for key in keys:
+            del self.leases[key]
+        return len(keys)
+
+    def check_and_mark(self, key: str) -> dict:
+        return {'duplicate': self.dedup.check_and_mark(key)}
+
+    def check_rate(self, user_id: str, guild_id: Optional[str] = None,
+                   channel_id: Optional[str] = None) -> dict:
+        scope, remaining = self.anti_spam.check_spam_scoped(user_id, guild_id, channel_id)
+        return {'scope': scope, 'remaining': remaining}
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.monotonic()
+        self._last_sweep = now
+        expired = [key for key, lease in self.leases.items() if lease.expires_at <= now]
+        for key in expired:
+            del self.leases[key]
+        return len(expired)
+
+    def get_stats(self) -> dict:
+        return {
+            'leases': len(self.leases),
+            'lease_conflicts': self.lease_conflicts,
+            'dedup_entries': len(self.dedup),
+            **self.anti_spam.get_stats(),
+        }
+
+
+class StateServer:
+    """Serves a StateStore over a unix socket or localhost TCP."""
+
+    def __init__(self, address: str, store: Optional[StateStore] = None):
+        self.address = address
+        self.store = store or StateStore()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self.requests = 0
+        # op -> handler(args, owner)
+        self._ops = {
+            'hello': lambda args, owner: {'ok': True},
+            'acquire': lambda args, owner: self.store.acquire(args['key'], owner, float(args['ttl'])),
+            'release': lambda args, owner: self.store.release(args['key'], owner),
+            'check_and_mark': lambda args, owner: self.store.check_and_mark(args['key']),
+            'check_rate': lambda args, owner: self.store.check_rate(
+                args['user_id'], args.get('guild_id'), args.get('channel_id')),
+            'stats': lambda args, owner: self.get_stats(),
+        }
+
+    async def start(self):
+        host, port = parse_address(self.address)
+        if port is None:
+            # A socket file left behind by a previous run would block the bind
+            if os.path.exists(host):
+                os.unlink(host)
+            self._server = await asyncio.start_unix_server(self._handle, path=host, limit=MAX_LINE)
+            os.chmod(host, 0o660)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port, limit=MAX_LINE)
+        logger.info(f"🗄️ State server listening on {self.address}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        host, port = parse_address(self.address)
+        if port is None and os.path.exists(host):
+            os.unlink(host)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owner = None
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break  # reset, or a line over MAX_LINE
+                if not line:
+                    break
+                reply, owner = self._dispatch(line, owner)
+                writer.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            if owner:
+                released = self.store.release_owner(owner)
+                if released:
+                    logger.info(f"🔓 Released {released} lease(s) of disconnected {owner}")
+            writer.close()
+
+    def _dispatch(self, line: bytes, owner: Optional[str]) -> Tuple[dict, Optional[str]]:
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            handler = self._ops.get(op)
+            if handler is None:
+                return {'id': request_id, 'error': f'unknown op {op!r}'}, owner
+            if op == 'hello':
+                owner = request.get('owner') or owner
+            result = handler(request, request.get('owner') or owner)
+            return {'id': request_id, 'result': result}, owner
+        except Exception as e:
+            return {'id': request_id, 'error': f'{type(e).__name__}: {e}'}, owner
+
+    def get_stats(self) -> dict:
+        return {
+            'connections': len(self._connections),
+            'requests': self.requests,
+            **self.store.get_stats(),
+        }
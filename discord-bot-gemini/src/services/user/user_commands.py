@@ -35,8 +35,8 @@ class UserCommandsCog(commands.Cog):
         
         # User stats
         user_id = str(ctx.author.id)
-        history = llm_service.summary_service.get_user_history(user_id)
-        summary = llm_service.summary_service.get_user_summary(user_id)
+        history = await llm_service.summary_service.get_user_history_async(user_id)
+        summary = await llm_service.summary_service.get_user_summary_async(user_id)
         
         embed.add_field(name="Lịch sử", value=f"{len(history)} tin nhắn", inline=True)
         embed.add_field(name="Tóm tắt", value="✅ Có" if summary else "❌ Chưa có", inline=True)
@@ -220,7 +220,8 @@ class UserCommandsCog(commands.Cog):
                 mention_text += f"• **{mention['type']}**: {mention['context'][:50]}...\n"
             
             embed.description = mention_text
-            embed.add_field(name="Tổng mentions", value=str(len(mentions)), inline=True)
+            total_mentions = llm_service.relationship_service.get_mention_count(user1, user2)
+            embed.add_field(name="Tổng mentions", value=str(total_mentions), inline=True)
             
             await ctx.reply(embed=embed)
             
@@ -2,7 +2,9 @@ import os
 import json
 import logging
 import time
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from config.settings import Config
+from utils.async_io import file_lock, file_mtime, run_io, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
@@ -12,31 +14,51 @@ class SummaryDataManager:
     CACHE_TTL = 300
 
     def __init__(self):
-        # Always resolve to src/data/user_summaries
-        base_dir = os.path.dirname(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        )
-        self.summaries_dir = os.path.join(base_dir, "data", "user_summaries")
+        # src/data/user_summaries (shared by every shard process)
+        self.summaries_dir = str(Config.USER_SUMMARIES_DIR)
         os.makedirs(self.summaries_dir, exist_ok=True)
 
-        # In-memory cache: {user_id: (data, timestamp)}
-        self._summary_cache: Dict[str, Tuple[str, float]] = {}
-        self._history_cache: Dict[str, Tuple[List[Dict], float]] = {}
+        # In-memory cache: {user_id: (data, timestamp, file mtime_ns)}
+        self._summary_cache: Dict[str, Tuple[str, float, Optional[int]]] = {}
+        self._history_cache: Dict[str, Tuple[List[Dict], float, Optional[int]]] = {}
 
     def _is_cache_valid(self, timestamp: float) -> bool:
         """Check if cache entry is still valid based on TTL"""
         return (time.time() - timestamp) < self.CACHE_TTL
 
+    @staticmethod
+    def _shared() -> bool:
+        """Other shard processes write the same files, so the cache must be revalidated"""
+        return bool(Config.SHARD_IDS)
+
+    def _cached(self, cache: Dict, user_id: str, path: str, check_file: bool):
+        """Cached value if within TTL and (when check_file) the file is unchanged on disk"""
+        entry = cache.get(user_id)
+        if entry is None:
+            return None
+        cached_data, timestamp, mtime = entry
+        if not self._is_cache_valid(timestamp):
+            return None
+        if check_file and file_mtime(path) != mtime:
+            return None
+        return cached_data
+
+    def _history_path(self, user_id: str) -> str:
+        return os.path.join(self.summaries_dir, f"{user_id}_history.json")
+
+    def _summary_path(self, user_id: str) -> str:
+        return os.path.join(self.summaries_dir, f"{user_id}_summary.json")
+
     def get_user_history(self, user_id: str) -> List[Dict]:
         # Check cache first
-        if user_id in self._history_cache:
-            cached_data, timestamp = self._history_cache[user_id]
-            if self._is_cache_valid(timestamp):
-                return cached_data
+        history_file = self._history_path(user_id)
+        cached = self._cached(self._history_cache, user_id, history_file, self._shared())
+        if cached is not None:
+            return cached
 
         # Cache miss - read from file
-        history_file = os.path.join(self.summaries_dir, f"{user_id}_history.json")
-        if not os.path.exists(history_file):
+        mtime = file_mtime(history_file)
+        if mtime is None:
             return []
         try:
             with open(history_file, "r", encoding="utf-8") as f:
@@ -45,7 +67,7 @@ class SummaryDataManager:
                 logger.error(f"History file format invalid for {user_id}")
                 return []
             # Update cache
-            self._history_cache[user_id] = (history, time.time())
+            self._history_cache[user_id] = (history, time.time(), mtime)
             return history
         except Exception as e:
             logger.error(f"Error loading history for {user_id}: {e}")
@@ -53,28 +75,28 @@ class SummaryDataManager:
 
     def get_user_summary(self, user_id: str) -> str:
         # Check cache first
-        if user_id in self._summary_cache:
-            cached_data, timestamp = self._summary_cache[user_id]
-            if self._is_cache_valid(timestamp):
-                return cached_data
+        summary_file = self._summary_path(user_id)
+        cached = self._cached(self._summary_cache, user_id, summary_file, self._shared())
+        if cached is not None:
+            return cached
 
         # Cache miss - read from file
-        summary_file = os.path.join(self.summaries_dir, f"{user_id}_summary.json")
-        if not os.path.exists(summary_file):
+        mtime = file_mtime(summary_file)
+        if mtime is None:
             return ""
         try:
             with open(summary_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 summary_str = json.dumps(data, ensure_ascii=False, indent=2)
             # Update cache
-            self._summary_cache[user_id] = (summary_str, time.time())
+            self._summary_cache[user_id] = (summary_str, time.time(), mtime)
             return summary_str
         except Exception as e:
             logger.error(f"Error loading summary for {user_id}: {e}")
             return ""
 
     def save_user_summary(self, user_id: str, summary: str):
-        summary_file = os.path.join(self.summaries_dir, f"{user_id}_summary.json")
+        summary_file = self._summary_path(user_id)
         try:
             os.makedirs(os.path.dirname(summary_file), exist_ok=True)
 
@@ -87,12 +109,13 @@ class SummaryDataManager:
             else:
                 data = summary
 
-            with open(summary_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with file_lock(summary_file):
+                write_json_atomic(summary_file, data)
+                mtime = file_mtime(summary_file)
 
             # Update cache after save
             summary_str = json.dumps(data, ensure_ascii=False, indent=2)
-            self._summary_cache[user_id] = (summary_str, time.time())
+            self._summary_cache[user_id] = (summary_str, time.time(), mtime)
 
             logger.info(f"Summary saved for user {user_id}")
 
@@ -105,16 +128,39 @@ class SummaryDataManager:
             del self._history_cache[user_id]
 
     def clear_user_summary(self, user_id: str):
-        summary_file = os.path.join(self.summaries_dir, f"{user_id}_summary.json")
+        summary_file = self._summary_path(user_id)
         txt_file = os.path.join(self.summaries_dir, f"{user_id}_summary.txt")
         try:
-            if os.path.exists(summary_file):
-                os.remove(summary_file)
-            if os.path.exists(txt_file):
-                os.remove(txt_file)
+            with file_lock(summary_file):
+                if os.path.exists(summary_file):
+                    os.remove(summary_file)
+                if os.path.exists(txt_file):
+                    os.remove(txt_file)
             # Clear cache
             if user_id in self._summary_cache:
                 del self._summary_cache[user_id]
             logger.info(f"Summary cleared for user {user_id}")
         except Exception as e:
             logger.error(f"Error clearing summary for {user_id}: {e}")
+
+    # =========================================================================
+    # Async variants - run the blocking versions on the data I/O thread
+    # =========================================================================
+
+    async def get_user_history_async(self, user_id: str) -> List[Dict]:
+        # Sharded: revalidating needs a stat(), which belongs on the I/O thread
+        if not self._shared():
+            cached = self._cached(self._history_cache, user_id, "", False)
+            if cached is not None:
+                return cached
+        return await run_io(self.get_user_history, user_id)
+
+    async def get_user_summary_async(self, user_id: str) -> str:
+        if not self._shared():
+            cached = self._cached(self._summary_cache, user_id, "", False)
+            if cached is not None:
+                return cached
+        return await run_io(self.get_user_summary, user_id)
+
+    async def save_user_summary_async(self, user_id: str, summary: str):
+        await run_io(self.save_user_summary, user_id, summary)
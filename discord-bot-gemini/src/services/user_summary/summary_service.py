@@ -63,6 +63,17 @@ class SummaryService:
         """Get user conversation history. Delegates to data manager."""
         return self.data_manager.get_user_history(user_id)
 
+    # Async variants: file access runs on the data I/O thread, never on the event loop
+
+    async def get_user_summary_async(self, user_id: str) -> str:
+        return await self.data_manager.get_user_summary_async(user_id)
+
+    async def save_user_summary_async(self, user_id: str, summary: str):
+        await self.data_manager.save_user_summary_async(user_id, summary)
+
+    async def get_user_history_async(self, user_id: str):
+        return await self.data_manager.get_user_history_async(user_id)
+
     # =========================================================================
     # Public API - Smart Update Logic
     # =========================================================================
@@ -76,7 +87,15 @@ class SummaryService:
         Check if user's conversation history is nearly full (80% threshold).
         Triggers summary update to preserve information before history is truncated.
         """
-        history = self.get_user_history(user_id)
+        return self._is_history_nearly_full(user_id, self.get_user_history(user_id))
+
+    async def is_context_nearly_full_async(self, user_id: str) -> bool:
+        """Async variant of is_context_nearly_full."""
+        return self._is_history_nearly_full(
+            user_id, await self.get_user_history_async(user_id)
+        )
+
+    def _is_history_nearly_full(self, user_id: str, history: list) -> bool:
         if not history:
             return False
 
@@ -117,8 +136,8 @@ class SummaryService:
 
         try:
             # Get current summary and history
-            current_summary = self.get_user_summary(user_id)
-            history = recent_messages or self.get_user_history(user_id)
+            current_summary = await self.get_user_summary_async(user_id)
+            history = recent_messages or await self.get_user_history_async(user_id)
 
             if not history:
                 logger.debug(f"No history for {user_id}, skipping summary update")
@@ -140,9 +159,9 @@ class SummaryService:
                 f"AI response for {user_id}: {new_summary_text[:500] if new_summary_text else 'None'}..."
             )
 
-            if not new_summary_text or new_summary_text.startswith("Error"):
+            if not new_summary_text:
                 logger.warning(
-                    f"AI returned empty or error summary for {user_id}: {new_summary_text}"
+                    f"AI returned empty summary for {user_id}: {new_summary_text}"
                 )
                 return None
 
@@ -162,7 +181,7 @@ class SummaryService:
                 merged_summary = self.parser.format_to_json(fields)
 
             # Save and reset tracking
-            self.save_user_summary(user_id, merged_summary)
+            await self.save_user_summary_async(user_id, merged_summary)
             self.reset_update_tracking(user_id)
 
             logger.info(f"Summary updated for {user_id}")
@@ -0,0 +1,111 @@
+# File: discord-bot-gemini/src/utils/async_io.py
+"""
+Non-blocking file I/O for the bot's JSON stores.
+
+All reads/writes of data files go through one dedicated worker thread, so
+JSON encoding and disk latency never run on the event loop (gateway
+heartbeats keep flowing) and writes to the same file are applied in the
+order they were submitted. Writes are atomic: data goes to a temp file in
+the same directory which then replaces the target.
+
+Files shared by several bot processes (per-user stores when sharded) are
+read-modified-written under `file_lock`, an advisory lock that other
+processes honour too.
+"""
+import os
+import json
+import zlib
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only, locking is a no-op
+    fcntl = None
+
+PathLike = Union[str, Path]
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Lock files per directory: files are hashed onto a fixed set of stripes
+LOCK_STRIPES = 64
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data-io")
+    return _executor
+
+
+async def run_io(func: Callable, *args) -> Any:
+    """Run a blocking function on the data I/O thread."""
+    return await asyncio.get_running_loop().run_in_executor(get_io_executor(), func, *args)
+
+
+def read_json(path: PathLike, default: Any = None) -> Any:
+    """Load a JSON file; returns `default` if it does not exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json_atomic(path: PathLike, data: Any, indent: Optional[int] = 2):
+    """Write JSON so readers never see a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path: PathLike) -> Iterator[None]:
+    """Hold an exclusive cross-process lock for `path` (for read-modify-write)."""
+    if fcntl is None:
+        yield
+        return
+    directory, name = os.path.split(os.path.abspath(path))
+    lock_dir = os.path.join(directory, ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    stripe = zlib.crc32(name.encode("utf-8")) % LOCK_STRIPES
+    with open(os.path.join(lock_dir, f"{stripe}.lock"), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def file_mtime(path: PathLike) -> Optional[int]:
+    """Modification time in ns, or None if the file does not exist (cache validation)."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+async def write_json_async(path: PathLike, data: Any, indent: Optional[int] = 2):
+    """Encode and write on the I/O thread. `data` must not be mutated until this returns."""
+    await run_io(write_json_atomic, path, data, indent)
+
+
+def shutdown_io_executor(wait: bool = True):
+    """Finish queued writes and stop the I/O thread (call on shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
@@ -1,3 +1,20 @@
 # File: discord-bot-gemini/src/utils/helpers.py
+from datetime import datetime
+from typing import Optional
 
-# This file is intentionally left blank.
\ No newline at end of file
+
+def iso_to_epoch(value: Optional[str]) -> float:
+    """Convert an ISO timestamp (as stored in JSON files) to epoch seconds."""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def epoch_to_iso(value: float) -> str:
+    """Convert epoch seconds back to the ISO format used in JSON files."""
+    if not value:
+        return ""
+    return datetime.fromtimestamp(value).isoformat()
@@ -0,0 +1,134 @@
+# File: discord-bot-gemini/src/utils/text_processing.py
+"""
+Post-processing of LLM reply text, shared by all providers.
+
+Every pattern is compiled once at import. Tag extraction, prompt-marker
+stripping and emoji filtering run as one combined regex scan, followed by
+whitespace normalisation; natural splitting (lines first, then sentences)
+reuses the same precompiled patterns.
+"""
+import re
+from typing import List, Optional, Tuple
+
+# [INFO:important] / [INFO:normal] flags the model appends to a reply
+INFO_TAG_RE = re.compile(r"\s*\[INFO:(\w+)\]\s*", re.IGNORECASE)
+
+# Prompt section markers the model sometimes echoes back (=== ... ===)
+_MARKER = r"===\s*[^=]+\s*==="
+
+# Unicode emoji (ASCII emoticons like :) :v :3 are kept)
+_EMOJI = (
+    "["
+    "\U0001f600-\U0001f64f"  # emoticons
+    "\U0001f300-\U0001f5ff"  # symbols & pictographs
+    "\U0001f680-\U0001f6ff"  # transport & map
+    "\U0001f1e0-\U0001f1ff"  # flags
+    "\U00002702-\U000027b0"  # dingbats
+    "\U0001f900-\U0001f9ff"  # supplemental symbols
+    "\U0001fa00-\U0001fa6f"  # chess symbols
+    "\U0001fa70-\U0001faff"  # symbols and pictographs extended
+    "\U00002600-\U000026ff"  # misc symbols
+    "]+"
+)
+
+# One scan for everything that is removed from a reply. The lookahead lets
+# the engine skip to candidate characters instead of trying every branch at
+# every position; whitespace left around a tag is collapsed afterwards.
+_STRIP_RE = re.compile(
+    rf"(?=[\[={_EMOJI[1:-2]}])"
+    rf"(?:(?P<tag>\[(?i:INFO):(\w+)\][ \t]*)|(?P<marker>{_MARKER})|(?P<emoji>{_EMOJI}))"
+)
+# Same, without the tag branch (tags already handled by a streaming filter)
+_CLEAN_RE = re.compile(rf"(?=[={_EMOJI[1:-2]}])(?:{_MARKER}|{_EMOJI})")
+_SPACES_RE = re.compile(r" {2,}")
+_NEWLINES_RE = re.compile(r"\n{3,}")
+
+# A sentence: text up to and including its end punctuation and trailing space
+SENTENCE_RE = re.compile(r"[^.!?…~]+[.!?…~]+\s*", re.UNICODE)
+# A sentence is complete (for streaming) once end punctuation is followed by whitespace
+SENTENCE_END_RE = re.compile(r"[.!?…~]+\s+", re.UNICODE)
+
+
+def normalise_whitespace(text: str) -> str:
+    """Collapse runs of spaces and of 3+ newlines, then strip."""
+    if "  " in text:
+        text = _SPACES_RE.sub(" ", text)
+    if "\n\n\n" in text:
+        text = _NEWLINES_RE.sub("\n\n", text)
+    return text.strip()
+
+
+def tag_replacement(match: "re.Match") -> str:
+    """Replacement for an INFO tag: keep a line break it sat on, else a space."""
+    return "\n" if "\n" in match.group(0) else " "
+
+
+def process_response(text: str) -> Tuple[str, bool]:
+    """
+    Clean a complete reply.
+
+    Removes [INFO:...] tags, prompt markers and emoji in one scan, then
+    normalises whitespace. Returns (clean text, is_important).
+    """
+    important = False
+
+    def replace(match: "re.Match") -> str:
+        nonlocal important
+        if match.lastgroup == "tag" and match.group(2).lower() == "important":
+            important = True
+        return ""
+
+    return normalise_whitespace(_STRIP_RE.sub(replace, text)), important
+
+
+def clean_response(text: str) -> str:
+    """Remove prompt markers and emoji and normalise whitespace (tags untouched)."""
+    return normalise_whitespace(_CLEAN_RE.sub("", text))
+
+
+def split_natural(text: str, max_len: Optional[int] = None) -> List[str]:
+    """
+    Split a reply into natural message parts.
+
+    Newlines win (Gen Z style breaks lines a lot); a single-line reply is
+    split at sentence ends. With `max_len`, longer parts are further split
+    at word boundaries.
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    if "\n" in text:
+        parts = [line.strip() for line in text.split("\n")]
+    else:
+        parts = []
+        consumed = 0
+        for match in SENTENCE_RE.finditer(text):
+            if match.start() != consumed:
+                break
+            parts.append(match.group(0).strip())
+            consumed = match.end()
+        # Trailing text without end punctuation
+        if consumed < len(text):
+            parts.append(text[consumed:].strip())
+
+    parts = [p for p in parts if p]
+    if max_len:
+        parts = [chunk for part in parts for chunk in _split_long(part, max_len)]
+    return parts
+
+
+def _split_long(part: str, max_len: int) -> List[str]:
+    if len(part) <= max_len:
+        return [part]
+    chunks: List[str] = []
+    current = ""
+    for word in part.split():
+        if current and len(current) + 1 + len(word) > max_len:
+            chunks.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        chunks.append(current)
+    return chunks